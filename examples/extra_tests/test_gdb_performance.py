@@ -0,0 +1,186 @@
+import time
+import numpy as np
+import unittest
+
+import geosoft.gxapi as gxapi
+import geosoft.gxpy.gx as gx
+import geosoft.gxpy.gdb as gxdb
+
+
+def timeit(f, *args, **kwargs):
+    t = time.perf_counter()
+    result = f(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+class Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gx = gx.GXpy(log=print)
+
+        # synthetic survey, 5000 lines of 2000 samples
+        cls.nlines = 5000
+        cls.npoints = 2000
+        cls.channels = ['x', 'y', 'z', 'mag']
+        rng = np.random.default_rng(0)
+        cls.gdb = gxdb.Geosoft_gdb.new(max_lines=cls.nlines + 10)
+        for i in range(cls.nlines):
+            data = np.empty((cls.npoints, 4))
+            data[:, 0] = np.arange(cls.npoints) * 10.
+            data[:, 1] = i * 100.
+            data[:, 2] = rng.normal(100., 5., cls.npoints)
+            data[:, 3] = rng.normal(50000., 100., cls.npoints)
+            cls.gdb.write_line(gxdb.create_line_name(i + 1), data, cls.channels)
+        cls.gdb.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gdb.close(discard=True)
+
+    def start(self):
+        self._func = self.id().split('.')[-1]
+        gx.gx().log('\n' + self._func)
+
+    def report(self, what, t_old, t_new):
+        gx.gx().log('    {}: old {:.3f}s, new {:.3f}s, speedup {:.1f}x'.format(what, t_old, t_new,
+                                                                              t_old / max(t_new, 1e-9)))
+
+    def test_read_all(self):
+        self.start()
+
+        def vstack_loop():
+            data = None
+            for line in self.gdb.list_lines():
+                npd, ch, fid = self.gdb.read_line(line, self.channels)
+                data = npd if data is None else np.vstack((data, npd))
+            return data
+
+        t_old, old = timeit(vstack_loop)
+        t_new, (new, lines, offsets, fids) = timeit(self.gdb.read_all, self.channels, dtype=np.float64)
+        self.assertEqual(offsets[-1], old.shape[0])
+        for i, c in enumerate(self.channels):
+            self.assertTrue(np.array_equal(old[:, i], new[c]))
+        self.report('read_all() vs read_line() and vstack()', t_old, t_new)
+
+    def test_dummy_rows(self):
+        self.start()
+
+        # one 1M row line with scattered dummies
+        nrows = 1000000
+        rng = np.random.default_rng(3)
+        data = rng.normal(size=(nrows, 4))
+        data[rng.integers(0, nrows, 5000), rng.integers(0, 4, 5000)] = np.nan
+        self.gdb.write_line('L1000000', data, self.channels)
+
+        def apply_rows(npd):
+            return npd[np.apply_along_axis(lambda a: not (np.isnan(a).any()), 1, npd), :]
+
+        t_old, old = timeit(apply_rows, data)
+        t_new, valid = timeit(lambda npd: npd[~np.isnan(npd).any(axis=1)], data)
+        self.assertTrue(np.array_equal(old, valid))
+        self.report('row mask, 1M rows', t_old, t_new)
+
+        idata = np.where(np.isnan(data), gxapi.iDUMMY, data * 1000.).astype(np.int32)
+        t_old, old = timeit(lambda npd: npd[np.apply_along_axis(lambda a: not (gxapi.iDUMMY in a), 1, npd), :],
+                            idata)
+        t_new, new = timeit(lambda npd: npd[~(npd == gxapi.iDUMMY).any(axis=1)], idata)
+        self.assertTrue(np.array_equal(old, new))
+        self.report('int32 row mask, 1M rows', t_old, t_new)
+
+        t_read, (npd, ch, fid, mask) = timeit(self.gdb.read_line, 'L1000000', self.channels,
+                                              dummy=gxdb.READ_REMOVE_DUMMYROWS, return_mask=True)
+        self.assertTrue(np.array_equal(npd, valid))
+        self.assertEqual(np.count_nonzero(mask), valid.shape[0])
+        gx.gx().log('    read_line(READ_REMOVE_DUMMYROWS), 1M rows: {:.3f}s'.format(t_read))
+        self.gdb.delete_line('L1000000')
+
+    def test_channel_cache(self):
+        self.start()
+
+        # wide database, 250 channels
+        nchan = 250
+        channels = ['c{}'.format(i) for i in range(nchan)]
+        with gxdb.Geosoft_gdb.new(max_channels=nchan + 10) as gdb:
+            data = np.random.default_rng(5).normal(size=(500, nchan))
+            for i in range(50):
+                gdb.write_line(gxdb.create_line_name(i + 1), data, channels)
+            gdb.commit()
+            lines = list(gdb.list_lines())
+
+            def uncached():
+                for line in lines:
+                    gdb.clear_cache()
+                    gdb.read_line(line, channels)
+
+            def cached():
+                for line in lines:
+                    gdb.read_line(line, channels)
+
+            t_old, _ = timeit(uncached)
+            t_new, _ = timeit(cached)
+            self.report('read_line() 250 channels, cached symbols vs uncached', t_old, t_new)
+
+            t_old, _ = timeit(lambda: [(gdb.clear_cache(), gdb.list_channels()) for _ in range(1000)])
+            t_new, _ = timeit(lambda: [gdb.list_channels() for _ in range(1000)])
+            self.report('list_channels() x 1000', t_old, t_new)
+
+    def test_extent(self):
+        self.start()
+
+        self.gdb.xyz_channels = ('x', 'y', 'z')
+
+        def full_extent():
+            self.gdb.clear_extent()
+            return self.gdb.extent
+
+        t_old, old = timeit(full_extent)
+        t_new, new = timeit(lambda: self.gdb.extent)
+        self.assertEqual(old.extent_xyz, new.extent_xyz)
+        self.report('extent, cached line ranges vs reading all lines', t_old, t_new)
+
+        # one line changed
+        line = gxdb.create_line_name(1)
+        self.gdb.write_channel(line, 'x', np.arange(self.npoints) * 10. - 1.)
+        t_changed, changed = timeit(lambda: self.gdb.extent)
+        self.assertEqual(changed.extent_xyz[0], -1.)
+        gx.gx().log('    extent after writing one line: {:.3f}s'.format(t_changed))
+        self.gdb.write_channel(line, 'x', np.arange(self.npoints) * 10.)
+
+        # a new session uses the ranges kept with the database
+        self.gdb.commit()
+        name = self.gdb.file_name
+        self.gdb.close()
+        type(self).gdb = gxdb.Geosoft_gdb.open(name)
+        t_open, reopened = timeit(lambda: self.gdb.extent)
+        self.assertEqual(reopened.extent_xyz, old.extent_xyz)
+        self.report('extent in a new session, reading all lines vs kept ranges', t_old, t_open)
+
+    def test_iter_lines(self):
+        self.start()
+
+        def work(npd):
+            # stands in for per-line processing
+            return np.sort(np.abs(np.fft.rfft(npd[:, 3]))).sum()
+
+        def line_loop():
+            total = 0.
+            for line in self.gdb.list_lines():
+                npd, ch, fid = self.gdb.read_line(line, self.channels)
+                total += work(npd)
+            return total
+
+        def prefetch_loop(prefetch):
+            total = 0.
+            for line, npd, ch, fid in self.gdb.iter_lines(self.channels, prefetch=prefetch):
+                total += work(npd)
+            return total
+
+        t_old, old = timeit(line_loop)
+        t_new, new = timeit(prefetch_loop, 4)
+        self.assertAlmostEqual(old, new)
+        self.report('iter_lines(prefetch=4) vs read_line() loop', t_old, t_new)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import time
+import numpy as np
+import unittest
+
+import geosoft.gxapi as gxapi
+import geosoft.gxpy.gx as gx
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grid_utility as gxgrdu
+import geosoft.gxpy.vv as gxvv
+import geosoft.gxpy.agg as gxagg
+
+
+def timeit(f, *args, **kwargs):
+    t = time.perf_counter()
+    result = f(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+class Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gx = gx.GXpy(log=print)
+        cls.nx = cls.ny = 4000
+        data = np.random.default_rng(0).normal(size=(cls.ny, cls.nx)).astype(np.float32)
+        data[::97, ::89] = np.nan
+        cls.grid = gxgrd.Grid.from_data_array(data)
+        cls.grid.delete_files()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.grid.close()
+
+    def start(self):
+        self._func = self.id().split('.')[-1]
+        gx.gx().log('\n' + self._func)
+
+    def report(self, what, t_old, t_new):
+        gx.gx().log('    {}: old {:.3f}s, new {:.3f}s, speedup {:.1f}x'.format(what, t_old, t_new,
+                                                                              t_old / max(t_new, 1e-9)))
+
+    def test_np(self):
+        self.start()
+
+        def row_loop(g):
+            data = np.zeros((g.ny, g.nx), dtype=g.dtype)
+            for i in range(g.ny):
+                data[i, :] = g.read_row(i).np
+            return data
+
+        t_old, old = timeit(row_loop, self.grid)
+        t_new, new = timeit(self.grid.np)
+        self.assertTrue(np.array_equal(old, new, equal_nan=True))
+
+        out = np.empty((self.ny, self.nx), dtype=np.float32)
+        t_out, _ = timeit(self.grid.np, out=out)
+        self.assertTrue(np.array_equal(old, out, equal_nan=True))
+
+        self.report('np()', t_old, t_new)
+        self.report('np(out=)', t_old, t_out)
+
+    def test_iteration(self):
+        self.start()
+
+        # point iteration over a window, the full grid takes too long
+        with gxgrd.Grid.index_window(self.grid, nx=1000, ny=1000) as g:
+            g.delete_files()
+
+            def point_loop():
+                total = 0.0
+                for x, y, z, v in g:
+                    if v is not None:
+                        total += v
+                return total
+
+            def chunk_loop():
+                total = 0.0
+                for x, y, z, v in g.iter_chunks():
+                    total += np.nansum(v)
+                return total
+
+            t_old, old = timeit(point_loop)
+            t_new, new = timeit(chunk_loop)
+            self.assertAlmostEqual(old, new, places=2)
+            self.report('iteration', t_old, t_new)
+
+    def test_write(self):
+        self.start()
+
+        data = self.grid.np()
+        p = self.grid.properties()
+
+        def row_loop(g):
+            dvv = gxvv.GXvv(dtype=g.dtype)
+            for i in range(g.ny):
+                dvv.set_data(data[i, :])
+                g.gximg.write_y(i, 0, 0, dvv.gxvv)
+
+        def block_write(g, threaded):
+            with g.row_writer(threaded=threaded) as writer:
+                for i in range(0, g.ny, 500):
+                    writer.write(data[i: i + 500])
+
+        with gxgrd.Grid.new(properties=p) as g:
+            t_old, _ = timeit(row_loop, g)
+        with gxgrd.Grid.new(properties=p) as g:
+            t_new, _ = timeit(block_write, g, False)
+            self.assertTrue(np.array_equal(g.np(), data, equal_nan=True))
+        with gxgrd.Grid.new(properties=p) as g:
+            t_threaded, _ = timeit(block_write, g, True)
+            self.assertTrue(np.array_equal(g.np(), data, equal_nan=True))
+
+        self.report('row_writer()', t_old, t_new)
+        self.report('row_writer(threaded=True)', t_old, t_threaded)
+
+    def test_sample(self):
+        self.start()
+
+        # synthetic 10M point survey over the grid
+        npoints = 10000000
+        rng = np.random.default_rng(1)
+        xy = np.column_stack((rng.uniform(self.grid.x0, self.grid.x0 + self.grid.dx * self.nx, npoints),
+                              rng.uniform(self.grid.y0, self.grid.y0 + self.grid.dy * self.ny, npoints)))
+        xyz = np.column_stack((xy, np.zeros(npoints)))
+
+        # per-point native calls, timed on a subset and scaled
+        nsub = 20000
+
+        def point_loop():
+            return np.array([np.nan if v is None else v
+                             for v in (self.grid.get_value(x, y) for x, y in xy[:nsub])])
+
+        t_point, point = timeit(point_loop)
+        t_point *= npoints / nsub
+
+        t_old, old = timeit(gxgrdu.sample, self.grid, xyz)
+        t_new, new = timeit(gxgrdu.sample_points, self.grid, xy)
+        old[old == gxapi.rDUMMY] = np.nan
+        both = ~np.isnan(old) & ~np.isnan(new)
+        self.assertTrue(np.allclose(old[both], new[both], atol=1e-4))
+        both = ~np.isnan(point) & ~np.isnan(new[:nsub])
+        self.assertTrue(np.allclose(point[both], new[:nsub][both], atol=1e-4))
+
+        # three co-registered grids in one pass
+        grids = [self.grid, self.grid, self.grid]
+        t_old3, _ = timeit(lambda: [gxgrdu.sample(g, xyz) for g in grids])
+        t_new3, new3 = timeit(gxgrdu.sample_points, grids, xy)
+        self.assertTrue(np.array_equal(new3[:, 2], new, equal_nan=True))
+
+        self.report('sample_points() vs get_value() per point (scaled)', t_point, t_new)
+        self.report('sample_points() vs sample()', t_old, t_new)
+        self.report('sample_points() 3 grids vs 3 x sample()', t_old3, t_new3)
+
+    def test_minimum_curvature(self):
+        self.start()
+
+        # 200 lines of 1000 scattered samples over a 10 km square
+        rng = np.random.default_rng(2)
+        nlines = 200
+        x = rng.uniform(0., 10000., (nlines, 1000))
+        y = np.linspace(0., 10000., nlines)[:, np.newaxis] + rng.normal(0., 5., (nlines, 1000))
+        v = np.sin(x / 1500.) * np.cos(y / 2000.) * 100.
+        xyv = np.stack((x, y, v), axis=-1)
+
+        def feed_data(n):
+            if n >= nlines:
+                return None
+            return xyv[n]
+
+        kwargs = {'cs': 20., 'area': (0., 0., 10000., 10000.), 'bkd': 200., 'itrmax': 200}
+        t_old, old = timeit(gxgrd.Grid.minimum_curvature, feed_data, max_segments=nlines, **kwargs)
+        t_new, new = timeit(gxgrdu.minimum_curvature, xyv.reshape(-1, 3), **kwargs)
+        with old, new:
+            self.assertEqual((old.nx, old.ny), (new.nx, new.ny))
+            a = old.np(dtype=np.float64)
+            b = new.np(dtype=np.float64)
+            both = ~np.isnan(a) & ~np.isnan(b)
+            self.assertLess(np.abs(a[both] - b[both]).mean(), 2.)
+
+        self.report('minimum_curvature() in-process vs callback', t_old, t_new)
+
+    def test_contour(self):
+        self.start()
+
+        with gxgrd.Grid.index_window(self.grid, nx=1000, ny=1000) as g:
+            g.delete_files()
+            st = g.statistics()
+            levels = np.linspace(st['min'], st['max'], 22)[1:-1]
+
+            t_old, old = timeit(lambda: [gxgrdu.contour_points(g, v, resolution=0, max_segments=100000)
+                                         for v in levels])
+            t_new, (offsets, xyz, level_index) = timeit(gxgrdu.contour_arrays, g, levels)
+            self.assertEqual(len(offsets) - 1, len(level_index))
+            self.report('contour_arrays() vs contour_points() per level, 20 levels', t_old, t_new)
+
+            many = np.linspace(st['min'], st['max'], 2002)[1:-1]
+            t_many, (offsets, xyz, _) = timeit(gxgrdu.contour_arrays, g, many)
+            gx.gx().log('    contour_arrays() 2000 levels: {:.3f}s, {} polylines, {} points'.
+                        format(t_many, len(offsets) - 1, len(xyz)))
+
+    def test_derivatives(self):
+        self.start()
+
+        types = (gxgrdu.DERIVATIVE_XY, gxgrdu.DERIVATIVE_XYZ, gxgrdu.TILT_ANGLE)
+        t_old, old = timeit(lambda: [gxgrdu.derivative(self.grid, dt, fft=False) for dt in types])
+        t_new, new = timeit(gxgrdu.derivatives, self.grid, types, fft=False)
+        for a, b in zip(old, new):
+            with a, b:
+                va = a.np(dtype=np.float64)[1:-1, 1:-1]
+                vb = b.np(dtype=np.float64)[1:-1, 1:-1]
+                both = ~np.isnan(va) & ~np.isnan(vb)
+                self.assertGreater(np.count_nonzero(both), va.size // 2)
+
+        self.report('derivatives() vs derivative() for XY, XYZ and tilt angle', t_old, t_new)
+
+    def test_virtual_window(self):
+        self.start()
+
+        # statistics over 200 random 200 x 200 areas
+        rng = np.random.default_rng(3)
+        aois = [(int(c), int(r)) for c, r in rng.integers(0, self.nx - 200, (200, 2))]
+
+        def window_stats(virtual):
+            means = []
+            for c, r in aois:
+                with gxgrd.Grid.index_window(self.grid, x0=c, y0=r, nx=200, ny=200, virtual=virtual) as w:
+                    if not virtual:
+                        w.delete_files()
+                    means.append(w.statistics()['mean'])
+            return np.array(means)
+
+        t_old, old = timeit(window_stats, False)
+        t_new, new = timeit(window_stats, True)
+        self.assertTrue(np.allclose(old, new))
+
+        self.report('index_window(virtual=True) statistics, 200 windows', t_old, t_new)
+
+    def test_convert_grids(self):
+        self.start()
+
+        # 16 1000 x 1000 grids to ER Mapper, serial then in a pool of 4 processes
+        sources = []
+        with gxgrd.Grid.index_window(self.grid, nx=1000, ny=1000, virtual=True) as w:
+            for i in range(16):
+                with w.materialize(gx.gx().temp_file('.grd(GRD)')) as g:
+                    sources.append(g.file_name_decorated)
+        jobs = [(s, gx.gx().temp_file('.ers(ERM)')) for s in sources]
+
+        t_old, old = timeit(gxgrdu.convert_grids, jobs, workers=1)
+        t_new, new = timeit(gxgrdu.convert_grids, jobs, workers=4, skip_current=False)
+        self.assertTrue(all(r['status'] == gxgrdu.CONVERT_DONE for r in old + new))
+        gx.gx().log('    {:.1f} MB/s per job'.format(np.mean([r['bytes_per_sec'] for r in new]) / 1048576.))
+
+        t_skip, skip = timeit(gxgrdu.convert_grids, jobs)
+        self.assertTrue(all(r['status'] == gxgrdu.CONVERT_SKIPPED for r in skip))
+        for s, t in jobs:
+            gxgrd.delete_files(s)
+            gxgrd.delete_files(t)
+
+        self.report('convert_grids() 4 workers vs 1, 16 grids', t_old, t_new)
+        self.report('convert_grids() up to date vs converting', t_old, t_skip)
+
+    def test_rgba(self):
+        self.start()
+
+        rng = np.random.default_rng(4)
+        rgba = rng.integers(0, 256, (self.ny, self.nx, 4), dtype=np.uint8)
+        rgba[..., 3] = np.where(rgba[..., 3] > 10, 255, 0)
+
+        t_write, g = timeit(gxgrd.Grid.from_rgba, rgba)
+        with g:
+            g.delete_files()
+
+            def row_decode():
+                out = np.empty((g.ny, g.nx, 4), dtype=np.uint8)
+                for i in range(g.ny):
+                    values = g.read_row(i).np
+                    values[values == gxapi.iDUMMY] = 0
+                    a = (np.right_shift(values, 24) & 0xFF).astype(np.uint8)
+                    a[a > 0] = 255
+                    out[i] = np.stack(((values & 0xFF).astype(np.uint8),
+                                       (np.right_shift(values, 8) & 0xFF).astype(np.uint8),
+                                       (np.right_shift(values, 16) & 0xFF).astype(np.uint8), a), axis=-1)
+                return out
+
+            t_old, old = timeit(row_decode)
+            t_new, new = timeit(g.read_rgba)
+            self.assertTrue(np.array_equal(old, new))
+            self.assertTrue(np.array_equal(new, rgba))
+
+            t_write_rgba, _ = timeit(g.write_rgba, rgba)
+
+            def map_png():
+                with gxagg.Aggregate_image.new(g.file_name_decorated, shade=False) as agg:
+                    return agg.image_file(gx.gx().temp_file('.png'), pix_width=2000)
+
+            t_map, _ = timeit(map_png)
+            t_png, _ = timeit(g.image_file, pix_width=2000)
+
+        self.report('read_rgba() vs per-row decode', t_old, t_new)
+        gx.gx().log('    from_rgba(): {:.3f}s, write_rgba(): {:.3f}s'.format(t_write, t_write_rgba))
+        self.report('colour grid PNG direct vs map', t_map, t_png)
+
+    def test_open_pooled(self):
+        self.start()
+
+        # 50 small grids, each opened 20 times to read a statistic
+        p = self.grid.properties()
+        p['nx'] = p['ny'] = 200
+        names = []
+        for i in range(50):
+            with gxgrd.Grid.new(gx.gx().temp_file('.grd(GRD)'), properties=p) as g:
+                with g.row_writer() as writer:
+                    writer.write(np.full((200, 200), i, dtype=np.float32))
+                names.append(g.file_name_decorated)
+
+        def open_loop(open_grid):
+            total = 0.0
+            for _ in range(20):
+                for fn in names:
+                    with open_grid(fn) as g:
+                        total += g.read_row(100).np[100]
+            return total
+
+        gxgrd.clear_handle_pool()
+        t_old, old = timeit(open_loop, gxgrd.Grid.open)
+        t_new, new = timeit(open_loop, gxgrd.Grid.open_pooled)
+        self.assertEqual(old, new)
+        gx.gx().log('    {}'.format(gxgrd.handle_pool_statistics()))
+        for fn in names:
+            gxgrd.delete_files(fn)
+
+        self.report('open_pooled() vs open(), 50 grids x 20', t_old, t_new)
+
+
+##############################################################################################
+if __name__ == '__main__':
+
+    unittest.main()
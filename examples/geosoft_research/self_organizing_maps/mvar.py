@@ -585,32 +585,20 @@ class SOMgdb:
 
         self.nCh = len(self.fields)
 
-        # read line at a time
         lines = self.gdb.list_lines(select=True)
-        nl = len(lines)
 
         # if ch_filter, add filter to the data
         if self.ch_filter[0]:
             self.fields.append(self.ch_filter[0])
 
-        n = 0
-        data = []
-        for l in lines:
-
-            npd, ch, fid = self.gdb.read_line(l, channels=self.fields, dummy=gxgdb.READ_REMOVE_DUMMYROWS)
-
-            # build data array
-            if n == 0:
-                data = npd  # .copy()
-            else:
-                data = np.vstack((data, npd))
-
-            n += 1
-            if self.progress:
-                self.progress('{} + {} from line {}'.format(data.shape, npd.shape[0], l), n * 100 / nl)
-            if self.stop():
-                raise MvarException("Stop requested")
-            del npd
+        # all lines into contiguous arrays, one per channel, then drop rows with dummies
+        columns, _, _, _ = self.gdb.read_all(channels=self.fields, lines=lines, dtype=np.float64,
+                                             progress=self.progress, stop=self.stop)
+        if self.stop():
+            raise MvarException("Stop requested")
+        data = np.column_stack([columns[f] for f in self.fields])
+        del columns
+        data = data[~np.isnan(data).any(axis=1)]
 
         # filter
         if self.ch_filter[0]:
@@ -1,30 +1,40 @@
+# Sub-modules that need the Geosoft native libraries are imported only if the libraries are available,
+# so that modules that do not need them, such as grd_file, can be imported on systems without them.
+try:
+    import geosoft.gxapi
+    _native = True
+except ImportError:
+    _native = False
 
-from . import system
-from . import gx
-from . import dataframe
-from . import project
-from . import utility
-from . import vv
-from . import va
-from . import coordinate_system
-from . import geometry
-from . import geometry_utility
-from . import grid
-from . import grid_fft
-from . import grid_utility
-from . import gdb
-from . import agg
-from . import map
-from . import view
-from . import group
-from . import viewer
-from . import vox
-from . import vox_display
-from . import metadata
-from . import spatialdata
-from . import surface
-from . import dap_client
-from . import segy_reader
+if _native:
+    from . import system
+    from . import gx
+    from . import dataframe
+    from . import project
+    from . import utility
+    from . import vv
+    from . import va
+    from . import coordinate_system
+    from . import geometry
+    from . import geometry_utility
+    from . import grid
+    from . import grid_fft
+    from . import grid_utility
+    from . import gdb
+    from . import agg
+    from . import map
+    from . import view
+    from . import group
+    from . import viewer
+    from . import vox
+    from . import vox_display
+    from . import metadata
+    from . import spatialdata
+    from . import surface
+    from . import dap_client
+    from . import segy_reader
+
+from . import grd_file
 
 __all__ = ['agg',
            'coordinate_system',
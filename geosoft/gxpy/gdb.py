@@ -65,6 +65,9 @@ Geosoft databases for line-oriented spatial data.
 import os
 import sys
 import math
+import json
+import threading
+import queue
 import numpy as np
 import pandas as pd
 
@@ -227,6 +230,73 @@ def delete_files(file_name):
 
         gxu.delete_file(file_name)
         gxu.delete_file(file_name + '.xml')
+        gxu.delete_file(file_name + '.extent')
+
+
+def _file_stamp(file_name):
+    try:
+        st = os.stat(file_name)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _data_range(data):
+    # (min, max) of the valid values in data, (None, None) if there are none
+    data = np.asarray(data)
+    if data.dtype.kind == 'f':
+        valid = data[~np.isnan(data) & (data != gxapi.rDUMMY)]
+    elif data.dtype.kind in 'iu':
+        valid = data[data != gxu.gx_dummy(data.dtype)]
+    else:
+        return None, None
+    if valid.size == 0:
+        return None, None
+    return float(valid.min()), float(valid.max())
+
+
+def _dummy_elements(npd):
+    # True for dummy elements, dummies are np.nan in float arrays
+    if npd.dtype.kind == 'f':
+        return np.isnan(npd)
+    return npd == gxu.gx_dummy(npd.dtype)
+
+
+def _prefetch_lines(file_name, lines, channels, dtype, fid, dummy, lines_queue, stop):
+    # Background reader for `Geosoft_gdb.iter_lines`. GX handles belong to the thread that created them,
+    # so the reader has its own GX context and its own read-only session on the database file.
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                lines_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        with gx.GXpy():
+            try:
+                gdb = Geosoft_gdb(db=gxapi.GXDB.open_read_only(file_name, 'SUPER', ''))
+            except (geosoft.GXRuntimeError, gxapi.GXAPIError, gxapi.GXError) as e:
+                put(('failed', e))
+                return
+            with gdb:
+                if not put(('open', None)):
+                    return
+                for line in lines:
+                    try:
+                        npd, ch, line_fid = gdb.read_line(line, channels, dtype=dtype, fid=fid, dummy=dummy)
+                    except Exception as e:
+                        put(('error', e))
+                        return
+                    if not put(('line', (line, npd, ch, line_fid))):
+                        return
+    except Exception as e:
+        put(('failed', e))
+        return
+    put(('done', None))
 
 
 class Geosoft_gdb(gxgeo.Geometry):
@@ -337,6 +407,8 @@ class Geosoft_gdb(gxgeo.Geometry):
                         self._db.sync()
 
                     self._db = None
+                    if not discard and self._ranges_changed:
+                        self._save_ranges()
                 if discard:
                     gxu.delete_files_by_root(self._file_name)
                 if pop:
@@ -357,7 +429,10 @@ class Geosoft_gdb(gxgeo.Geometry):
         self._xmlmetadata = None
         self._xmlmetadata_changed = False
         self._xmlmetadata_root = ''
-        self._extent = {'xyz': None, 'extent': None}
+        self._ranges = {}
+        self._ranges_written = set()
+        self._ranges_changed = False
+        self._init_cache()
 
         if name is None:
             if self._db:
@@ -401,11 +476,15 @@ class Geosoft_gdb(gxgeo.Geometry):
             gdb._db = gxapi.GXEDB.lock(gdb._edb)
         else:
             gdb._edb = None
+            stamp = _file_stamp(_gdb_name(name))
             gdb._db = gxapi.GXDB.open(_gdb_name(name), 'SUPER', '')
 
         sr = gxapi.str_ref()
         gdb._db.get_name(gxapi.DB_NAME_FILE, sr)
         gdb._file_name = os.path.normpath(sr.value)
+        if name is None:
+            stamp = _file_stamp(gdb._file_name)
+        gdb._load_ranges(stamp)
 
         return gdb
 
@@ -477,6 +556,8 @@ class Geosoft_gdb(gxgeo.Geometry):
         .. versionadded:: 9.1
         """
         self._db.commit()
+        self.clear_cache()
+        self._ranges_written.clear()
 
     def discard(self):
         """
@@ -485,6 +566,10 @@ class Geosoft_gdb(gxgeo.Geometry):
         .. versionadded:: 9.1
         """
         self._db.discard()
+        self.clear_cache()
+        for ls in self._ranges_written:
+            self._ranges.pop(ls, None)
+        self._ranges_written.clear()
 
     # ============================================================================
     # internal helper functions
@@ -563,7 +648,6 @@ class Geosoft_gdb(gxgeo.Geometry):
         self.gxdb.set_xyz_chan(1, y)
         if z:
             self.gxdb.set_xyz_chan(2, z)
-        self.clear_extent()
 
     def _init_xmlmetadata(self):
         if not self._xmlmetadata:
@@ -771,52 +855,89 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         :returns:   `geosoft.gxpy.geometry.Point2` of minimum, maximum, or None if no spatial information.
 
+        The extent is combined from the range of the x, y and z channels in each line. Ranges are
+        updated as spatial channels are written, only lines that have changed since the range was
+        last determined are read, and ranges are kept with the database in a "<name>.gdb.extent" file
+        so the extent of an unchanged database is available without reading the data.
+
         .. versionadded:: 9.2
+
+        .. versionchanged:: 2022.1 maintained incrementally by line
         """
 
-        def expand(_min, _max, _data):
-            if np.isnan(_data).all():
-                return _min, _max
-            mdata = np.nanmin(_data)
-            if _min is None:
-                _min = mdata
-                _max = np.nanmax(_data)
-                return _min, _max
-            if mdata < _min:
-                _min = mdata
-                return _min, _max
-            mdata = np.nanmax(_data)
-            if mdata > _max:
-                _max = mdata
-            return _min, _max
-
-        lines = self.lines()
-        if len(lines):
-
-            xyz = self.xyz_channels
-            if str(xyz) == self._extent['xyz']:
-                return self._extent['extent']
-
-            xmin = xmax = ymin = ymax = zmin = zmax = None
-            if None in xyz:
-                if None in xyz[0:2]:
-                    return None
-                xyz = xyz[0:2]
-
-            for l in lines:
-                data = self.read_line(l, channels=xyz)[0]
-                xmin, xmax = expand(xmin, xmax, data[:, 0])
-                ymin, ymax = expand(ymin, ymax, data[:, 1])
-                if data.shape[1] > 2:
-                    zmin, zmax = expand(zmin, zmax, data[:, 2])
-
-            ext = gxgeo.Point2((xmin, ymin, zmin, xmax, ymax, zmax), coordinate_system=self.coordinate_system)
-            self._extent['xyz'] = str(xyz)
-            self._extent['extent'] = ext
-
-            return ext
+        xyz = self.xyz_channels
+        if None in xyz[0:2]:
+            return None
+        lines = self.list_lines()
+        if not len(lines):
+            return None
+
+        symbs = [self.channel_name_symb(c)[1] for c in xyz if c]
+        vmin = [None, None, None]
+        vmax = [None, None, None]
+        for ls in lines.values():
+            for i, cs in enumerate(symbs):
+                cmin, cmax = self._channel_range(ls, cs)
+                if cmin is not None:
+                    if vmin[i] is None or cmin < vmin[i]:
+                        vmin[i] = cmin
+                    if vmax[i] is None or cmax > vmax[i]:
+                        vmax[i] = cmax
+
+        return gxgeo.Point2((vmin[0], vmin[1], vmin[2], vmax[0], vmax[1], vmax[2]),
+                            coordinate_system=self.coordinate_system)
+
+    def _xyz_symbs(self):
+        return {self._db.get_xyz_chan_symb(c) for c in (gxapi.DB_CHAN_X, gxapi.DB_CHAN_Y, gxapi.DB_CHAN_Z)}
+
+    def _channel_range(self, ls, cs):
+        fid_length = self._channel_fid_length(ls, cs)
+        line_ranges = self._ranges.setdefault(ls, {})
+        rng = line_ranges.get(cs)
+        if rng is None or rng[2] != fid_length:
+            if fid_length[2] == 0:
+                vmin, vmax = None, None
+            else:
+                vmin, vmax = _data_range(self.read_channel_vv(ls, cs, dtype=np.float64).np)
+            rng = (vmin, vmax, fid_length)
+            line_ranges[cs] = rng
+            self._ranges_changed = True
+        return rng[0], rng[1]
+
+    def _channel_written(self, ls, cs, data=None):
+        # keep the range of spatial channels from the data written, forget others
+        self._ranges_written.add(ls)
+        self._ranges_changed = True
+        if data is not None and cs in self._xyz_symbs():
+            vmin, vmax = _data_range(data)
+            self._ranges.setdefault(ls, {})[cs] = (vmin, vmax, self._channel_fid_length(ls, cs))
+        else:
+            self._ranges.get(ls, {}).pop(cs, None)
 
-        return None
+    def _load_ranges(self, stamp):
+        try:
+            with open(self._file_name + '.extent') as f:
+                saved = json.load(f)
+            if saved['version'] != 1 or stamp is None or tuple(saved['stamp']) != tuple(stamp):
+                return
+            self._ranges = {int(ls): {int(cs): (r[0], r[1], tuple(r[2:])) for cs, r in line_ranges.items()}
+                            for ls, line_ranges in saved['ranges'].items()}
+        except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+            pass
+
+    def _save_ranges(self):
+        stamp = _file_stamp(self._file_name)
+        if stamp is None:
+            return
+        ranges = {str(ls): {str(cs): [r[0], r[1]] + list(r[2]) for cs, r in line_ranges.items()}
+                  for ls, line_ranges in self._ranges.items()}
+        try:
+            with open(self._file_name + '.extent', 'w') as f:
+                json.dump({'version': 1, 'stamp': list(stamp), 'ranges': ranges}, f)
+        except (OSError, NameError):
+            # the extent file is only an optimization, NameError if closed at interpreter shutdown
+            pass
+        self._ranges_changed = False
 
     def _get(self, s, fn):
         self.lock_read_(s)
@@ -833,6 +954,49 @@ class Geosoft_gdb(gxgeo.Geometry):
         finally:
             self.unlock_(s)
 
+    def _init_cache(self):
+        self._line_symbs = {}       # line name or symbol: (name, symbol)
+        self._chan_symbs = {}       # channel name or symbol: (name, symbol)
+        self._chan_info = {}        # channel symbol: (array width, gx type)
+        self._line_fids = {}        # line symbol: {channel symbol: (fid start, fid increment, length)}
+        self._chan_lists = {}       # list_channels() filter: {name: symbol}
+
+    def clear_cache(self):
+        """
+        Clear cached line and channel symbols, channel properties and fiducials.
+
+        The cache is cleared when this instance creates, deletes or renames lines or channels, and
+        on `commit` and `discard`. Fiducials of a line are cleared when data is written to the line.
+        Call this if the database is changed by other means, for example by another session.
+
+        .. versionadded:: 2022.1
+        """
+        self._init_cache()
+
+    def _line_changed(self, ls):
+        self._line_fids.pop(ls, None)
+
+    def _channel_info(self, cs):
+        info = self._chan_info.get(cs)
+        if info is None:
+            info = (self._get(cs, self._db.get_col_va), self._db.get_chan_type(cs))
+            self._chan_info[cs] = info
+        return info
+
+    def _channel_fid_length(self, ls, cs):
+        line_fids = self._line_fids.setdefault(ls, {})
+        fid_length = line_fids.get(cs)
+        if fid_length is None:
+            self.lock_read_(cs)
+            try:
+                fid_length = (self._db.get_fid_start(ls, cs),
+                              self._db.get_fid_incr(ls, cs),
+                              self._db.get_channel_length(ls, cs))
+            finally:
+                self.unlock_(cs)
+            line_fids[cs] = fid_length
+        return fid_length
+
     def line_name_symb(self, line, create=False):
         """
         Return line name, symbol
@@ -848,18 +1012,25 @@ class Geosoft_gdb(gxgeo.Geometry):
         if isinstance(line, Line):
             return line.name, line.symbol
 
-        elif isinstance(line, str):
+        name_symb = self._line_symbs.get(line)
+        if name_symb is not None:
+            return name_symb
+
+        if isinstance(line, str):
             if self.exist_symb_(line, gxapi.DB_SYMB_LINE):
                 symb = self._db.find_symb(line, gxapi.DB_SYMB_LINE)
-                return line, symb
-            if create:
+                name_symb = line, symb
+            elif create:
                 return line, self.new_line(line)
             else:
                 raise GdbException(_t('Line \'{}\' not found'.format(line)))
         else:
             sr = gxapi.str_ref()
             self._db.get_symb_name(line, sr)
-            return sr.value, line
+            name_symb = sr.value, line
+
+        self._line_symbs[line] = name_symb
+        return name_symb
 
     def channel_name_symb(self, chan):
         """
@@ -874,17 +1045,25 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         if isinstance(chan, Channel):
             return chan.name, chan.symbol
+
+        name_symb = self._chan_symbs.get(chan)
+        if name_symb is not None:
+            return name_symb
+
         if isinstance(chan, str):
             symb = self._db.find_symb(chan, gxapi.DB_SYMB_CHAN)
             if symb == -1:
                 raise GdbException(_t('Channel \'{}\' not found'.format(chan)))
-            return chan, symb
+            name_symb = chan, symb
+        else:
+            if not self.exist_symb_(chan, gxapi.DB_SYMB_CHAN):
+                raise GdbException(_t('Channel symbol \'{}\' not found'.format(chan)))
+            sr = gxapi.str_ref()
+            self._db.get_symb_name(chan, sr)
+            name_symb = sr.value, chan
 
-        if not self.exist_symb_(chan, gxapi.DB_SYMB_CHAN):
-            raise GdbException(_t('Channel symbol \'{}\' not found'.format(chan)))
-        sr = gxapi.str_ref()
-        self._db.get_symb_name(chan, sr)
-        return sr.value, chan
+        self._chan_symbs[chan] = name_symb
+        return name_symb
 
     def channel_width(self, channel):
         """
@@ -895,7 +1074,7 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         .. versionadded:: 9.1
         """
-        return self._get(self.channel_name_symb(channel)[1], self._db.get_col_va)
+        return self._channel_info(self.channel_name_symb(channel)[1])[0]
 
     def list_channels(self, chan=None):
         """
@@ -914,6 +1093,10 @@ class Geosoft_gdb(gxgeo.Geometry):
         .. versionadded:: 9.1
         """
 
+        cached = self._chan_lists.get(chan)
+        if cached is not None:
+            return dict(cached)
+
         def clean_chan_dict():
             """ returns list without any temporary VA sliced channels """
             self._db.chan_lst(self._lst)
@@ -946,7 +1129,8 @@ class Geosoft_gdb(gxgeo.Geometry):
         for k in dct:
             dct[k] = int(dct.get(k))
 
-        return dct
+        self._chan_lists[chan] = dct
+        return dict(dct)
 
     def lines(self, select=True):
         """
@@ -1122,7 +1306,7 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         .. versionadded:: 9.1
         """
-        return gxu.dtype_gx(self._db.get_chan_type(self.channel_name_symb(channel)[1]))
+        return gxu.dtype_gx(self._channel_info(self.channel_name_symb(channel)[1])[1])
 
     def channel_fid(self, line, channel):
         """
@@ -1134,16 +1318,7 @@ class Geosoft_gdb(gxgeo.Geometry):
         """
         ls = self.line_name_symb(line)[1]
         cs = self.channel_name_symb(channel)[1]
-        self.lock_read_(cs)
-
-        try:
-            fid_start = self._db.get_fid_start(ls, cs)
-            fid_incr = self._db.get_fid_incr(ls, cs)
-
-        finally:
-            self.unlock_(cs)
-
-        return fid_start, fid_incr
+        return self._channel_fid_length(ls, cs)[:2]
 
     # ========================================================================================
     # management
@@ -1185,6 +1360,7 @@ class Geosoft_gdb(gxgeo.Geometry):
                                                gxapi.DB_OWN_SHARED,
                                                gxu.gx_dtype(dtype),
                                                array)
+            self.clear_cache()
 
         if details:
             self.set_channel_details(symb, details)
@@ -1239,17 +1415,20 @@ class Geosoft_gdb(gxgeo.Geometry):
             if group:
                 Line(self, symb).group = group
 
-        self.clear_extent()
+        self.clear_cache()
 
         return symb
 
     def clear_extent(self):
         """
-        Clear the extent cache.
+        Clear the extent cache. Channel ranges are determined again from the data the next time
+        the `extent` is requested.
 
         .. versionadded:: 9.3.1
         """
-        self._extent['xyz'] = None
+        self._ranges = {}
+        self._ranges_written.clear()
+        self._ranges_changed = True
 
     def delete_channel(self, channels):
         """
@@ -1298,6 +1477,9 @@ class Geosoft_gdb(gxgeo.Geometry):
             self.unlock_(ls)
             self.lock_write_(ls)
             self._db.delete_symb(ls)
+            self.clear_cache()
+            self._ranges.pop(ls, None)
+            self._ranges_changed = True
 
     def delete_line_data(self, lines):
         """
@@ -1358,8 +1540,6 @@ class Geosoft_gdb(gxgeo.Geometry):
             else:
                 self._db.select(s, gxapi.DB_LINE_SELECT_EXCLUDE)
 
-        self.clear_extent()
-
     # =====================================================================================
     # reading and writing
 
@@ -1437,13 +1617,13 @@ class Geosoft_gdb(gxgeo.Geometry):
             if w == 1:
                 ch_names.append(cn)
                 ch_symbs.append(cs)
-                c_type.append(self._db.get_chan_type(cs))
+                c_type.append(self._channel_info(cs)[1])
             else:
                 for i in range(w):
                     ccn, ccs = self.channel_name_symb("{}[{}]".format(cn, i))
                     ch_names.append(ccn)
                     ch_symbs.append(ccs)
-                    c_type.append(self._db.get_chan_type(cs))
+                    c_type.append(self._channel_info(cs)[1])
 
         return ch_names, ch_symbs, c_type
 
@@ -1670,10 +1850,7 @@ class Geosoft_gdb(gxgeo.Geometry):
 
         ln, ls = self.line_name_symb(line)
         cs = self.channel_name_symb(channels[0])[1]
-        fid_start, fid_increment = self.channel_fid(ls, cs)
-        self.lock_read_(cs)
-        nrows = self.gxdb.get_channel_length(ls, cs)
-        self.unlock_(cs)
+        fid_start, fid_increment, nrows = self._channel_fid_length(ls, cs)
         if nrows == 0:
             fid_last = fid_start
         else:
@@ -1682,11 +1859,9 @@ class Geosoft_gdb(gxgeo.Geometry):
         for c in channels[1:]:
             cs = self.channel_name_symb(c)[1]
             n_width += self.channel_width(cs)
-            c_start, c_increment = self.channel_fid(ls, cs)
+            c_start, c_increment, c_length = self._channel_fid_length(ls, cs)
             if c_start != gxapi.rDUMMY:
-                self.lock_read_(cs)
-                c_last = c_start + c_increment * (self.gxdb.get_channel_length(ls, cs) - 1)
-                self.unlock_(cs)
+                c_last = c_start + c_increment * (c_length - 1)
                 if fid_start == gxapi.rDUMMY or c_start < fid_start:
                     fid_start = c_start
                 if fid_increment == gxapi.rDUMMY or c_increment < fid_increment:
@@ -1708,7 +1883,7 @@ class Geosoft_gdb(gxgeo.Geometry):
     def _num_rows_from_fid(cls, src_fid_start, src_fid_last, fid):
         return int((src_fid_last - fid[0])/fid[1] + 1.5)
 
-    def read_line(self, line, channels=None, dtype=None, fid=None, dummy=None):
+    def read_line(self, line, channels=None, dtype=None, fid=None, dummy=None, return_mask=False):
         """
         Read a line of data into a numpy array.
 
@@ -1724,7 +1899,13 @@ class Geosoft_gdb(gxgeo.Geometry):
             READ_REMOVE_DUMMYCOLUMNS remove columns with dummies
             ======================== ===================================================
 
-        :returns:   2D numpy array shape(records,channels), list of channel names, (fidStart,fidIncr)
+        :param return_mask: `True` to also return a boolean mask of the rows (or columns for
+                            READ_REMOVE_DUMMYCOLUMNS) of the line that were kept.
+
+        :returns:   2D numpy array shape(records,channels), list of channel names, (fidStart,fidIncr).
+                    If `return_mask` is `True` the mask is returned as a fourth item, and the fid is the
+                    fid of the line even when rows are removed, so the fiducial of each kept row can be
+                    recovered from ``fid[0] + fid[1] * np.nonzero(mask)[0]``.
         :raises:    GdbException if first channel requested is empty
 
         VA channels are expanded by element with channel names name[0], name[1], etc.
@@ -1749,7 +1930,13 @@ class Geosoft_gdb(gxgeo.Geometry):
             npd,ch,fid = gdb.read_line('L100',channels=['X','Y','Z'])    # read a list of channels to (n,3) array
             npd,ch,fid = gdb.read_line('L100','X',np.int32)              # read channel 'X' into integer array
 
+            # rows without dummies, and the fiducials of the rows that were kept
+            npd,ch,fid,mask = gdb.read_line('L100', dummy=gxdb.READ_REMOVE_DUMMYROWS, return_mask=True)
+            fids = fid[0] + fid[1] * np.nonzero(mask)[0]
+
         .. versionadded:: 9.1
+
+        .. versionchanged:: 2022.1 added `return_mask`, dummy removal is vectorized
         """
 
         ls = self.line_name_symb(line)[1]
@@ -1763,14 +1950,13 @@ class Geosoft_gdb(gxgeo.Geometry):
                 data = np.array([], dtype=dtype)
             else:
                 data = np.array([], dtype=dtype).reshape((-1, len(channels)))
+            if return_mask:
+                return data, channels, fid, np.ones(len(channels) if dummy == READ_REMOVE_DUMMYCOLUMNS else 0,
+                                                    dtype=bool)
             return data, channels, fid
 
         # read to a numpy array
         npd = np.empty((nrows, ncols), dtype=dtype)
-        if npd.dtype == np.float32 or npd.dtype == np.float64:
-            dummy_value = np.nan
-        else:
-            dummy_value = gxu.gx_dummy(npd.dtype)
 
         all_empty = True
         ch_names = []
@@ -1796,44 +1982,207 @@ class Geosoft_gdb(gxgeo.Geometry):
                 for i in range(w):
                     ch_names.append('{}[{}]'.format(cn, str(i)))
 
-        nch = len(ch_names)
-
         if all_empty:
             npd = np.empty((0, ncols), dtype=dtype)
+            mask = np.ones(ncols if dummy == READ_REMOVE_DUMMYCOLUMNS else 0, dtype=bool)
         elif dummy:
             # dummy handling
             if dummy == READ_REMOVE_DUMMYCOLUMNS:
-                n_ok = 0
-
-                # shift data and channel names to remove columns containing a dummy
-                for i in range(nch):
-                    if np.isnan(dummy_value):
-                        if np.isnan(npd[:, i]).any():
-                            continue
-                    elif dummy_value in npd[:, i]:
-                        continue
-                    if n_ok != i:
-                        npd[:, n_ok] = npd[:, i]
-                        ch_names[n_ok] = ch_names[i]
-                    n_ok += 1
-                if n_ok != nch:
-                    npd = npd[:, 0:n_ok]
-                    ch_names = ch_names[0:n_ok]
+                mask = ~_dummy_elements(npd).any(axis=0)
+                if not mask.all():
+                    npd = npd[:, mask]
+                    ch_names = [cn for cn, keep in zip(ch_names, mask) if keep]
 
             elif dummy == READ_REMOVE_DUMMYROWS:
-
-                if np.isnan(dummy_value):
-                    mask = np.apply_along_axis(lambda a: not (np.isnan(a).any()), 1, npd)
-                else:
-                    mask = np.apply_along_axis(lambda a: not (dummy_value in a), 1, npd)
-                npd = npd[mask, :]
-                fid = (0.0, 1.0)
+                mask = ~_dummy_elements(npd).any(axis=1)
+                if not mask.all():
+                    npd = npd[mask]
+                if not return_mask:
+                    fid = (0.0, 1.0)
 
             else:
                 raise GdbException(_t('Unrecognized dummy={}').format(dummy))
+        else:
+            mask = np.ones(nrows, dtype=bool)
 
+        if return_mask:
+            return npd, ch_names, fid, mask
         return npd, ch_names, fid
 
+    def read_all(self, channels=None, lines=None, dtype=None, fid=None, progress=None, stop=None):
+        """
+        Read channels from all lines into one contiguous array for each channel.
+
+        :param channels:    list of channels, strings or symbol number.  If empty, read all channels
+        :param lines:       list of lines, strings or symbol numbers, default is all selected lines
+        :param dtype:       numpy data type for all arrays, default is the data type of each channel.
+                            Use "<Unnn" for string type.
+        :param fid:         required fiducial as tuple (start,incr), default smallest in the data of each line
+        :param progress:    progress reporting function
+        :param stop:        stop check function, if it returns `True` only the lines read so far are returned
+
+        :returns:   (data, lines, offsets, fids):
+
+            ======= ===================================================================================
+            data    dictionary of numpy arrays by channel name, shape (rows,) for normal channels and
+                    (rows, width) for array channels
+            lines   list of line names, in the order the lines were read
+            offsets numpy array of len(lines) + 1 row offsets, the data of line i is in rows
+                    offsets[i]:offsets[i + 1] of every array
+            fids    list of the (fidStart,fidIncr) of each line
+            ======= ===================================================================================
+
+        As with `read_line`, channels in each line are resampled to the common fiducial of the line.
+        Line lengths are determined before any data is read so each array is allocated once and filled
+        in place.  Use slices of the arrays to work with the data of a single line without copies:
+
+        .. code::
+
+            data, lines, offsets, fids = gdb.read_all(['X', 'Y', 'Z'])
+            for i, line in enumerate(lines):
+                z = data['Z'][offsets[i]: offsets[i + 1]]
+
+        .. versionadded:: 2022.1
+        """
+
+        if lines is None:
+            lines = self.list_lines()
+        lines = [self.line_name_symb(ln) for ln in lines]
+        if channels is None:
+            channels = self.sorted_chan_list()
+        else:
+            channels = [self.channel_name_symb(c)[0] for c in self._to_string_chan_list(channels)]
+
+        chans = []
+        for c in channels:
+            cn, cs = self.channel_name_symb(c)
+            chans.append((cn, cs, self.channel_width(cs),
+                          np.dtype(self.channel_dtype(cs) if dtype is None else dtype)))
+
+        # first pass, rows in each line on the common fid of the line
+        line_rows = []
+        for ln, ls in lines:
+            fid_start, fid_incr, fid_last, ncols, _ = self.scan_line_fid(ls, channels)
+            line_fid = (fid_start, fid_incr) if fid is None else fid
+            nrows = self._num_rows_from_fid(fid_start, fid_last, line_fid) if ncols else 0
+            line_rows.append((line_fid, max(nrows, 0)))
+        total = sum(nrows for _, nrows in line_rows)
+
+        data = {}
+        for cn, cs, w, dt in chans:
+            data[cn] = np.empty((total,) if w == 1 else (total, w), dtype=dt)
+
+        # second pass, fill in place
+        line_names = []
+        offsets = [0]
+        fids = []
+        row = 0
+        for i, ((ln, ls), (line_fid, nrows)) in enumerate(zip(lines, line_rows)):
+            if nrows:
+                all_empty = True
+                for cn, cs, w, dt in chans:
+                    if w == 1:
+                        vd = self.read_channel_vv(ls, cs, dtype=dt)
+                    else:
+                        vd = self.read_channel_va(ls, cs, dtype=dt)
+                    if vd.length > 0:
+                        all_empty = False
+                    vd.refid(line_fid, nrows)
+                    data[cn][row: row + nrows] = vd.np
+                if not all_empty:
+                    row += nrows
+            line_names.append(ln)
+            offsets.append(row)
+            fids.append(line_fid)
+
+            if progress:
+                progress('Reading line {}'.format(ln), ((i + 1) * 100.0) / len(lines))
+            if stop:
+                if stop():
+                    break
+
+        if row < total:
+            for cn in data:
+                data[cn] = data[cn][:row]
+
+        return data, line_names, np.array(offsets, dtype=np.int64), fids
+
+    def iter_lines(self, channels=None, lines=None, prefetch=2, dtype=None, fid=None, dummy=None):
+        """
+        Iterate through lines, reading the next lines on a background thread while the caller
+        works with the current line.
+
+        :param channels:    list of channels, strings or symbol number.  If empty, read all channels
+        :param lines:       list of lines, strings or symbol numbers, default is all selected lines
+        :param prefetch:    maximum number of lines read ahead of the caller, which bounds the memory held
+                            by lines waiting to be processed. 0 reads each line when it is requested.
+        :param dtype:       numpy data type for the arrays, see `read_line`
+        :param fid:         required fiducial as tuple (start,incr), default smallest in the data of each line
+        :param dummy:       dummy handling, see `read_line`
+
+        :returns:   iterator of (line name, 2D numpy array, list of channel names, (fidStart,fidIncr)),
+                    one for each line in the order of `lines`.
+
+        GX resources belong to the thread that created them, so the background reader opens its own
+        GX context and a read-only session on the database file, and read-locks each channel while it
+        is read. The reader sees the data as last committed to the file; `commit` any changes made
+        through this instance before iterating. If the database file cannot be opened for reading
+        by another session, lines are read on the calling thread.
+
+        Examples:
+
+        .. code::
+
+            for line, npd, ch, fid in gdb.iter_lines(['X', 'Y', 'Z'], prefetch=4):
+                # ... work with the data while the next lines are being read ...
+
+        .. versionadded:: 2022.1
+        """
+
+        if lines is None:
+            lines = self.list_lines()
+        lines = [self.line_name_symb(ln)[0] for ln in lines]
+        if channels is None:
+            channels = self.sorted_chan_list()
+        else:
+            channels = [self.channel_name_symb(c)[0] for c in self._to_string_chan_list(channels)]
+        prefetch = int(prefetch)
+
+        def read_lines(first=0):
+            for line in lines[first:]:
+                npd, ch, line_fid = self.read_line(line, channels, dtype=dtype, fid=fid, dummy=dummy)
+                yield line, npd, ch, line_fid
+
+        if prefetch <= 0 or not self._file_name or len(lines) < 2:
+            yield from read_lines()
+            return
+
+        lines_queue = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        reader = threading.Thread(target=_prefetch_lines,
+                                  args=(self._file_name, lines, channels, dtype, fid, dummy, lines_queue, stop),
+                                  name='gdb_iter_lines', daemon=True)
+        reader.start()
+        n = 0
+        try:
+            while True:
+                kind, item = lines_queue.get()
+                if kind == 'line':
+                    n += 1
+                    yield item
+                elif kind == 'error':
+                    raise item
+                elif kind == 'failed':
+                    gx.gx().log(_t('iter_lines: reading on the calling thread, database cannot be shared ({})')
+                                .format(item))
+                    yield from read_lines(n)
+                    return
+                elif kind == 'done':
+                    return
+        finally:
+            stop.set()
+            reader.join()
+
     def read_line_dataframe(self, line, channels=None, fid=None):
         """
         Read a line of data into a Pandas DataFrame
@@ -1948,14 +2297,13 @@ class Geosoft_gdb(gxgeo.Geometry):
             else:
                 raise
 
-        if cn in self.xyz_channels:
-            self.clear_extent()
-
         self.lock_write_(cs)
         try:
             self._db.put_chan_vv(ls, cs, vv.gxvv)
         finally:
             self.unlock_(cs)
+            self._line_changed(ls)
+        self._channel_written(ls, cs, vv.np)
 
         if vv.unit_of_measure:
             Channel(self, cs).unit_of_measure = vv.unit_of_measure
@@ -1987,6 +2335,8 @@ class Geosoft_gdb(gxgeo.Geometry):
             self._db.put_chan_va(ls, cs, va.gxva)
         finally:
             self.unlock_(cs)
+            self._line_changed(ls)
+        self._channel_written(ls, cs)
 
         if va.unit_of_measure:
             Channel(self, cs).unit_of_measure = va.unit_of_measure
@@ -2025,9 +2375,6 @@ class Geosoft_gdb(gxgeo.Geometry):
         else:
             cn, cs = self.channel_name_symb(channel)
 
-        if cn in self.xyz_channels:
-            self.clear_extent()
-
         if _va_width(data) == 0:
             # no data to write
             return
@@ -2049,6 +2396,8 @@ class Geosoft_gdb(gxgeo.Geometry):
                 self._db.put_chan_vv(ls, cs, vv.gxvv)
             finally:
                 self.unlock_(cs)
+                self._line_changed(ls)
+            self._channel_written(ls, cs, data)
 
         else:
 
@@ -2060,6 +2409,8 @@ class Geosoft_gdb(gxgeo.Geometry):
                 self._db.put_chan_va(ls, cs, va.gxva)
             finally:
                 self.unlock_(cs)
+                self._line_changed(ls)
+            self._channel_written(ls, cs)
 
         if unit_of_measure:
             Channel(self, cs).unit_of_measure = unit_of_measure
@@ -2395,6 +2746,7 @@ class Channel:
             if self.gdb.exist_symb_(name, gxapi.DB_SYMB_CHAN):
                 raise GdbException(_t('Cannot rename to an existing channel name \'{}\''.format(name)))
             self.lock_set_(self.gdb.gxdb.set_chan_name, name)
+            self.gdb.clear_cache()
 
     @property
     def symbol(self):
@@ -2603,7 +2955,10 @@ class Channel:
             raise GdbException(_t("Cannot delete protected channel '{}'".format(self.name)))
         self.lock = SYMBOL_LOCK_WRITE
         self.gdb.gxdb.delete_symb(self._symb)
+        for line_ranges in self.gdb._ranges.values():
+            line_ranges.pop(self._symb, None)
         self._symb = gxapi.NULLSYMB
+        self.gdb.clear_cache()
 
 
 class Line:
@@ -2640,6 +2995,7 @@ class Line:
             fn(self._symb, v)
         finally:
             self.gdb.unlock_(self._symb)
+            self.gdb.clear_cache()
 
     def __repr__(self):
         return "{}({})".format(self.__class__, self.__dict__)
@@ -0,0 +1,529 @@
+"""
+Pure Python access to Geosoft GRD grid files.
+
+Geosoft GRD files have a 512-byte header followed by the grid data. Uncompressed grids are
+exposed as a `numpy.memmap` so that data is only read from disk as it is accessed. Compressed
+grids can be read, in which case the data is decompressed into memory. Grids are always written
+uncompressed.
+
+This module depends only on numpy and the Python standard library and does not require the
+Geosoft native libraries, which makes it suitable for headless workers that only need to read
+or write grid values.
+
+:Classes:
+    :`GrdFile`: Geosoft GRD file
+
+:Constants:
+   :FILE_READ:       0 open for read, files are not changed
+   :FILE_READWRITE:  1 open for read and write, data can be changed
+   :FILE_NEW:        2 new grid file, accompanied by `overwrite=` parameter
+
+.. seealso:: :mod:`geosoft.gxpy.grid`
+
+.. note::
+
+    Regression tests provide usage examples:
+    `Tests <https://github.com/GeosoftInc/gxpy/blob/master/geosoft/gxpy/tests/test_grd_file.py>`_
+
+.. versionadded:: 2022.1
+"""
+import os
+import struct
+import zlib
+import numpy as np
+
+import geosoft
+
+__version__ = geosoft.__version__
+
+FILE_READ = 0
+FILE_READWRITE = 1
+FILE_NEW = 2
+
+HEADER_SIZE = 512  #: size of the GRD file header in bytes
+
+_COMPRESSED = 1024
+_COMPRESSION_MAGIC = -119023417
+_COMPRESSION_ZLIB = 2
+_SIGN_UNSIGNED = 0
+_SIGN_SIGNED = 1
+_SIGN_FLOAT = 2
+_SIGN_COLOR = 3
+
+_DUMMY = {np.dtype(np.int8): -127,
+          np.dtype(np.uint8): 255,
+          np.dtype(np.int16): -32767,
+          np.dtype(np.uint16): 65535,
+          np.dtype(np.int32): -2147483647,
+          np.dtype(np.uint32): 4294967295,
+          np.dtype(np.float32): np.float32(-1.0e32),
+          np.dtype(np.float64): -1.0e32}
+
+
+class GrdFileException(geosoft.GXRuntimeError):
+    """
+    Exceptions from :mod:`geosoft.gxpy.grd_file`.
+
+    .. versionadded:: 2022.1
+    """
+    pass
+
+
+def _dtype_from_header(es, sf):
+    es = es % _COMPRESSED
+    if sf == _SIGN_FLOAT:
+        types = {4: np.float32, 8: np.float64}
+    elif sf == _SIGN_SIGNED:
+        types = {1: np.int8, 2: np.int16, 4: np.int32}
+    elif sf == _SIGN_COLOR:
+        types = {4: np.uint32}
+    else:
+        types = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+    if es not in types:
+        raise GrdFileException('Unsupported GRD element size {} and sign flag {}'.format(es, sf))
+    return np.dtype(types[es]).newbyteorder('<')
+
+
+def _header_from_dtype(dtype, is_color=False):
+    dtype = np.dtype(dtype)
+    if np.dtype(dtype.char) not in _DUMMY:
+        raise GrdFileException('Unsupported data type {}'.format(dtype))
+    if is_color:
+        if dtype.itemsize != 4:
+            raise GrdFileException('Color grids must be 4-byte, not {}'.format(dtype))
+        return 4, _SIGN_COLOR
+    if dtype.kind == 'f':
+        return dtype.itemsize, _SIGN_FLOAT
+    if dtype.kind == 'i':
+        return dtype.itemsize, _SIGN_SIGNED
+    return dtype.itemsize, _SIGN_UNSIGNED
+
+
+def read_header(file_name):
+    """
+    Read the header of a GRD file.
+
+    :param file_name:   GRD file name
+    :returns:           dictionary of header values, keyed by the names in the Geosoft GRD
+                        format specification: 'ES', 'SF', 'NE', 'NV', 'KX', 'DE', 'DV', 'X0',
+                        'Y0', 'ROT', 'ZBASE', 'ZMULT', 'LABEL', 'MAPNO', 'PROJ', 'UNITX',
+                        'UNITY', 'UNITZ', 'NVPTS', 'IZMIN', 'IZMAX', 'IZMED', 'IZMEA',
+                        'ZVAR', 'PRCS' and 'USER'.
+
+    .. versionadded:: 2022.1
+    """
+
+    with open(file_name, 'rb') as f:
+        b = f.read(HEADER_SIZE)
+    if len(b) < HEADER_SIZE:
+        raise GrdFileException('"{}" is too short to be a GRD file'.format(file_name))
+
+    h = dict(zip(('ES', 'SF', 'NE', 'NV', 'KX'), struct.unpack('<5i', b[0:20])))
+    h.update(zip(('DE', 'DV', 'X0', 'Y0', 'ROT', 'ZBASE', 'ZMULT'), struct.unpack('<7d', b[20:76])))
+    h['LABEL'] = b[76:124]
+    h['MAPNO'] = b[124:140]
+    h.update(zip(('PROJ', 'UNITX', 'UNITY', 'UNITZ', 'NVPTS'), struct.unpack('<5i', b[140:160])))
+    h.update(zip(('IZMIN', 'IZMAX', 'IZMED', 'IZMEA'), struct.unpack('<4f', b[160:176])))
+    h['ZVAR'], = struct.unpack('<d', b[176:184])
+    h['PRCS'], = struct.unpack('<i', b[184:188])
+    h['USER'] = b[188:HEADER_SIZE]
+
+    if (h['ES'] % _COMPRESSED) not in (1, 2, 4, 8) or h['ES'] > (_COMPRESSED + 8) or \
+            h['KX'] not in (1, -1) or h['NE'] <= 0 or h['NV'] <= 0:
+        raise GrdFileException('"{}" is not a supported GRD file'.format(file_name))
+
+    return h
+
+
+def _header_bytes(h):
+    b = struct.pack('<5i', h['ES'], h['SF'], h['NE'], h['NV'], h['KX'])
+    b += struct.pack('<7d', h['DE'], h['DV'], h['X0'], h['Y0'], h['ROT'], h['ZBASE'], h['ZMULT'])
+    b += h['LABEL'].ljust(48, b'\x00')[:48] + h['MAPNO'].ljust(16, b'\x00')[:16]
+    b += struct.pack('<5i', h['PROJ'], h['UNITX'], h['UNITY'], h['UNITZ'], h['NVPTS'])
+    b += struct.pack('<4f', h['IZMIN'], h['IZMAX'], h['IZMED'], h['IZMEA'])
+    b += struct.pack('<di', h['ZVAR'], h['PRCS'])
+    b += h['USER'].ljust(HEADER_SIZE - 188, b'\x00')[:HEADER_SIZE - 188]
+    return b
+
+
+class GrdFile:
+    """
+    Geosoft GRD file, with data exposed as numpy arrays.
+
+    Instances should be created using one of the class methods:
+
+        :meth:`open`
+        :meth:`new`
+        :meth:`from_data_array`
+
+    Grid data is indexed [row, column] from the grid origin, as with `geosoft.gxpy.grid.Grid`.
+    Indexing a `GrdFile` returns float64 data for the selection with dummies replaced by `numpy.nan`
+    and the GRD data scaling applied. The stored values, including dummies, are available from
+    :attr:`raw`, which is a `numpy.memmap` for uncompressed grids.
+
+    *Example*
+
+    .. code::
+
+        import geosoft.gxpy.grd_file as gxgrdf
+
+        with gxgrdf.GrdFile.open('some_grid.grd') as grd:
+            print(grd.properties())
+            first_row = grd[0]
+            window = grd[100:200, 50:150]
+
+    .. versionadded:: 2022.1
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self.__dict__)
+
+    def __str__(self):
+        return self._file_name
+
+    def __init__(self, file_name, header, raw, mode):
+        self._file_name = file_name
+        self._header = header
+        self._raw = raw
+        self._mode = mode
+        self._dtype = _dtype_from_header(header['ES'], header['SF'])
+        self._dummy = _DUMMY[np.dtype(self._dtype.char)]
+
+    @classmethod
+    def open(cls, file_name, mode=FILE_READ):
+        """
+        Open an existing GRD file.
+
+        :param file_name:   GRD file name
+        :param mode:        `FILE_READ` or `FILE_READWRITE`. Compressed grids can only be read.
+
+        .. versionadded:: 2022.1
+        """
+
+        h = read_header(file_name)
+        dtype = _dtype_from_header(h['ES'], h['SF'])
+        shape = (h['NV'], h['NE'])
+
+        if h['ES'] > _COMPRESSED:
+            if mode != FILE_READ:
+                raise GrdFileException('Compressed grid "{}" can only be opened FILE_READ'.format(file_name))
+            raw = _read_compressed(file_name, dtype, shape)
+        else:
+            if os.path.getsize(file_name) < HEADER_SIZE + shape[0] * shape[1] * dtype.itemsize:
+                raise GrdFileException('"{}" is shorter than the grid size in the header'.format(file_name))
+            raw = np.memmap(file_name, dtype=dtype, mode='r+' if mode == FILE_READWRITE else 'r',
+                            offset=HEADER_SIZE, shape=shape)
+
+        return cls(file_name, h, raw, mode)
+
+    @classmethod
+    def new(cls, file_name, properties, overwrite=False):
+        """
+        Create a new uncompressed GRD file filled with dummies.
+
+        :param file_name:   GRD file name
+        :param properties:  grid properties dictionary, as returned by `properties()` or
+                            `geosoft.gxpy.grid.Grid.properties()`. 'nx' and 'ny' are required,
+                            'dtype' defaults to float32, 'x0', 'y0', 'rot' default to 0 and
+                            'dx', 'dy' default to 1.
+        :param overwrite:   True to overwrite an existing file
+
+        .. versionadded:: 2022.1
+        """
+
+        if not overwrite and os.path.isfile(file_name):
+            raise GrdFileException('Cannot overwrite existing grid "{}"'.format(file_name))
+
+        nx = int(properties['nx'])
+        ny = int(properties['ny'])
+        if nx <= 0 or ny <= 0:
+            raise GrdFileException('Invalid grid dimensions ({}, {})'.format(nx, ny))
+        dtype = np.dtype(properties.get('dtype') or np.float32)
+        es, sf = _header_from_dtype(dtype, bool(properties.get('is_color', False)))
+        dx = properties.get('dx')
+        dy = properties.get('dy', dx)
+
+        h = {'ES': es, 'SF': sf, 'NE': nx, 'NV': ny, 'KX': 1,
+             'DE': float(dx or 1.), 'DV': float(dy or 1.),
+             'X0': float(properties.get('x0') or 0.), 'Y0': float(properties.get('y0') or 0.),
+             'ROT': -float(properties.get('rot') or 0.),
+             'ZBASE': 0., 'ZMULT': 1., 'LABEL': b'', 'MAPNO': b'',
+             'PROJ': 0, 'UNITX': 0, 'UNITY': 0, 'UNITZ': 0, 'NVPTS': 0,
+             'IZMIN': -1.0e32, 'IZMAX': -1.0e32, 'IZMED': -1.0e32, 'IZMEA': -1.0e32,
+             'ZVAR': 0., 'PRCS': 0, 'USER': b''}
+
+        dtype = _dtype_from_header(es, sf)
+        with open(file_name, 'wb') as f:
+            f.write(_header_bytes(h))
+            f.truncate(HEADER_SIZE + nx * ny * dtype.itemsize)
+        raw = np.memmap(file_name, dtype=dtype, mode='r+', offset=HEADER_SIZE, shape=(ny, nx))
+        raw[:] = _DUMMY[np.dtype(dtype.char)]
+
+        return cls(file_name, h, raw, FILE_NEW)
+
+    @classmethod
+    def from_data_array(cls, data, file_name, properties=None, overwrite=False):
+        """
+        Create a new GRD file from a 2D numpy array.
+
+        :param data:        2D numpy array, numpy.nan values are written as dummies
+        :param file_name:   GRD file name
+        :param properties:  grid properties dictionary, 'nx' and 'ny' are taken from the data and
+                            'dtype' defaults to the data type.
+        :param overwrite:   True to overwrite an existing file
+
+        .. versionadded:: 2022.1
+        """
+
+        data = np.asarray(data)
+        if data.ndim != 2:
+            raise GrdFileException('Data must be 2D, not {}D'.format(data.ndim))
+        properties = dict(properties or {})
+        properties['ny'], properties['nx'] = data.shape
+        if properties.get('dtype') is None:
+            properties['dtype'] = data.dtype
+
+        grd = cls.new(file_name, properties, overwrite=overwrite)
+        grd[:, :] = data
+        return grd
+
+    def close(self):
+        """
+        Close the grid. If the grid was changed the header statistics are updated.
+
+        .. versionadded:: 2022.1
+        """
+
+        if self._raw is None:
+            return
+        if self._mode != FILE_READ:
+            self._update_statistics()
+            self._raw.flush()
+            with open(self._file_name, 'r+b') as f:
+                f.write(_header_bytes(self._header))
+        self._raw = None
+
+    def _update_statistics(self):
+        valid = 0
+        total = 0.
+        total_sq = 0.
+        zmin = np.inf
+        zmax = -np.inf
+        for r0 in range(0, self.ny, 1024):
+            z = self[r0: r0 + 1024].ravel()
+            z = z[~np.isnan(z)]
+            if len(z):
+                valid += len(z)
+                total += z.sum()
+                total_sq += np.square(z).sum()
+                zmin = min(zmin, z.min())
+                zmax = max(zmax, z.max())
+        h = self._header
+        h['NVPTS'] = int(valid)
+        if valid:
+            mean = total / valid
+            h['IZMIN'] = zmin
+            h['IZMAX'] = zmax
+            h['IZMEA'] = mean
+            h['ZVAR'] = max(0., total_sq / valid - mean * mean)
+        else:
+            h['IZMIN'] = h['IZMAX'] = h['IZMEA'] = -1.0e32
+            h['ZVAR'] = 0.
+        h['IZMED'] = -1.0e32
+
+    @property
+    def file_name(self):
+        """grid file name"""
+        return self._file_name
+
+    @property
+    def header(self):
+        """dictionary of GRD header values, see `read_header`"""
+        return dict(self._header)
+
+    @property
+    def is_compressed(self):
+        """True if the grid data is compressed"""
+        return self._header['ES'] > _COMPRESSED
+
+    @property
+    def is_color(self):
+        """True if the grid contains colors"""
+        return self._header['SF'] == _SIGN_COLOR
+
+    @property
+    def dtype(self):
+        """numpy data type of the stored grid data"""
+        return self._dtype
+
+    @property
+    def dummy(self):
+        """dummy value of the stored grid data"""
+        return self._dummy
+
+    @property
+    def nx(self):
+        """number of grid columns"""
+        return self._header['NE'] if self._header['KX'] == 1 else self._header['NV']
+
+    @property
+    def ny(self):
+        """number of grid rows"""
+        return self._header['NV'] if self._header['KX'] == 1 else self._header['NE']
+
+    @property
+    def shape(self):
+        """grid shape (ny, nx)"""
+        return self.ny, self.nx
+
+    @property
+    def x0(self):
+        """grid origin x"""
+        return self._header['X0']
+
+    @property
+    def y0(self):
+        """grid origin y"""
+        return self._header['Y0']
+
+    @property
+    def dx(self):
+        """grid separation in the x direction"""
+        return self._header['DE'] if self._header['KX'] == 1 else self._header['DV']
+
+    @property
+    def dy(self):
+        """grid separation in the y direction"""
+        return self._header['DV'] if self._header['KX'] == 1 else self._header['DE']
+
+    @property
+    def rot(self):
+        """grid rotation angle, degrees azimuth, consistent with `geosoft.gxpy.grid.Grid.rot`"""
+        return -self._header['ROT']
+
+    @property
+    def raw(self):
+        """
+        Stored grid data as a 2D (ny, nx) numpy array, including dummies and without scaling.
+        This is a `numpy.memmap` for uncompressed grids, and can be changed if the grid is writable.
+        """
+        if self._raw is None:
+            raise GrdFileException('Grid "{}" is closed'.format(self._file_name))
+        if self._header['KX'] == -1:
+            return self._raw.T
+        return self._raw
+
+    def properties(self):
+        """
+        Get the grid properties dictionary, with the same keys as `geosoft.gxpy.grid.Grid.properties()`.
+        The coordinate system is not read and is always None.
+
+        .. versionadded:: 2022.1
+        """
+
+        return {'nx': self.nx,
+                'ny': self.ny,
+                'x0': self.x0,
+                'y0': self.y0,
+                'dx': self.dx,
+                'dy': self.dy,
+                'rot': self.rot,
+                'is_color': self.is_color,
+                'dtype': np.dtype(self.dtype.char),
+                'gridtype': 'GRD',
+                'decoration': '',
+                'unit_of_measure': '',
+                'coordinate_system': None}
+
+    def np(self, dtype=None):
+        """
+        Return the grid data as a numpy array in memory.
+
+        :param dtype:   data type, default float64. Dummies are numpy.nan for float types and the
+                        data type dummy for integer types. Color grids return the stored values.
+
+        .. versionadded:: 2022.1
+        """
+
+        if self.is_color:
+            return np.array(self.raw, dtype=dtype or self.dtype.char)
+        data = self[:, :]
+        if dtype is None or np.dtype(dtype).kind == 'f':
+            return data.astype(dtype or np.float64, copy=False)
+        dtype = np.dtype(dtype)
+        nan_mask = np.isnan(data)
+        with np.errstate(invalid='ignore'):
+            data = data.astype(dtype)
+        data[nan_mask] = _DUMMY[dtype]
+        return data
+
+    def __getitem__(self, item):
+        raw = np.asarray(self.raw[item])
+        if self.is_color:
+            return raw
+        data = raw.astype(np.float64)
+        data[raw == self._dummy] = np.nan
+        zmult = self._header['ZMULT']
+        zbase = self._header['ZBASE']
+        if zmult != 1. and zmult != 0.:
+            data /= zmult
+        if zbase != 0.:
+            data += zbase
+        return data
+
+    def __setitem__(self, item, value):
+        if self._mode == FILE_READ:
+            raise GrdFileException('Grid "{}" is read-only'.format(self._file_name))
+        value = np.asarray(value)
+        if self.is_color or value.dtype.kind not in 'fc':
+            self.raw[item] = value
+            return
+        value = np.array(value, dtype=np.float64)
+        nan_mask = np.isnan(value)
+        zmult = self._header['ZMULT']
+        zbase = self._header['ZBASE']
+        if zbase != 0.:
+            value -= zbase
+        if zmult != 1. and zmult != 0.:
+            value *= zmult
+        if self.dtype.kind != 'f':
+            np.rint(value, out=value)
+        with np.errstate(invalid='ignore'):
+            value = value.astype(self.dtype)
+        value[nan_mask] = self._dummy
+        self.raw[item] = value
+
+
+def _read_compressed(file_name, dtype, shape):
+    nv, ne = shape
+    data = np.empty(shape, dtype=dtype)
+    with open(file_name, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        magic, method, n_blocks, vectors_per_block = struct.unpack('<4i', f.read(16))
+        if magic != _COMPRESSION_MAGIC:
+            raise GrdFileException('"{}" has an invalid compression header'.format(file_name))
+        if method != _COMPRESSION_ZLIB:
+            raise GrdFileException('"{}" compression method {} is not supported'.format(file_name, method))
+        offsets = struct.unpack('<{}q'.format(n_blocks), f.read(8 * n_blocks))
+        sizes = struct.unpack('<{}i'.format(n_blocks), f.read(4 * n_blocks))
+
+        v0 = 0
+        for offset, size in zip(offsets, sizes):
+            nvb = min(vectors_per_block, nv - v0)
+            f.seek(offset)
+            # each block has a 16-byte block header before the zlib stream
+            block = zlib.decompress(f.read(size)[16:])
+            if len(block) != nvb * ne * dtype.itemsize:
+                raise GrdFileException('"{}" has a corrupt compressed block'.format(file_name))
+            data[v0: v0 + nvb] = np.frombuffer(block, dtype=dtype).reshape(nvb, ne)
+            v0 += nvb
+
+    if v0 != nv:
+        raise GrdFileException('"{}" compressed data is incomplete'.format(file_name))
+    return data
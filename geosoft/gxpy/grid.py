@@ -3,12 +3,16 @@ Geosoft grid and image handling, including all
 `supported file formats <https://geosoftgxdev.atlassian.net/wiki/display/GXDEV92/Grid+File+Name+Decorations>`_ .
 
 :Classes:
-    :`Grid`: grid dataset
+    :`Grid`:            grid dataset
+    :`GridArray`:       lazy tiled numpy view of grid data
+    :`GridRowWriter`:   streaming writer of blocks of rows
 
 :Constants:
    :FILE_READ:       0 open for read, files are not changed
    :FILE_READWRITE:  1 open for read and write, files can be changed
    :FILE_NEW:        2 new grid file, accompanied by `overwrite=` parameter
+   :OVERVIEW_MEAN:    0 overview cells are the mean of valid cells
+   :OVERVIEW_NEAREST: 1 overview cells are the nearest grid cell
 
 .. seealso:: :mod:`geosoft.gxpy.grid_utility`, :mod:`geosoft.gxpy.grid_fft`,
     :class:`geosoft.gxapi.GXIMG`, :class:`geosoft.gxapi.GXIMU`
@@ -20,8 +24,13 @@ Geosoft grid and image handling, including all
 
 """
 import os
+import struct
+import threading
+import zlib
 import numpy as np
 import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import geosoft
 import geosoft.gxapi as gxapi
@@ -35,6 +44,7 @@ from . import map as gxmap
 from . import grid_utility as gxgrdu
 from . import view as gxview
 from . import gdb as gxgdb
+from . import grd_file as gxgrdf
 
 __version__ = geosoft.__version__
 
@@ -43,6 +53,14 @@ FILE_READ = 0
 FILE_READWRITE = 1
 FILE_NEW = 2
 
+BULK_BLOCK_BYTES = 16 * 1024 * 1024  #: target size of a staging block for bulk grid reads and writes
+
+OVERVIEW_MEAN = 0
+OVERVIEW_NEAREST = 1
+OVERVIEW_MIN_SIZE = 256  #: overview levels are built until the grid fits in this many cells
+
+POOL_IDLE_HANDLES = 50  #: idle read-only grid handles kept open for reuse by `Grid.open_pooled`
+
 
 def _t(s):
     return geosoft.gxpy.system.translate(s)
@@ -166,6 +184,7 @@ def delete_files(file_name):
         fn = name_parts(file_name)
         file_name = os.path.join(fn[0], fn[1])
         ext = fn[3]
+        _handle_pool.invalidate(file_name)
         gxu.delete_file(file_name)
         gxu.delete_file(file_name + '.gi')
         gxu.delete_file(file_name + '.xml')
@@ -181,17 +200,276 @@ def delete_files(file_name):
             for i in range(16):
                 gxu.delete_file(file_name + str(i))
 
+        # overviews
+        _delete_overviews(file_name)
+
+
+def _file_stamp(file_name):
+    try:
+        st = os.stat(file_name)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class _HandlePool:
+    """
+    Process-wide pool of read-only native grid handles, shared by reference count among `Grid` instances
+    opened with `Grid.open_pooled`, and keyed on the decorated file name and data type.
+
+    Handles that are no longer referenced stay open for reuse, up to `POOL_IDLE_HANDLES` least-recently
+    used handles. A handle is not reused once the file has been committed by a writer in this process,
+    or if the file modification time or size has changed. Native handles belong to the GX context of the
+    thread that opened them, so each thread keeps its own handles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = {}
+        self._local = threading.local()
+
+    def _thread(self):
+        local = self._local
+        if not hasattr(local, 'idle'):
+            local.idle = OrderedDict()
+            local.in_use = {}
+            local.opened = 0
+            local.reused = 0
+        return local
+
+    def _current(self, path, stamp, generation):
+        with self._lock:
+            return (generation == self._generation.get(path, 0)) and (stamp == _file_stamp(path))
+
+    def acquire(self, file_name, gxtype):
+        """
+        Return a read-only `geosoft.gxapi.GXIMG` for a grid and a pool entry to release it.
+        """
+        path, fn, _, _, decoration = name_parts(file_name)
+        path = os.path.normcase(os.path.join(path, fn))
+        key = (path, decoration.upper(), gxtype)
+        local = self._thread()
+
+        entry = local.in_use.get(key)
+        if entry is not None and not self._current(path, entry['stamp'], entry['generation']):
+            # users of the old handle keep it until they release it
+            del local.in_use[key]
+            entry = None
+
+        if entry is None:
+            entry = local.idle.pop(key, None)
+            if entry is not None and not self._current(path, entry['stamp'], entry['generation']):
+                entry = None
+            if entry is None:
+                with self._lock:
+                    generation = self._generation.get(path, 0)
+                stamp = _file_stamp(path)
+                img = gxapi.GXIMG.create_file(gxtype, file_name, gxapi.IMG_FILE_READONLY)
+                entry = {'key': key, 'img': img, 'count': 0, 'stamp': stamp, 'generation': generation}
+                local.opened += 1
+            else:
+                local.reused += 1
+            local.in_use[key] = entry
+        else:
+            local.reused += 1
+
+        entry['count'] += 1
+        return entry['img'], entry
+
+    def release(self, entry):
+        """Release a handle returned by `acquire`."""
+        entry['count'] -= 1
+        if entry['count'] > 0:
+            return
+        local = self._thread()
+        key = entry['key']
+        if local.in_use.get(key) is entry:
+            del local.in_use[key]
+            if self._current(key[0], entry['stamp'], entry['generation']):
+                local.idle[key] = entry
+                while len(local.idle) > max(0, POOL_IDLE_HANDLES):
+                    local.idle.popitem(last=False)
+
+    def invalidate(self, file_name):
+        """Stop reusing handles to a grid file, called when the file is changed or deleted."""
+        path, fn, _, _, _ = name_parts(file_name)
+        path = os.path.normcase(os.path.join(path, fn))
+        with self._lock:
+            self._generation[path] = self._generation.get(path, 0) + 1
+        local = self._thread()
+        for key in [k for k in local.idle if k[0] == path]:
+            del local.idle[key]
+
+    def clear(self):
+        """Close the idle handles of this thread."""
+        self._thread().idle.clear()
+
+    def statistics(self):
+        """Handle counts for this thread."""
+        local = self._thread()
+        return {'opened': local.opened,
+                'reused': local.reused,
+                'in_use': len(local.in_use),
+                'idle': len(local.idle)}
+
+
+_handle_pool = _HandlePool()
+
+
+def clear_handle_pool():
+    """
+    Close idle read-only grid handles kept for reuse by `Grid.open_pooled` in this thread.
+
+    .. versionadded:: 2022.1
+    """
+    _handle_pool.clear()
+
+
+def handle_pool_statistics():
+    """
+    Return a dictionary of grid handle pool counts for this thread:
+
+        ========== ===================================================
+        'opened'   native handles opened by the pool
+        'reused'   times a pooled handle was shared or reused
+        'in_use'   handles in use by open `Grid` instances
+        'idle'     handles kept open for reuse
+        ========== ===================================================
+
+    .. versionadded:: 2022.1
+    """
+    return _handle_pool.statistics()
+
+
+gx._register_close_hook(clear_handle_pool)
+
+
+def _statistics_dict(gxst):
+    # statistics dictionary from an accumulated GXST
+
+    def get_st(what):
+        v = gxst.get_info(what)
+        if v == gxapi.rDUMMY:
+            return None
+        return v
+
+    st = {'min': get_st(gxapi.ST_MIN),
+          'max': get_st(gxapi.ST_MAX),
+          'mean': get_st(gxapi.ST_MEAN),
+          'geometric_mean': get_st(gxapi.ST_GEOMEAN),
+          'variance': get_st(gxapi.ST_VARIANCE),
+          'sd': get_st(gxapi.ST_STDDEV),
+          'skew': get_st(gxapi.ST_SKEW),
+          'kurtosis': get_st(gxapi.ST_KURTOSIS),
+          'sum': get_st(gxapi.ST_SUM),
+          'sum_power_2': get_st(gxapi.ST_SUM2),
+          'sum_power_3': get_st(gxapi.ST_SUM3),
+          'sum_power_4': get_st(gxapi.ST_SUM4),
+          'num_data': get_st(gxapi.ST_ITEMS),
+          'num_dummy': get_st(gxapi.ST_DUMMIES)
+          }
+
+    return st
+
+
+def _window_origin(grd, col0, row0):
+    # plane location of grid index (col0, row0), the origin of a window
+    if grd.rot == 0.0:
+        return grd.x0 + grd.dx * col0, grd.y0 + grd.dy * row0
+    dx = grd.dx * col0
+    dy = grd.dy * row0
+    cos, sin = grd.rotation_cos_sine
+    return grd.x0 - dx * cos - dy * sin, grd.y0 - dy * cos + dx * sin
+
+
+_OVERVIEW_METHOD_NAMES = {OVERVIEW_MEAN: 'mean', OVERVIEW_NEAREST: 'nearest'}
+
+
+def _overview_name(file_name, level, method):
+    # the overview method is part of the name
+    return '{}.ovr{}.{}.grd'.format(file_name, level, _OVERVIEW_METHOD_NAMES[method])
+
+
+def _delete_overviews(file_name):
+    for method in _OVERVIEW_METHOD_NAMES:
+        for level in range(1, 32):
+            ovr = _overview_name(file_name, level, method)
+            gxu.delete_file(ovr)
+            gxu.delete_file(ovr + '.gi')
+            gxu.delete_file(ovr + '.xml')
+
+
+def _decimate(data, method, count=None):
+    # Reduce a block of rows by 2 in each dimension. For the mean, count is the number of valid
+    # full resolution cells in each cell, None for full resolution data, and the mean is returned
+    # with the counts of the reduced cells so that each level is the mean of valid grid cells.
+    if method == OVERVIEW_NEAREST:
+        return data[::2, ::2], None
+    if count is None:
+        count = (~np.isnan(data)).astype(np.int32)
+    ny, nx = data.shape
+    if (ny % 2) or (nx % 2):
+        pad = ((0, ny % 2), (0, nx % 2))
+        data = np.pad(data, pad, mode='constant', constant_values=np.nan)
+        count = np.pad(count, pad, mode='constant', constant_values=0)
+    shape = (data.shape[0] // 2, 2, data.shape[1] // 2, 2)
+    sums = (np.where(count > 0, data, 0.) * count).reshape(shape).sum(axis=(1, 3))
+    count = count.reshape(shape).sum(axis=(1, 3), dtype=np.int32)
+    result = np.full(count.shape, np.nan)
+    np.divide(sums, count, out=result, where=count > 0)
+    return result, count
+
 
 def _transform_color_int_to_rgba(np_values):
-    np_values[np_values == gxapi.iDUMMY] = 0
-    a = (np.right_shift(np_values, 24) & 0xFF).astype(np.uint8)
-    b = (np.right_shift(np_values, 16) & 0xFF).astype(np.uint8)
-    g = (np.right_shift(np_values, 8) & 0xFF).astype(np.uint8)
-    r = (np_values & 0xFF).astype(np.uint8)
+    # Colour ints are 0xAABBGGRR, which are RGBA bytes in little-endian memory, so the result is a
+    # uint8 view of the int memory, converted in place if the values are little-endian int32.
+    np_values = np.asarray(np_values).astype('<i4', copy=False)
+    rgba = np_values.view(np.uint8).reshape(np_values.shape + (4,))
+    dummy = np_values == gxapi.iDUMMY
     # the values for color grids actually do not contain alphas but just
     # 0 or 1 to indicate if the color is valid or not
-    a[a > 0] = 255
-    return np.array([r, g, b, a]).transpose()
+    alpha = rgba[..., 3]
+    np.copyto(alpha, 255, where=alpha > 0)
+    rgba[dummy] = 0
+    return rgba
+
+
+def _transform_rgba_to_color_int(rgba):
+    # RGB or RGBA bytes to colour ints, transparent colours are dummies
+    rgba = np.asarray(rgba)
+    if rgba.ndim < 1 or rgba.shape[-1] not in (3, 4):
+        raise GridException(_t('RGBA data must have 3 or 4 bytes per colour, not shape {}').format(rgba.shape))
+    values = np.empty(rgba.shape[:-1], dtype='<i4')
+    color = values.view(np.uint8).reshape(rgba.shape[:-1] + (4,))
+    color[..., :3] = rgba[..., :3]
+    if rgba.shape[-1] == 4:
+        valid = rgba[..., 3] > 0
+        color[..., 3] = valid
+        values[~valid] = gxapi.iDUMMY
+    else:
+        color[..., 3] = 1
+    return values
+
+
+def _png_bytes(image):
+    # PNG encoding of an image shaped (rows, columns, 3 or 4) of uint8 RGB or RGBA
+    h, w, c = image.shape
+    raw = np.empty((h, 1 + w * c), dtype=np.uint8)
+    raw[:, 0] = 0  # no filter
+    raw[:, 1:] = image.reshape(h, w * c)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return b''.join((b'\x89PNG\r\n\x1a\n',
+                     chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 6 if c == 4 else 2, 0, 0, 0)),
+                     chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)),
+                     chunk(b'IEND', b'')))
+
+
+def _direct_png(image_type, contour, display_area):
+    # colour grid images that can be written without a map
+    return (image_type == gxmap.RASTER_FORMAT_PNG) and (contour is None) and (display_area is None)
 
 
 class Grid(gxgm.Geometry):
@@ -241,6 +519,7 @@ class Grid(gxgm.Geometry):
 
     _delete_files = False
     _file_name = None
+    _pool_entry = None
 
     def __enter__(self):
         return self
@@ -267,6 +546,9 @@ class Grid(gxgm.Geometry):
             if self._open:
 
                 self._img = None
+                if self._pool_entry is not None:
+                    _handle_pool.release(self._pool_entry)
+                    self._pool_entry = None
 
                 grid_file_name = self._file_name
                 file_name_decorated = decorate_name(self._file_name, self._decoration) if self._decoration else None
@@ -286,6 +568,8 @@ class Grid(gxgm.Geometry):
                     if self._delete_files:
                         delete_files(self._file_name)
                     elif self._mode != FILE_READ:
+                        if grid_file_name:
+                            _handle_pool.invalidate(grid_file_name)
                         if file_name_decorated:
                             try:
                                 gxapi.GXIMG.sync(file_name_decorated)
@@ -305,8 +589,10 @@ class Grid(gxgm.Geometry):
                 self._buffer_np = None
                 self._buffer_x = None
                 self._buffer_y = None
+                self._buffer_z = None
                 self._cs = None
                 self._gxpg = None
+                self._array = None
 
     def __repr__(self):
         return "{}({})".format(self.__class__, self.__dict__)
@@ -317,7 +603,8 @@ class Grid(gxgm.Geometry):
         else:
             return '<class Grid>: {} ({}, {})'.format(self.file_name_decorated, self.nx, self.ny)
 
-    def __init__(self, file_name=None, in_memory=False, dtype=None, mode=None, kx=1, dim=None, overwrite=False, **kwargs):
+    def __init__(self, file_name=None, in_memory=False, dtype=None, mode=None, kx=1, dim=None, overwrite=False,
+                 pooled=False, **kwargs):
 
         self._delete_files = False
         self._readonly = False
@@ -338,9 +625,14 @@ class Grid(gxgm.Geometry):
         self._img = None
         self._buffered_row = None
         self._buffer_np = None
+        self._array = None
+        self._overviews_valid = True
+        self._overview_files = None
+        self._overview_method = OVERVIEW_MEAN
         self._buffered_xy = None
         self._buffer_x = None
         self._buffer_y = None
+        self._buffer_z = None
         self._cs = None
         self._gxpg = None
 
@@ -361,6 +653,10 @@ class Grid(gxgm.Geometry):
                 path, file_name, root, ext, self._decoration = name_parts(file_name)
                 self._file_name = os.path.join(path, file_name)
 
+        # pooled read-only handles must not be reused once this grid is changed
+        if self._file_name is not None and mode != FILE_READ:
+            _handle_pool.invalidate(self._file_name)
+
         if mode == FILE_NEW:
             if dtype is None:
                 dtype = np.float64
@@ -393,9 +689,12 @@ class Grid(gxgm.Geometry):
                 if gxtype_from_dtype in (gxapi.GS_FLOAT, gxapi.GS_DOUBLE):
                     gxtype = gxtype_from_dtype
 
-            self._img = gxapi.GXIMG.create_file(gxtype,
-                                                self.file_name_decorated,
-                                                open_mode)
+            if pooled and mode == FILE_READ:
+                self._img, self._pool_entry = _handle_pool.acquire(self.file_name_decorated, gxtype)
+            else:
+                self._img = gxapi.GXIMG.create_file(gxtype,
+                                                    self.file_name_decorated,
+                                                    open_mode)
             if dtype is None:
                 dtype = gxu.dtype_gx(self._img.e_type())
 
@@ -408,7 +707,7 @@ class Grid(gxgm.Geometry):
         self._dummy = gxu.gx_dummy(self._dtype)
         self._is_int = gxu.is_int(gxu.gx_dtype(self.dtype))
         self._cos_rot = self._sin_rot = None
-        self.rot = self.rot  # this sets _cos_rot and _sin_rot
+        self._set_rotation_trig(self.rot)
 
         self._open = gx.track_resource(self.__class__.__name__, self._file_name)
 
@@ -472,6 +771,31 @@ class Grid(gxgm.Geometry):
 
         return grd
 
+    @classmethod
+    def open_pooled(cls, file_name, dtype=None):
+        """
+        Open an existing grid file read-only on a shared native handle.
+
+        Grids opened this way share one handle per decorated file name and data type, and the handle
+        stays open for reuse after the grid is closed, so repeatedly opening the same grids for reading
+        avoids re-reading the file header each time. Up to `POOL_IDLE_HANDLES` unused handles are kept
+        open, least-recently used handles are closed first. A handle is not reused after the file is
+        changed by a `Grid` in this process, or if the file modification time or size changes.
+
+        :param file_name:   name of the grid file, with decorations.
+        :param dtype:       numpy data type, which will be the grid data type.
+
+        Because the handle is shared the grid properties, including the coordinate system, cannot be
+        changed, setting them raises `GridException`, and the grid cannot be reprojected. Use :meth:`open`
+        if this is required.
+
+        .. seealso:: :func:`clear_handle_pool`, :func:`handle_pool_statistics`
+
+        .. versionadded:: 2022.1
+        """
+
+        return cls(file_name, dtype=dtype, mode=FILE_READ, pooled=True)
+
     @classmethod
     def new(cls, file_name=None, properties=None, overwrite=False, in_memory=False):
         """
@@ -638,6 +962,8 @@ class Grid(gxgm.Geometry):
                 return nxyv[n]
             grid = gxgrd.Grid.minimum_curvature(feed_data, cs=1.)
 
+        .. seealso:: `geosoft.gxpy.grid_utility.minimum_curvature` to grid numpy arrays in-process.
+
         .. versionadded:: 9.4
         """
 
@@ -747,7 +1073,7 @@ class Grid(gxgm.Geometry):
 
         if self._buffered_row != iy:
             self._buffered_row = iy
-            self._buffer_np = self.read_row(self._buffered_row).np
+            self._buffer_np = self.read_rows(iy, 1)[0]
 
         v = self._buffer_np[ix]
         if self._is_int:
@@ -800,7 +1126,8 @@ class Grid(gxgm.Geometry):
         """
         Create a new Grid instance as a copy of an existing grid.
 
-        :param grd:         :class:`Grid` instance to save as a new grid, or a grid file name
+        :param grd:         :class:`Grid` instance to save as a new grid, which can be a virtual `GridWindow`,
+                            or a grid file name
         :param file_name:   name of the new grid (file with optional decorations). If not specified a temporary file
                             is created.
         :param dtype:       numpy data type, None to use type of the parent grid
@@ -809,6 +1136,8 @@ class Grid(gxgm.Geometry):
         :param mode:        `open` mode for working with the copy.
 
         .. versionadded:: 9.2
+
+        .. versionchanged:: 2022.1 support for `GridWindow` instances
         """
 
         if not isinstance(grd, Grid):
@@ -822,7 +1151,8 @@ class Grid(gxgm.Geometry):
             p['dtype'] = dtype
 
         if not in_memory and file_name is not None:
-            path0, base_file0, root0, ext0, dec0 = name_parts(grd.file_name_decorated)
+            source = grd.parent if isinstance(grd, GridWindow) else grd
+            path0, base_file0, root0, ext0, dec0 = name_parts(source.file_name_decorated)
             path1, base_file1, root1, ext1, dec1 = name_parts(file_name)
             if not ext1:
                 ext1 = ext0
@@ -833,7 +1163,10 @@ class Grid(gxgm.Geometry):
         copy = cls.new(file_name, p, overwrite=overwrite, in_memory=in_memory)
         if file_name is None:
             file_name = copy.file_name_decorated
-        grd.gximg.copy(copy.gximg)
+        if isinstance(grd, GridWindow):
+            grd._copy_to(copy)
+        else:
+            grd.gximg.copy(copy.gximg)
 
         if close_grid:
             grd.close()
@@ -845,7 +1178,7 @@ class Grid(gxgm.Geometry):
         return cls.open(file_name, dtype=dtype, mode=mode)
 
     @classmethod
-    def index_window(cls, grd, name=None, x0=0, y0=0, nx=None, ny=None, overwrite=False):
+    def index_window(cls, grd, name=None, x0=0, y0=0, nx=None, ny=None, overwrite=False, virtual=False):
         """
         Create a windowed instance of a grid.
         
@@ -856,12 +1189,17 @@ class Grid(gxgm.Geometry):
         :param nx:          number of points in x
         :param ny:          number of points in y
         :param overwrite:   True to overwrite existing file, default is False
+        :param virtual:     True to return a read-only `GridWindow` that reads from `grd` without copying
+                            any data, in which case `name` and `overwrite` are ignored.
 
         .. versionadded:: 9.2
+
+        .. versionchanged:: 2022.1 added `virtual`
         """
 
-        if not isinstance(grd, Grid):
-            grd = Grid.open(grd)
+        opened = not isinstance(grd, Grid)
+        if opened:
+            grd = Grid.open_pooled(grd) if virtual else Grid.open(grd)
 
         gnx = grd.nx
         gny = grd.ny
@@ -878,6 +1216,15 @@ class Grid(gxgm.Geometry):
             raise GridException(_t('Window x0,y0,mx,my({},{},{},{}) out of bounds ({},{})').
                                 format(x0, y0, mx, my, gnx, gny))
 
+        # a window of a window is a window of the parent
+        if isinstance(grd, GridWindow):
+            x0 += grd.offset[0]
+            y0 += grd.offset[1]
+            grd = grd.parent
+
+        if virtual:
+            return GridWindow(grd, x0, y0, nx, ny, close_parent=opened)
+
         if name is None:
             path, file_name, root, ext, dec = name_parts(grd.file_name_decorated)
             name = '{}_({},{})({},{}){}'.format(root, x0, y0, nx, ny, ext)
@@ -888,15 +1235,7 @@ class Grid(gxgm.Geometry):
         p = grd.properties()
         p['nx'] = nx
         p['ny'] = ny
-        if grd.rot == 0.0:
-            p['x0'] = grd.x0 + grd.dx * x0
-            p['y0'] = grd.y0 + grd.dy * y0
-        else:
-            dx = grd.dx * x0
-            dy = grd.dy * y0
-            cos, sin = grd.rotation_cos_sine
-            p['x0'] = grd.x0 - dx * cos - dy * sin
-            p['y0'] = grd.y0 - dy * cos + dx * sin
+        p['x0'], p['y0'] = _window_origin(grd, x0, y0)
 
         window_grid = cls.new(name, p, overwrite=overwrite)
         source_pager = grd.gxpg(copy=False)
@@ -948,6 +1287,49 @@ class Grid(gxgm.Geometry):
 
         return reopen(grd)
 
+    @classmethod
+    def from_rgba(cls, rgba, file_name=None, properties=None, overwrite=False):
+        """
+        Create a colour grid from an array of RGBA bytes.
+
+        :param rgba:        uint8 array shaped (ny, nx, 4) of (red, green, blue, alpha), or (ny, nx, 3) for
+                            opaque colours. Colours with alpha 0 are dummies, other colours are opaque.
+                            Row 0 is the grid origin row.
+        :param file_name:   name of the GRD file, default creates a temporary file name
+        :param properties:  grid properties as a dictionary
+        :param overwrite:   `True` to overwrite existing grid.
+        :returns:           :class:`Grid` instance
+
+        Colour grids are created as Geosoft GRD files.
+
+        .. seealso:: `read_rgba`, `write_rgba`
+
+        .. versionadded:: 2022.1
+        """
+
+        rgba = np.asarray(rgba)
+        if rgba.ndim != 3:
+            raise GridException(_t('RGBA data must be shaped (ny, nx, 4), not {}').format(rgba.shape))
+
+        if (file_name is None) or (len(file_name.strip()) == 0):
+            file_name = gx.gx().temp_file('.grd(GRD)')
+        path, base, root, ext, dec = name_parts(file_name)
+        if ext.lower() != '.grd' or (dec and dec.split(';')[0].strip().upper() != 'GRD'):
+            raise GridException(_t('Colour grids must be GRD files, not {}').format(file_name))
+        grd_file = os.path.join(path, base)
+
+        properties = dict(properties or {})
+        properties['dtype'] = np.int32
+        properties['is_color'] = True
+        _handle_pool.invalidate(grd_file)
+        gxgrdf.GrdFile.from_data_array(_transform_rgba_to_color_int(rgba), grd_file, properties,
+                                       overwrite=overwrite).close()
+
+        grd = cls.open(file_name, mode=FILE_READWRITE)
+        if properties.get('coordinate_system') is not None:
+            grd.coordinate_system = properties['coordinate_system']
+        return grd
+
     @property
     def is_crooked_path(self):
         """True if this grid follows a crooked path section."""
@@ -1238,8 +1620,10 @@ class Grid(gxgm.Geometry):
 
     @coordinate_system.setter
     def coordinate_system(self, cs):
+        self._check_not_pooled()
         self._cs = gxcs.Coordinate_system(cs)
         self._img.set_ipj(self._cs.gxipj)
+        self._buffered_xy = None
 
     def properties(self):
         """
@@ -1296,12 +1680,6 @@ class Grid(gxgm.Geometry):
         .. versionadded:: 9.4
         """
 
-        def get_st(what):
-            v = gxst.get_info(what)
-            if v == gxapi.rDUMMY:
-                return None
-            return v
-
         if gxst is None:
             gxst = gxapi.GXST.create()
         vv = gxvv.GXvv()
@@ -1309,45 +1687,48 @@ class Grid(gxgm.Geometry):
             self.gximg.read_v(iv, 0, 0, vv.gxvv)
             gxst.data_vv(vv.gxvv)
 
-        st = {'min': get_st(gxapi.ST_MIN),
-              'max': get_st(gxapi.ST_MAX),
-              'mean': get_st(gxapi.ST_MEAN),
-              'geometric_mean': get_st(gxapi.ST_GEOMEAN),
-              'variance': get_st(gxapi.ST_VARIANCE),
-              'sd': get_st(gxapi.ST_STDDEV),
-              'skew': get_st(gxapi.ST_SKEW),
-              'kurtosis': get_st(gxapi.ST_KURTOSIS),
-              'sum': get_st(gxapi.ST_SUM),
-              'sum_power_2': get_st(gxapi.ST_SUM2),
-              'sum_power_3': get_st(gxapi.ST_SUM3),
-              'sum_power_4': get_st(gxapi.ST_SUM4),
-              'num_data': get_st(gxapi.ST_ITEMS),
-              'num_dummy': get_st(gxapi.ST_DUMMIES)
-              }
-
-        return st
+        return _statistics_dict(gxst)
 
     @x0.setter
     def x0(self, v):
+        self._check_not_pooled()
         self._img.set_info(self.dx, self.dy, v, self.y0, -self.rot)
+        self._buffered_xy = None
 
     @y0.setter
     def y0(self, v):
+        self._check_not_pooled()
         self._img.set_info(self.dx, self.dy, self.x0, v, -self.rot)
+        self._buffered_xy = None
 
     @dx.setter
     def dx(self, v):
+        self._check_not_pooled()
         self._img.set_info(v, self.dy, self.x0, self.y0, -self.rot)
+        self._buffered_xy = None
 
     @dy.setter
     def dy(self, v):
+        self._check_not_pooled()
         self._img.set_info(self.dx, v, self.x0, self.y0, -self.rot)
+        self._buffered_xy = None
 
     @rot.setter
     def rot(self, v):
+        self._check_not_pooled()
         self._img.set_info(self.dx, self.dy, self.x0, self.y0, -v)
-        self._cos_rot = math.cos(math.radians(v))
-        self._sin_rot = math.sin(math.radians(v))
+        self._set_rotation_trig(v)
+        self._buffered_xy = None
+
+    def _set_rotation_trig(self, rot):
+        self._cos_rot = math.cos(math.radians(rot))
+        self._sin_rot = math.sin(math.radians(rot))
+
+    def _check_not_pooled(self):
+        # a pooled handle is shared with other grids and reused after this grid is closed
+        if self._pool_entry is not None:
+            raise GridException(_t('{} opened pooled, cannot set properties. Use Grid.open().')
+                                .format(self.file_name_decorated))
 
     def set_properties(self, properties):
         """
@@ -1401,9 +1782,13 @@ class Grid(gxgm.Geometry):
         :param iy0:     grid Y index of first point, top index if writing rows top to bottom
         :param order:   1: bottom to top; -1: top to bottom
 
+        .. seealso:: `row_writer` to stream blocks of rows to a grid.
+
         .. versionadded:: 9.1
 
         .. versionchanged:: 9.4 accepts list or GXPG
+
+        .. versionchanged:: 2022.1 array data is written in blocks through a `GridRowWriter`
         """
 
         if isinstance(data, gxapi.GXPG):
@@ -1418,17 +1803,44 @@ class Grid(gxgm.Geometry):
         if ((nx - ix0) > self.nx) or ((ny - iy0) > self.ny):
             raise GridException(_t('Data size exceeds grid size.'))
 
-        dvv = gxvv.GXvv(dtype=self.dtype)
-        dvv.length = nx
-        iy = iy0
-
-        for i in range(ny):
-            if isinstance(data, gxapi.GXPG):
+        if isinstance(data, gxapi.GXPG):
+            dvv = gxvv.GXvv(dtype=self.dtype)
+            dvv.length = nx
+            iy = iy0
+            for i in range(ny):
                 data.read_row(i, 0, 0, dvv.gxvv)
-            else:
-                dvv.set_data(data[i, :])
-            self._img.write_y(iy, ix0, 0, dvv.gxvv)
-            iy += order
+                self._img.write_y(iy, ix0, 0, dvv.gxvv)
+                iy += order
+            self._data_changed()
+
+        else:
+            with self.row_writer(row=iy0, col=ix0, ncols=nx, order=order) as writer:
+                writer.write(data)
+
+    def row_writer(self, row=0, col=0, ncols=None, order=1, block_rows=None, threaded=False):
+        """
+        Return a `GridRowWriter` to stream blocks of rows to the grid. Use as a context manager:
+
+        .. code::
+
+            with gxgrd.Grid.new('derived.grd', properties=p) as g:
+                with g.row_writer() as writer:
+                    for block in blocks_of_rows():
+                        writer.write(block)
+
+        :param row:         first row to write, default is 0
+        :param col:         first column of each row, default is 0
+        :param ncols:       number of columns in each row, default is to the end of the row
+        :param order:       1: write rows bottom to top (default); -1: top to bottom
+        :param block_rows:  number of rows staged per block, default fills `BULK_BLOCK_BYTES`
+        :param threaded:    `True` to convert each block on a background thread while the previous
+                            block is written to the grid.
+        :returns:           `GridRowWriter` instance
+
+        .. versionadded:: 2022.1
+        """
+        return GridRowWriter(self, row=row, col=col, ncols=ncols, order=order,
+                             block_rows=block_rows, threaded=threaded)
 
     def read_row(self, row=None, start=0, length=None):
         """
@@ -1480,6 +1892,223 @@ class Grid(gxgm.Geometry):
 
         return vv
 
+    def _block_length(self, vector_length, itemsize, block=None):
+        """number of vectors to stage together in a bulk read or write block"""
+        if block is None:
+            block = BULK_BLOCK_BYTES // max(1, vector_length * itemsize)
+        return int(max(1, min(block, gxapi.iMAX // max(1, vector_length))))
+
+    def read_rows(self, row=0, nrows=None, out=None, dtype=None, block_rows=None):
+        """
+        Read a block of grid rows into a 2D numpy array.
+
+        Rows are read through a single reusable native vector and staged in blocks of many rows, such
+        that the only per-row cost is the native read. Dummies in float data are returned as numpy.nan.
+
+        :param row:         first row to read, default is 0
+        :param nrows:       number of rows to read, default is to the last row
+        :param out:         optional numpy array shaped (nrows, nx) to receive the data. This can be a view
+                            into a larger array, for example `out=data[100:200, :]`.  The `out` dtype determines
+                            the returned data type.
+        :param dtype:       data type if `out` is not provided, default is the grid dtype
+        :param block_rows:  number of rows staged per block, default fills `BULK_BLOCK_BYTES`
+        :returns:           numpy array shaped (nrows, nx), which is `out` if provided.
+
+        .. note:: Grids stored in column order (query_kx() == -1) are read by columns, which is the
+            efficient native order for such grids.
+
+        .. versionadded:: 2022.1
+        """
+
+        return self.read_window(row, nrows, out=out, dtype=dtype, block=block_rows)
+
+    def read_window(self, row=0, nrows=None, col=0, ncols=None, out=None, dtype=None, block=None):
+        """
+        Read a rectangular window of the grid into a 2D numpy array.
+
+        :param row:     first row of the window
+        :param nrows:   number of rows, default is to the last row
+        :param col:     first column of the window
+        :param ncols:   number of columns, default is to the last column
+        :param out:     optional numpy array shaped (nrows, ncols) to receive the data
+        :param dtype:   data type if `out` is not provided, default is the grid dtype
+        :param block:   number of native vectors staged per block, default fills `BULK_BLOCK_BYTES`
+        :returns:       numpy array shaped (nrows, ncols), float dummies are numpy.nan
+
+        .. seealso:: `read_rows`
+
+        .. versionadded:: 2022.1
+        """
+
+        nx = self.nx
+        ny = self.ny
+        if nrows is None:
+            nrows = ny - row
+        if ncols is None:
+            ncols = nx - col
+        if ((row < 0) or (nrows <= 0) or (row + nrows > ny) or
+                (col < 0) or (ncols <= 0) or (col + ncols > nx)):
+            raise GridException(_t('Window rows ({}, {}) columns ({}, {}) out of range of grid ({}, {})')
+                                .format(row, nrows, col, ncols, nx, ny))
+
+        if out is None:
+            if dtype is None:
+                dtype = self.dtype
+            out = np.empty((nrows, ncols), dtype=dtype)
+        elif out.shape != (nrows, ncols):
+            raise GridException(_t('out shape {} must be ({}, {})').format(out.shape, nrows, ncols))
+        dtype = np.dtype(out.dtype)
+        gxtype = gxu.gx_dtype(dtype)
+        dummy = gxu.gx_dummy(dtype)
+        is_float = gxu.is_float(gxtype)
+
+        columns = self.gximg.query_kx() == -1
+        if columns:
+            vlen = nrows
+            nvec = ncols
+        else:
+            vlen = ncols
+            nvec = nrows
+        block = min(self._block_length(vlen, dtype.itemsize, block), nvec)
+
+        # one vector for native reads, one for the staged block and one staging buffer
+        vec_vv = gxapi.GXVV.create_ext(gxtype, vlen)
+        block_vv = gxapi.GXVV.create_ext(gxtype, block * vlen)
+        block_vv.set_len(block * vlen)
+        stage_bytes = np.empty(block * vlen, dtype=dtype).tobytes()
+        stage = np.frombuffer(stage_bytes, dtype=dtype)
+
+        i0 = 0
+        while i0 < nvec:
+            n = min(block, nvec - i0)
+            for i in range(n):
+                if columns:
+                    self._img.read_x(col + i0 + i, row, nrows, vec_vv)
+                else:
+                    self._img.read_y(row + i0 + i, col, ncols, vec_vv)
+                block_vv.copy2(i * vlen, vec_vv, 0, vlen)
+            block_vv.get_data(0, n * vlen, stage_bytes, gxtype)
+            data = stage[:n * vlen].reshape((n, vlen))
+            if columns:
+                out_block = out[:, i0: i0 + n]
+                out_block[:] = data.T
+            else:
+                out_block = out[i0: i0 + n, :]
+                out_block[:] = data
+            if is_float:
+                out_block[out_block == dummy] = np.nan
+            i0 += n
+
+        return out
+
+    def read_rgba(self, row=0, nrows=None, col=0, ncols=None, out=None):
+        """
+        Read a window of a colour grid as RGBA bytes.
+
+        Colours are read in blocks of rows directly into the memory of the result, which is interpreted
+        as bytes, so there are no per-row conversions or intermediate copies. Dummy colours are returned
+        as transparent (0, 0, 0, 0), all other colours are opaque.
+
+        :param row:     first row of the window
+        :param nrows:   number of rows, default is to the last row
+        :param col:     first column of the window
+        :param ncols:   number of columns, default is to the last column
+        :param out:     optional C-contiguous uint8 array shaped (nrows, ncols, 4) to receive the data
+        :returns:       uint8 numpy array shaped (nrows, ncols, 4) of (red, green, blue, alpha)
+
+        .. seealso:: `write_rgba`, `from_rgba`
+
+        .. versionadded:: 2022.1
+        """
+
+        if nrows is None:
+            nrows = self.ny - row
+        if ncols is None:
+            ncols = self.nx - col
+        if out is None:
+            out = np.empty((nrows, ncols, 4), dtype=np.uint8)
+        elif out.shape != (nrows, ncols, 4) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise GridException(_t('out must be a C-contiguous uint8 array shaped ({}, {}, 4)').
+                                format(nrows, ncols))
+
+        values = out.view('<i4')[..., 0]
+        block_rows = self._block_length(ncols, 4)
+        for r0 in range(0, nrows, block_rows):
+            n = min(block_rows, nrows - r0)
+            block = values[r0: r0 + n]
+            self.read_window(row + r0, n, col, ncols, out=block)
+            _transform_color_int_to_rgba(block)
+
+        return out
+
+    def write_rgba(self, rgba, row=0, col=0):
+        """
+        Write RGBA bytes to a colour grid.
+
+        :param rgba:    uint8 array shaped (nrows, ncols, 4) of (red, green, blue, alpha), or (nrows, ncols, 3)
+                        for opaque colours. Colours with alpha 0 are written as dummies.
+        :param row:     grid row of the first row of data
+        :param col:     grid column of the first column of data
+
+        .. seealso:: `read_rgba`, `from_rgba`
+
+        .. versionadded:: 2022.1
+        """
+
+        if not self.is_color:
+            raise GridException(_t('{} is not a colour grid').format(self.file_name_decorated))
+        rgba = np.asarray(rgba)
+        if rgba.ndim != 3:
+            raise GridException(_t('RGBA data must be shaped (nrows, ncols, 4), not {}').format(rgba.shape))
+
+        block_rows = self._block_length(rgba.shape[1], 4)
+        with self.row_writer(row=row, col=col, ncols=rgba.shape[1], block_rows=block_rows) as writer:
+            for r0 in range(0, rgba.shape[0], block_rows):
+                writer.write(_transform_rgba_to_color_int(rgba[r0: r0 + block_rows]))
+
+    @property
+    def array(self):
+        """
+        Lazy, numpy-sliceable view of the grid data as a `GridArray` instance. Data is read in tiles on
+        demand and held in a bounded tile cache, so small windows of very large grids can be accessed
+        without reading the whole grid.  For example:
+
+        .. code::
+
+            with gxgrd.Grid.open('some_very_large.grd') as g:
+                window = g.array[1000:1200, 5000:5500]
+
+        Use `tiled_array()` to control the tile shape and the cache memory budget.
+
+        .. versionadded:: 2022.1
+        """
+        if self._array is None:
+            self._array = GridArray(self)
+        return self._array
+
+    def tiled_array(self, tile_shape=None, cache_bytes=None):
+        """
+        Create a new `GridArray` view of the grid with a specific tile shape and cache budget, which
+        becomes the view returned by `array`.
+
+        :param tile_shape:  (rows, columns) of each tile, default is `GridArray.TILE_SHAPE`
+        :param cache_bytes: maximum memory used to cache tiles, default is `GridArray.CACHE_BYTES`
+        :returns:           `GridArray` instance
+
+        .. versionadded:: 2022.1
+        """
+        self._array = GridArray(self, tile_shape=tile_shape, cache_bytes=cache_bytes)
+        return self._array
+
+    def _data_changed(self):
+        """discard cached data after grid data changes"""
+        if self._file_name is not None:
+            _handle_pool.invalidate(self._file_name)
+        self._buffered_row = None
+        self._overviews_valid = False
+        if self._array is not None:
+            self._array.clear()
+
     def write_row(self, data, row=None, start=0, length=None):
         """
 
@@ -1505,6 +2134,7 @@ class Grid(gxgm.Geometry):
         if length is None:
             length = 0
         self._img.write_y(row, start, length, data.gxvv)
+        self._data_changed()
 
     def write_column(self, data, column=None, start=0, length=None):
         """
@@ -1531,6 +2161,7 @@ class Grid(gxgm.Geometry):
         if length is None:
             length = 0
         self._img.write_x(column, start, length, data.gxvv)
+        self._data_changed()
 
     def reset_read_write(self):
         """ Reset the default read/write to the grid row 0, column 0. """
@@ -1681,39 +2312,25 @@ class Grid(gxgm.Geometry):
         """
         return gxgm.Point2((self.extent_3d()), coordinate_system=self.coordinate_system)
 
-    def np(self, dtype=None):
+    def np(self, dtype=None, out=None):
         """
         Return a numpy array of grid values in the working dtype.
 
         :param dtype:   desired data type, default is the work_dtype, ignored for color grids
+        :param out:     optional array shaped (ny, nx) to receive the data, in which case the dtype of `out`
+                        is used. Ignored for color grids.
 
-        :returns: numpy array shape (nx, ny) or (nx, ny, 4) containing RGBA bytes in case of color grids
+        :returns: numpy array shape (ny, nx) or (ny, nx, 4) containing RGBA bytes in case of color grids
 
         .. versionadded:: 9.3.1
+
+        .. versionchanged:: 2022.1 bulk reads by row block, added `out`
         """
 
-        nx = self.nx
-        ny = self.ny
         if self.is_color:
-            data = np.zeros((ny, nx, 4), np.dtype(np.uint8))
-        else:
-            if dtype is None:
-                dtype = self.dtype
-            data = np.zeros((ny, nx), dtype=dtype)
-        if self.gximg.query_kx() == -1:
-            for i in range(self.nx):
-                column = self.read_column(i).np
-                if self.is_color:
-                    column = _transform_color_int_to_rgba(column)
-                data[:, i] = column
-        else:
-            for i in range(self.ny):
-                row = self.read_row(i).np
-                if self.is_color:
-                    row = _transform_color_int_to_rgba(row)
-                data[i, :] = row
+            return self.read_rgba()
 
-        return data
+        return self.read_rows(out=out, dtype=dtype)
 
     def xyzv(self):
         """
@@ -1722,7 +2339,7 @@ class Grid(gxgm.Geometry):
         x, y, z) is the location of each grid point in 3D space and v is the grid value at that location.
         Dummies will be numpy.nan.
 
-        :returns: numpy array shape (nx, ny, 4)
+        :returns: numpy array shape (ny, nx, 4)
 
         .. versionadded:: 9.2
         """
@@ -1750,12 +2367,7 @@ class Grid(gxgm.Geometry):
         if cs.is_oriented:
             xyzv[:, :, :3] = cs.xyz_from_oriented(xyzv[:, :, :3].reshape((-1, 3))).reshape((ny, nx, 3))
 
-        if self.gximg.query_kx() == -1:
-            for i in range(self.nx):
-                xyzv[:, i, 3] = self.read_column(i).np
-        else:
-            for i in range(self.ny):
-                xyzv[i, :, 3] = self.read_row(i).np
+        self.read_rows(out=xyzv[:, :, 3])
 
         return xyzv
 
@@ -1777,28 +2389,80 @@ class Grid(gxgm.Geometry):
 
         if self._buffered_xy != iy:
             self._buffered_xy = iy
-            self._buffer_x = np.arange(self.nx, dtype=np.float64)
-            self._buffer_x *= self.dx
-            self._buffer_y = np.zeros(self.nx, dtype=np.float64)
-            self._buffer_y += iy * self.dy
+            self._buffer_x, self._buffer_y, self._buffer_z = (a[0] for a in self.xyz_rows(iy, 1))
 
-            if self.rot != 0.:
-                rx = self._buffer_x * self._cos_rot + self._buffer_y * self._sin_rot
-                self._buffer_y *= self._buffer_y * self._cos_rot
-                self._buffer_y -= self._buffer_x * self._sin_rot
-                self._buffer_x = rx
+        return float(self._buffer_x[ix]), float(self._buffer_y[ix]), float(self._buffer_z[ix])
+
+    def xyz_rows(self, row=0, nrows=None):
+        """
+        Returns the (x, y, z) locations of all points in a block of grid rows. Grid rotation and
+        oriented coordinate systems are applied to the whole block.
+
+        :param row:     first row
+        :param nrows:   number of rows, default is to the last row
+        :returns:       (x, y, z) numpy float64 arrays, each shaped (nrows, nx)
+
+        .. versionadded:: 2022.1
+        """
+
+        if nrows is None:
+            nrows = self.ny - row
+        nx = self.nx
+        gx_ = np.arange(nx, dtype=np.float64) * self.dx
+        gy_ = np.arange(row, row + nrows, dtype=np.float64) * self.dy
+        x = np.empty((nrows, nx))
+        y = np.empty((nrows, nx))
+        if self.rot != 0.:
+            cos, sin = self.rotation_cos_sine
+            np.add.outer(gy_ * sin, gx_ * cos, out=x)
+            np.subtract.outer(gy_ * cos, gx_ * sin, out=y)
+        else:
+            x[:] = gx_
+            y[:] = gy_[:, np.newaxis]
+        x += self.x0
+        y += self.y0
+        z = np.zeros((nrows, nx))
+
+        cs = self.coordinate_system
+        if cs.is_oriented:
+            xyz = cs.xyz_from_oriented(np.stack((x, y, z), axis=-1).reshape((-1, 3))).reshape((nrows, nx, 3))
+            x, y, z = xyz[:, :, 0], xyz[:, :, 1], xyz[:, :, 2]
+
+        return x, y, z
+
+    def iter_chunks(self, rows=None, dtype=None):
+        """
+        Iterate over the grid in blocks of rows, yielding numpy arrays of locations and values.  This is
+        the vectorized equivalent of iterating the grid point by point.
+
+        :param rows:    number of rows per chunk, default is a block of about `BULK_BLOCK_BYTES`
+        :param dtype:   data type for the values, default is the grid dtype
+        :returns:       yields (x, y, z, v) numpy arrays, each shaped (rows, nx). Dummy float values are
+                        numpy.nan. The last chunk may have fewer rows.
+
+        For example, the following sums the non-dummy values in a grid:
+
+        .. code::
 
-            self._buffer_x += self.x0
-            self._buffer_y += self.y0
+            import numpy as np
+            import geosoft.gxpy.grid as gxgrd
 
-        ggx = self._buffer_x[ix]
-        ggy = self._buffer_y[ix]
-        ggz = 0.
+            with gxgrd.Grid.open('some.grd') as g:
+                total = 0.0
+                for x, y, z, v in g.iter_chunks():
+                    total += np.nansum(v)
 
-        if self.coordinate_system.is_oriented:
-            ggx, ggy, ggz = self.coordinate_system.xyz_from_oriented((ggx, ggy, ggz))
+        .. versionadded:: 2022.1
+        """
 
-        return ggx, ggy, ggz
+        if rows is None:
+            rows = self._block_length(self.nx, 32)
+        rows = max(1, int(rows))
+        ny = self.ny
+        for row in range(0, ny, rows):
+            n = min(rows, ny - row)
+            x, y, z = self.xyz_rows(row, n)
+            yield x, y, z, self.read_rows(row, n, dtype=dtype)
 
     def image_file(self, image_file_name=None, image_type=gxmap.RASTER_FORMAT_PNG, pix_width=None,
                    shade=False, color_map=None, contour=None, display_area=None, pix_32_bit=False):
@@ -1825,8 +2489,14 @@ class Grid(gxgm.Geometry):
             `geosoft.gxpy.grid.image_file`.
 
         .. versionadded:: 9.3.1
+
+        .. versionchanged:: 2022.1 images narrower than the grid are rendered from overviews, if built.
+            See `build_overviews`. PNG images of colour grids are written directly, see `color_png`.
         """
 
+        if self.is_color and _direct_png(image_type, contour, display_area):
+            return self.color_png(image_file_name, pix_width=pix_width, pix_32_bit=pix_32_bit)
+
         temp_grid = gx.gx().temp_file('grd')
         try:
             if self._mode == FILE_READ and self._file_name is not None:
@@ -1838,6 +2508,13 @@ class Grid(gxgm.Geometry):
             if color_map is None:
                 color_map = self.get_default_color_map()
 
+            # render from the coarsest overview that still has at least pix_width columns
+            if pix_width and display_area is None:
+                for level, overview in reversed(list(enumerate(self.overviews, 1))):
+                    if (self.nx + (1 << level) - 1) >> level >= pix_width:
+                        grd_decorated = decorate_name(overview, 'GRD')
+                        break
+
             imagefile = image_file(grd_decorated,
                                    image_file=image_file_name,
                                    image_type=image_type,
@@ -1852,6 +2529,66 @@ class Grid(gxgm.Geometry):
 
         return imagefile
 
+    def color_png(self, image_file_name=None, pix_width=None, pix_32_bit=False):
+        """
+        Save a colour grid as a PNG image with an accompanying world file, without creating a map.
+
+        :param image_file_name: PNG file name, if not specified a temporary PNG file is created.
+                                The world file has the same name with extension '.pgw'.
+        :param pix_width:       image width in pixels, default is the grid width. Images of a different
+                                width take the nearest grid colour for each pixel.
+        :param pix_32_bit:      `True` for a 32-bit image in which dummies are transparent. In 24-bit
+                                images dummies are white.
+        :returns:               image file name
+
+        .. versionadded:: 2022.1
+        """
+
+        if not self.is_color:
+            raise GridException(_t('{} is not a colour grid').format(self.file_name_decorated))
+        if image_file_name is None:
+            image_file_name = gx.gx().temp_file('.png')
+
+        nx, ny = self.nx, self.ny
+        rgba = self.read_rgba()
+        cos, sin = self.rotation_cos_sine
+        dx, dy = self.dx, self.dy
+        x0, y0 = self.x0, self.y0
+        if pix_width and int(pix_width) != nx:
+            pix_width = max(1, int(pix_width))
+            pix_height = max(1, int(round(ny * pix_width / nx)))
+            sx = nx / pix_width
+            sy = ny / pix_height
+            cols = ((np.arange(pix_width) + 0.5) * sx).astype(np.int64)
+            rows = ((np.arange(pix_height) + 0.5) * sy).astype(np.int64)
+            rgba = rgba[rows[:, np.newaxis], cols]
+
+            # pixels cover the grid cells, the first pixel centre is offset from the first grid point
+            ox = (0.5 * sx - 0.5) * dx
+            oy = (0.5 * sy - 0.5) * dy
+            x0 += ox * cos + oy * sin
+            y0 += oy * cos - ox * sin
+            dx *= sx
+            dy *= sy
+            nx, ny = pix_width, pix_height
+
+        # image rows are top down
+        image = rgba[::-1]
+        if not pix_32_bit:
+            alpha = image[..., 3]
+            image = image[..., :3].copy()
+            image[alpha == 0] = 255
+        with open(image_file_name, 'wb') as f:
+            f.write(_png_bytes(np.ascontiguousarray(image)))
+
+        # world file, location of the centre of the top-left pixel and the pixel to plane transform
+        top = (ny - 1) * dy
+        world = (dx * cos, -dx * sin, -dy * sin, -dy * cos, x0 + top * sin, y0 + top * cos)
+        with open(os.path.splitext(image_file_name)[0] + '.pgw', 'w') as f:
+            f.write('\n'.join(repr(float(v)) for v in world) + '\n')
+
+        return image_file_name
+
     def generate_color_map(self, method=gxapi.ITR_ZONE_DEFAULT):
         """
         Generate color map for grid based on statistics and method
@@ -1878,6 +2615,243 @@ class Grid(gxgm.Geometry):
 
         return geosoft.gxpy.group.Color_map(itr)
 
+    def build_overviews(self, method=OVERVIEW_MEAN, min_size=OVERVIEW_MIN_SIZE):
+        """
+        Build and save power-of-two overview levels of the grid.
+
+        Each overview level halves the resolution of the level before, until the grid fits within
+        `min_size` cells. Overviews are saved as GRD files next to the grid, with the grid coordinate
+        system, and reused until the grid changes. Grids without a file, and grids that are not
+        read-only, get temporary overviews.
+
+        :param method:      `OVERVIEW_MEAN` (default) for the mean of the valid grid cells covered by
+                            each overview cell, or `OVERVIEW_NEAREST` to take the nearest cell. Colour
+                            grids always use `OVERVIEW_NEAREST`.
+        :param min_size:    stop when the overview is no larger than this in both dimensions
+        :returns:           list of overview file names, level 1 first
+
+        .. seealso:: `overviews`, `read_overview`
+
+        .. versionadded:: 2022.1
+        """
+
+        if self.is_color:
+            method = OVERVIEW_NEAREST
+        if method == OVERVIEW_MEAN:
+            dtype = np.float32 if self.dtype.itemsize <= 4 else np.float64
+        else:
+            dtype = self.dtype
+        min_size = max(1, int(min_size))
+
+        if self._file_name is None or self._mode != FILE_READ:
+            base_name = gx.gx().temp_file('grd')
+        else:
+            base_name = self.file_name
+            _delete_overviews(base_name)
+        self._overview_files = []
+        self._overviews_valid = True
+
+        cs = self.coordinate_system
+        if not cs.is_known:
+            cs = None
+
+        level = 0
+        source = self
+        source_count = None
+        nx = self.nx
+        ny = self.ny
+        try:
+            while max(nx, ny) > min_size:
+                level += 1
+                nx = (nx + 1) // 2
+                ny = (ny + 1) // 2
+                properties = self._overview_properties(level, method)
+                properties['nx'] = nx
+                properties['ny'] = ny
+                properties['dtype'] = dtype
+                file_name = _overview_name(base_name, level, method)
+
+                # the mean carries the number of valid grid cells in each overview cell to the next level
+                count = None
+                if method == OVERVIEW_MEAN:
+                    count = gxgrdf.GrdFile.new(gx.gx().temp_file('grd'), {'nx': nx, 'ny': ny, 'dtype': np.int32})
+
+                read_dtype = np.float64 if method == OVERVIEW_MEAN else None
+                block_rows = 2 * max(1, self._block_length(source.nx, 20) // 2)
+                try:
+                    with gxgrdf.GrdFile.new(file_name, properties, overwrite=True) as ovr:
+                        for r0 in range(0, source.ny, block_rows):
+                            block_count = None
+                            if source is self:
+                                data = self.read_rows(r0, min(block_rows, self.ny - r0), dtype=read_dtype)
+                            elif method == OVERVIEW_MEAN:
+                                data = source[r0: r0 + block_rows]
+                                block_count = source_count.raw[r0: r0 + block_rows]
+                            else:
+                                data = source.raw[r0: r0 + block_rows]
+                            decimated, decimated_count = _decimate(data, method, block_count)
+                            r1 = r0 // 2 + decimated.shape[0]
+                            if method == OVERVIEW_MEAN:
+                                ovr[r0 // 2: r1] = decimated
+                                count.raw[r0 // 2: r1] = decimated_count
+                            else:
+                                ovr.raw[r0 // 2: r1] = decimated
+                finally:
+                    if source_count is not None:
+                        source_count.close()
+                        gxu.delete_file(source_count.file_name)
+                    source_count = count
+
+                if cs is not None:
+                    with self.__class__.open(decorate_name(file_name, 'GRD'), mode=FILE_READWRITE) as g:
+                        g.coordinate_system = cs
+
+                if source is not self:
+                    source.close()
+                source = gxgrdf.GrdFile.open(file_name)
+                self._overview_files.append(file_name)
+        finally:
+            if source is not self:
+                source.close()
+            if source_count is not None:
+                source_count.close()
+                gxu.delete_file(source_count.file_name)
+
+        self._overview_method = method
+        return list(self._overview_files)
+
+    def _overview_properties(self, level, method):
+        # location of the first cell of an overview level
+        properties = self.properties()
+        step = 1 << level
+        if method == OVERVIEW_MEAN:
+            ox = 0.5 * (step - 1) * self.dx
+            oy = 0.5 * (step - 1) * self.dy
+            if self.rot != 0.:
+                cos, sin = math.cos(math.radians(self.rot)), math.sin(math.radians(self.rot))
+                ox, oy = ox * cos + oy * sin, oy * cos - ox * sin
+            properties['x0'] = self.x0 + ox
+            properties['y0'] = self.y0 + oy
+        properties['dx'] = self.dx * step
+        properties['dy'] = self.dy * step
+        return properties
+
+    @property
+    def overviews(self):
+        """
+        List of valid overview file names, level 1 first. Overviews built by `build_overviews` in an
+        earlier session are found next to the grid file, and are valid if they are newer than the grid.
+
+        .. versionadded:: 2022.1
+        """
+
+        if not self._overviews_valid:
+            return []
+        if self._overview_files is not None:
+            return list(self._overview_files)
+
+        files = []
+        self._overview_method = OVERVIEW_MEAN
+        if self._file_name is not None and self._mode == FILE_READ and os.path.isfile(self.file_name):
+            grid_time = os.path.getmtime(self.file_name)
+            for method in _OVERVIEW_METHOD_NAMES:
+                level = 1
+                while True:
+                    file_name = _overview_name(self.file_name, level, method)
+                    if not os.path.isfile(file_name) or os.path.getmtime(file_name) < grid_time:
+                        break
+                    files.append(file_name)
+                    level += 1
+                if files:
+                    self._overview_method = method
+                    break
+        self._overview_files = files
+        return list(files)
+
+    def overview_level(self, resolution):
+        """
+        The coarsest overview level with a cell size no larger than `resolution`.
+
+        :param resolution:  required cell size in grid distance units
+        :returns:           overview level, 0 for the grid itself
+
+        .. versionadded:: 2022.1
+        """
+
+        level = 0
+        cell = min(self.dx, self.dy)
+        for _ in self.overviews:
+            if cell * 2 > resolution:
+                break
+            cell *= 2
+            level += 1
+        return level
+
+    def read_overview(self, resolution, row=0, nrows=None, col=0, ncols=None):
+        """
+        Read a window of the grid at the coarsest available resolution that satisfies `resolution`.
+
+        :param resolution:  required cell size in grid distance units
+        :param row:         first row of the window, in full resolution grid rows
+        :param nrows:       number of full resolution rows, default to the last row
+        :param col:         first column of the window, in full resolution grid columns
+        :param ncols:       number of full resolution columns, default to the last column
+        :returns:           (data, properties), where data is a 2D numpy array of the window at the overview
+                            level with dummies as numpy.nan for float data, and properties is the grid
+                            properties dictionary of the returned data. The properties 'level' is the
+                            overview level, 0 for the grid itself.
+
+        The amount of data read is proportional to the size of the returned array, not the full resolution
+        window, so this is suitable for creating previews of large grids.
+
+        .. seealso:: `build_overviews`
+
+        .. versionadded:: 2022.1
+        """
+
+        if nrows is None:
+            nrows = self.ny - row
+        if ncols is None:
+            ncols = self.nx - col
+        if row < 0 or col < 0 or nrows <= 0 or ncols <= 0 or \
+                (row + nrows) > self.ny or (col + ncols) > self.nx:
+            raise GridException(_t('Window ({}, {}, {}, {}) is outside the grid ({}, {})')
+                                .format(row, nrows, col, ncols, self.ny, self.nx))
+
+        level = self.overview_level(resolution)
+        if level == 0:
+            data = self.read_window(row, nrows, col, ncols)
+            properties = self.properties()
+        else:
+            r0 = row >> level
+            c0 = col >> level
+            r1 = (row + nrows + (1 << level) - 1) >> level
+            c1 = (col + ncols + (1 << level) - 1) >> level
+            with gxgrdf.GrdFile.open(self.overviews[level - 1]) as ovr:
+                r1 = min(r1, ovr.ny)
+                c1 = min(c1, ovr.nx)
+                if self.is_color or self._overview_method == OVERVIEW_NEAREST:
+                    data = np.array(ovr.raw[r0: r1, c0: c1])
+                    if self.dtype.kind == 'f':
+                        data = data.astype(self.dtype)
+                        data[data == ovr.dummy] = np.nan
+                else:
+                    data = ovr[r0: r1, c0: c1]
+            properties = self._overview_properties(level, self._overview_method)
+            row, col = r0, c0
+
+        properties['nx'] = data.shape[1]
+        properties['ny'] = data.shape[0]
+        properties['level'] = level
+        if row or col:
+            ox = col * properties['dx']
+            oy = row * properties['dy']
+            if self.rot != 0.:
+                cos, sin = math.cos(math.radians(self.rot)), math.sin(math.radians(self.rot))
+                ox, oy = ox * cos + oy * sin, oy * cos - ox * sin
+            properties['x0'] += ox
+            properties['y0'] += oy
+        return data, properties
 
     def mask(self, mask):
         """
@@ -1900,6 +2874,631 @@ class Grid(gxgm.Geometry):
             self.write_row(mr, row)
 
 
+class GridWindow(Grid):
+    """
+    Read-only virtual window of a grid, which is a `Grid` whose reads are translated into offset reads
+    of the parent grid. Nothing is copied when a window is created, which makes windowed statistics,
+    sampling and reading over many areas of a grid inexpensive.
+
+    Create virtual windows with `Grid.index_window` with `virtual=True`. Methods that need a native grid
+    handle, for example `gxpg`, `get_value` or `image_file`, copy the window to a temporary grid the first
+    time they are called. Use `materialize` or `Grid.copy` to save the window as a grid file.
+
+    The parent grid must remain open while the window is in use.
+
+    :param grid:    parent `Grid` instance
+    :param col0:    first parent column in the window
+    :param row0:    first parent row in the window
+    :param nx:      number of columns
+    :param ny:      number of rows
+    :param close_parent: True to close the parent when the window is closed
+
+    .. versionadded:: 2022.1
+    """
+
+    def __init__(self, grid, col0, row0, nx, ny, close_parent=False):
+
+        name = '{}_({},{})({},{})'.format(grid.name, col0, row0, nx, ny)
+        gxgm.Geometry.__init__(self, name=name)
+
+        self._parent = grid
+        self._close_parent = close_parent
+        self._col0 = col0
+        self._row0 = row0
+        self._nx = nx
+        self._ny = ny
+        self._window_img = None
+        self._materialized = None
+
+        self._delete_files = False
+        self._readonly = True
+        self._decoration = grid.decoration
+        self._file_name = None
+        self._hgd = False
+        self._hgd_name = None
+        self._metadata = None
+        self._metadata_changed = False
+        self._metadata_root = ''
+        self._buffered_row = None
+        self._buffer_np = None
+        self._array = None
+        self._overviews_valid = True
+        self._overview_files = None
+        self._overview_method = OVERVIEW_MEAN
+        self._buffered_xy = None
+        self._buffer_x = None
+        self._buffer_y = None
+        self._buffer_z = None
+        self._gxpg = None
+
+        self._mode = FILE_READ
+        self._next = 0
+        self._next_row = 0
+        self._next_col = 0
+        self._gxtype = grid.gxtype
+        self._dtype = grid.dtype
+        self._dummy = grid.dummy_value
+        self._is_int = grid.is_int
+        self._cos_rot, self._sin_rot = grid.rotation_cos_sine
+
+        self._open = gx.track_resource(self.__class__.__name__, name)
+
+    def _close(self, pop=True):
+        if getattr(self, '_open', None):
+            super()._close(pop)
+            if self._materialized is not None:
+                self._materialized.close()
+                self._materialized = None
+            if self._close_parent:
+                self._parent.close()
+            self._parent = None
+
+    def __str__(self):
+        return '<class GridWindow>: {} ({}, {}) at ({}, {})'.format(self._parent, self.nx, self.ny,
+                                                                   self._col0, self._row0)
+
+    @property
+    def _img(self):
+        # native handle to a temporary copy of the window, created on first use
+        if self._window_img is None:
+            self._materialized = Grid.copy(self, mode=FILE_READ)
+            self._materialized.delete_files()
+            self._window_img = self._materialized.gximg
+        return self._window_img
+
+    @_img.setter
+    def _img(self, img):
+        self._window_img = img
+
+    @property
+    def parent(self):
+        """parent `Grid` of this window"""
+        return self._parent
+
+    @property
+    def offset(self):
+        """(column, row) index of the window origin in the parent grid"""
+        return self._col0, self._row0
+
+    @property
+    def is_materialized(self):
+        """True if the window has been copied to a temporary grid for native access"""
+        return self._materialized is not None
+
+    @property
+    def nx(self):
+        """window x dimension (number of columns)"""
+        return self._nx
+
+    @property
+    def ny(self):
+        """window y dimension (number of rows)"""
+        return self._ny
+
+    @property
+    def x0(self):
+        """window origin x location in the plane coordinate system"""
+        return _window_origin(self._parent, self._col0, self._row0)[0]
+
+    @property
+    def y0(self):
+        """window origin y location in the plane coordinate system"""
+        return _window_origin(self._parent, self._col0, self._row0)[1]
+
+    @property
+    def dx(self):
+        """separation between grid points in the grid x direction"""
+        return self._parent.dx
+
+    @property
+    def dy(self):
+        """separation between grid points in the grid y direction"""
+        return self._parent.dy
+
+    @property
+    def rot(self):
+        """grid rotation angle, degrees azimuth"""
+        return self._parent.rot
+
+    @property
+    def is_color(self):
+        """ returns True if grid contains colors. is_int will also be True"""
+        return self._parent.is_color
+
+    @property
+    def coordinate_system(self):
+        """parent grid coordinate system"""
+        return self._parent.coordinate_system
+
+    @property
+    def metadata(self):
+        """parent grid metadata"""
+        return self._parent.metadata
+
+    @property
+    def unit_of_measure(self):
+        """parent grid data unit of measure"""
+        return self._parent.unit_of_measure
+
+    @property
+    def gridtype(self):
+        """parent grid type"""
+        return self._parent.gridtype
+
+    @property
+    def name(self):
+        """window name, which is the parent name with the window offset and dimensions"""
+        return self._name
+
+    def statistics(self, gxst=None):
+        """
+        Calculate and return window data statistics as a dictionary, see `Grid.statistics`.
+        """
+
+        if gxst is None:
+            gxst = gxapi.GXST.create()
+        block_rows = self._block_length(self.nx, np.dtype(self.dtype).itemsize)
+        for row in range(0, self.ny, block_rows):
+            data = self.read_rows(row, min(block_rows, self.ny - row))
+            if not self._is_int:
+                data[np.isnan(data)] = self._dummy
+            gxst.data_vv(gxvv.GXvv(data.ravel(), dtype=self.dtype).gxvv)
+
+        return _statistics_dict(gxst)
+
+    def read_row(self, row=None, start=0, length=None):
+        """
+        Read a row of the window, see `Grid.read_row`.
+        """
+
+        if row is None:
+            row = self._next_row
+        self._next_row = row + 1
+        if self._next_row == self.ny:
+            self._next_row = 0
+
+        if row >= self.ny:
+            raise GridException(_t('Attempt to read row {} past the last row {}'.format(row, self.ny)))
+        if not length:
+            length = self.nx - start
+        vv = gxvv.GXvv(dtype=self.dtype)
+        self._parent.gximg.read_y(self._row0 + row, self._col0 + start, length, vv.gxvv)
+
+        return vv
+
+    def read_column(self, column=None, start=0, length=0):
+        """
+        Read a column of the window, see `Grid.read_column`.
+        """
+
+        if column is None:
+            column = self._next_col
+        if column >= self.nx:
+            raise GridException(_t('Attempt to read column {} past the last column {}'.format(column, self.nx)))
+        self._next_col = column + 1
+        if self._next_col == self.nx:
+            self._next_col = 0
+
+        if not length:
+            length = self.ny - start
+        vv = gxvv.GXvv(dtype=self.dtype)
+        self._parent.gximg.read_x(self._col0 + column, self._row0 + start, length, vv.gxvv)
+
+        return vv
+
+    def read_window(self, row=0, nrows=None, col=0, ncols=None, out=None, dtype=None, block=None):
+        """
+        Read a rectangular part of the window from the parent grid, see `Grid.read_window`.
+        """
+
+        if nrows is None:
+            nrows = self.ny - row
+        if ncols is None:
+            ncols = self.nx - col
+        if ((row < 0) or (nrows <= 0) or (row + nrows > self.ny) or
+                (col < 0) or (ncols <= 0) or (col + ncols > self.nx)):
+            raise GridException(_t('Window rows ({}, {}) columns ({}, {}) out of range of grid ({}, {})')
+                                .format(row, nrows, col, ncols, self.nx, self.ny))
+
+        return self._parent.read_window(self._row0 + row, nrows, self._col0 + col, ncols,
+                                        out=out, dtype=dtype, block=block)
+
+    def _write_error(self, *args, **kwargs):
+        raise GridException(_t('{} is a read-only window, cannot write.').format(self.name))
+
+    write_rows = write_row = write_column = _write_error
+
+    def materialize(self, file_name=None, dtype=None, overwrite=False, mode=FILE_READWRITE):
+        """
+        Copy the window to a new grid.
+
+        :param file_name:   name of the new grid (file with optional decorations). If not specified a
+                            temporary file is created.
+        :param dtype:       numpy data type, None to use type of the parent grid
+        :param overwrite:   True to overwrite if the file exists, False to not overwrite.
+        :param mode:        `open` mode for working with the new grid.
+        :returns:           `Grid` instance
+
+        .. versionadded:: 2022.1
+        """
+        return Grid.copy(self, file_name, dtype=dtype, overwrite=overwrite, mode=mode)
+
+    def _copy_to(self, grid):
+        # stream the window into a new grid of the same dimensions
+        block_rows = self._block_length(self.nx, np.dtype(grid.dtype).itemsize)
+        with grid.row_writer(block_rows=block_rows) as writer:
+            for row in range(0, self.ny, block_rows):
+                writer.write(self.read_rows(row, min(block_rows, self.ny - row), dtype=grid.dtype))
+
+
+class GridRowWriter:
+    """
+    Streaming writer of rows to a grid.
+
+    Rows are passed in blocks of any size. Each block is converted to the grid data type in a reusable
+    staging buffer, with numpy.nan converted to the grid dummy once for the whole block, and the block is
+    written through a single native vector.  Instances are normally created by `Grid.row_writer`.
+
+    :param grid:        `Grid` instance open for writing
+    :param row:         first row to write
+    :param col:         first column of each row
+    :param ncols:       number of columns in each row, default is to the end of the row
+    :param order:       1: write rows bottom to top; -1: top to bottom
+    :param block_rows:  number of rows staged per block, default fills `BULK_BLOCK_BYTES`
+    :param threaded:    `True` to convert blocks on a background thread. The conversion of each block
+                        overlaps the native write of the previous block, which always happens in the
+                        calling thread, the thread of the GX context.
+
+    .. versionadded:: 2022.1
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, '_open', False):
+            self.close()
+
+    def __init__(self, grid, row=0, col=0, ncols=None, order=1, block_rows=None, threaded=False):
+
+        if grid._readonly:
+            raise GridException(_t('{} opened as read-only, cannot write.').format(grid.file_name_decorated))
+        if ncols is None:
+            ncols = grid.nx - col
+        if (col < 0) or (ncols <= 0) or (col + ncols > grid.nx):
+            raise GridException(_t('Columns ({}, {}) out of range of grid nx {}').format(col, ncols, grid.nx))
+        if order not in (1, -1):
+            raise GridException(_t('order must be 1 or -1'))
+
+        self._grid = grid
+        self._next_row = row
+        self._col = col
+        self._ncols = ncols
+        self._order = order
+        self._dtype = np.dtype(grid.dtype)
+        self._gxtype = gxu.gx_dtype(self._dtype)
+        self._dummy = gxu.gx_dummy(self._dtype)
+        self._block_rows = grid._block_length(ncols, self._dtype.itemsize, block_rows)
+
+        nstage = 2 if threaded else 1
+        self._stages = [np.empty((self._block_rows, ncols), dtype=self._dtype) for _ in range(nstage)]
+        self._stage = 0
+        self._row_vv = gxapi.GXVV.create_ext(self._gxtype, ncols)
+        self._row_vv.set_len(ncols)
+        self._block_vv = gxapi.GXVV.create_ext(self._gxtype, self._block_rows * ncols)
+        self._block_vv.set_len(self._block_rows * ncols)
+
+        self._executor = ThreadPoolExecutor(max_workers=1) if threaded else None
+        self._pending = None
+        self.rows_written = 0
+        self._open = True
+
+    @property
+    def next_row(self):
+        """the grid row that will receive the next row written"""
+        return self._next_row
+
+    def _convert(self, data, stage):
+        """convert a block into a staging buffer, nan to dummy, returns the converted block"""
+        n = data.shape[0]
+        block = stage[:n]
+        if data.dtype.kind == 'f':
+            nan_mask = np.isnan(data)
+            with np.errstate(invalid='ignore'):
+                np.copyto(block, data, casting='unsafe')
+            if self._dtype.kind == 'f' or nan_mask.any():
+                block[nan_mask] = self._dummy
+        else:
+            np.copyto(block, data, casting='unsafe')
+        return block
+
+    def _write_block(self, block):
+        """native write of a converted block, one row at a time through one vector"""
+        n, ncols = block.shape
+        self._block_vv.set_data(0, n * ncols, block.data.tobytes(), self._gxtype)
+        img = self._grid.gximg
+        row = self._next_row
+        for i in range(n):
+            if not (0 <= row < self._grid.ny):
+                raise GridException(_t('Attempt to write row {} outside the grid ny {}').format(row, self._grid.ny))
+            self._row_vv.copy2(0, self._block_vv, i * ncols, ncols)
+            img.write_y(row, self._col, ncols, self._row_vv)
+            row += self._order
+        self._next_row = row
+        self.rows_written += n
+
+    def _flush(self):
+        if self._pending is not None:
+            pending = self._pending
+            self._pending = None
+            self._write_block(pending.result())
+
+    def write(self, data):
+        """
+        Write a block of rows, or a single row.
+
+        :param data:    numpy array shaped (rows, ncols), or a single row shaped (ncols,). Float numpy.nan
+                        values are written as dummies.
+        """
+
+        if not self._open:
+            raise GridException(_t('Writer is closed.'))
+        if not isinstance(data, np.ndarray):
+            data = np.array(data)
+        if data.ndim == 1:
+            data = data.reshape((1, -1))
+        if data.ndim != 2 or data.shape[1] != self._ncols:
+            raise GridException(_t('Rows must have {} columns, got shape {}').format(self._ncols, data.shape))
+
+        for i0 in range(0, data.shape[0], self._block_rows):
+            block = data[i0: i0 + self._block_rows]
+            if self._executor is None:
+                self._write_block(self._convert(block, self._stages[0]))
+            else:
+                # convert this block on the worker while the previous block is written here
+                stage = self._stages[self._stage]
+                self._stage = (self._stage + 1) % len(self._stages)
+                converting = self._executor.submit(self._convert, block, stage)
+                self._flush()
+                self._pending = converting
+
+        # the caller may reuse data once we return
+        if self._pending is not None:
+            self._pending.result()
+
+    def close(self):
+        """Write any pending rows and release resources."""
+        if self._open:
+            self._open = False
+            try:
+                self._flush()
+            finally:
+                if self._executor is not None:
+                    self._executor.shutdown()
+                    self._executor = None
+                self._stages = None
+                self._grid._data_changed()
+
+
+class GridArray:
+    """
+    Lazy, numpy-sliceable view of grid data.
+
+    Data is read from the grid in fixed-size tiles only when a slice touches the tile, and tiles are held
+    in a least-recently-used cache that is bounded by a memory budget. Float dummies are numpy.nan.
+    Instances are normally obtained from `Grid.array` or `Grid.tiled_array`.
+
+    :param grid:        `Grid` instance
+    :param tile_shape:  (rows, columns) of each tile, default is `TILE_SHAPE`
+    :param cache_bytes: maximum bytes of cached tiles, default `CACHE_BYTES`. At least one tile is always
+                        cached.
+
+    Indexing follows numpy basic indexing with integers and slices, for example:
+
+    .. code::
+
+        with gxgrd.Grid.open('some_very_large.grd') as g:
+            a = g.array
+            row = a[5000]
+            value = a[5000, 200]
+            window = a[5000:5500, 200:300]
+            decimated = a[::10, ::10]
+
+    .. versionadded:: 2022.1
+    """
+
+    TILE_SHAPE = (256, 256)  #: default tile shape (rows, columns)
+    CACHE_BYTES = 256 * 1024 * 1024  #: default tile cache memory budget
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self.__dict__)
+
+    def __str__(self):
+        return '<class GridArray>: {} {} tiles({}, {})'.format(self._grid, self.shape,
+                                                               self._tile_shape[0], self._tile_shape[1])
+
+    def __init__(self, grid, tile_shape=None, cache_bytes=None):
+
+        if tile_shape is None:
+            tile_shape = self.TILE_SHAPE
+        if cache_bytes is None:
+            cache_bytes = self.CACHE_BYTES
+        tile_shape = (int(tile_shape[0]), int(tile_shape[1]))
+        if min(tile_shape) <= 0:
+            raise GridException(_t('Tile shape {} must be > 0').format(tile_shape))
+
+        self._grid = grid
+        self._shape = (grid.ny, grid.nx)
+        self._dtype = np.dtype(grid.dtype)
+        self._tile_shape = tile_shape
+        self._cache_bytes = int(cache_bytes)
+        self._tiles = OrderedDict()
+        self._cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __array__(self, dtype=None):
+        data = self[:, :]
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    @property
+    def shape(self):
+        """(ny, nx) shape of the grid data"""
+        return self._shape
+
+    @property
+    def ndim(self):
+        """number of dimensions, always 2"""
+        return 2
+
+    @property
+    def dtype(self):
+        """numpy dtype of the data"""
+        return self._dtype
+
+    @property
+    def tile_shape(self):
+        """(rows, columns) shape of the cached tiles"""
+        return self._tile_shape
+
+    @property
+    def cache_bytes(self):
+        """tile cache memory budget in bytes, can be set."""
+        return self._cache_bytes
+
+    @cache_bytes.setter
+    def cache_bytes(self, nbytes):
+        self._cache_bytes = int(nbytes)
+        self._evict()
+
+    @property
+    def cached_bytes(self):
+        """bytes currently held in the tile cache"""
+        return self._cached_bytes
+
+    def clear(self):
+        """Discard all cached tiles."""
+        self._tiles.clear()
+        self._cached_bytes = 0
+
+    def _evict(self):
+        while (self._cached_bytes > self._cache_bytes) and (len(self._tiles) > 1):
+            _, tile = self._tiles.popitem(last=False)
+            self._cached_bytes -= tile.nbytes
+
+    def tile(self, tile_row, tile_col):
+        """
+        Return a cached tile, reading it from the grid if necessary.
+
+        :param tile_row:    tile index in the row (y) direction
+        :param tile_col:    tile index in the column (x) direction
+        :returns:           numpy array of the tile data, which is at most `tile_shape`. Do not modify.
+        """
+
+        key = (tile_row, tile_col)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self.hits += 1
+            self._tiles.move_to_end(key)
+            return tile
+
+        self.misses += 1
+        th, tw = self._tile_shape
+        r0 = tile_row * th
+        c0 = tile_col * tw
+        tile = self._grid.read_window(r0, min(th, self._shape[0] - r0),
+                                      c0, min(tw, self._shape[1] - c0),
+                                      dtype=self._dtype)
+        self._tiles[key] = tile
+        self._cached_bytes += tile.nbytes
+        self._evict()
+        return tile
+
+    def window(self, row0, row1, col0, col1):
+        """
+        Return a copy of the data in rows row0 to row1-1 and columns col0 to col1-1.
+
+        :returns: numpy array shaped (row1 - row0, col1 - col0)
+        """
+
+        out = np.empty((max(0, row1 - row0), max(0, col1 - col0)), dtype=self._dtype)
+        if out.size == 0:
+            return out
+
+        th, tw = self._tile_shape
+        for ty in range(row0 // th, (row1 - 1) // th + 1):
+            ty0 = ty * th
+            r0 = max(row0, ty0)
+            r1 = min(row1, ty0 + th)
+            for tx in range(col0 // tw, (col1 - 1) // tw + 1):
+                tx0 = tx * tw
+                c0 = max(col0, tx0)
+                c1 = min(col1, tx0 + tw)
+                out[r0 - row0: r1 - row0, c0 - col0: c1 - col0] = \
+                    self.tile(ty, tx)[r0 - ty0: r1 - ty0, c0 - tx0: c1 - tx0]
+        return out
+
+    @staticmethod
+    def _span(item, n):
+        """return (first, last + 1, local_index) of an index or slice on an axis of length n"""
+
+        if isinstance(item, slice):
+            r = range(*item.indices(n))
+            if len(r) == 0:
+                return 0, 0, slice(0, 0)
+            if r.step > 0:
+                return r[0], r[-1] + 1, slice(None, None, r.step)
+            return r[-1], r[0] + 1, slice(None, None, r.step)
+
+        i = int(item)
+        if i < 0:
+            i += n
+        if (i < 0) or (i >= n):
+            raise IndexError(_t('index {} out of range {}').format(item, n))
+        return i, i + 1, 0
+
+    def __getitem__(self, item):
+
+        if not isinstance(item, tuple):
+            item = (item,)
+        if len(item) == 1:
+            item = (item[0], slice(None))
+        elif len(item) != 2:
+            raise IndexError(_t('Grid arrays have 2 dimensions, not {}').format(len(item)))
+
+        r0, r1, ri = self._span(item[0], self._shape[0])
+        c0, c1, ci = self._span(item[1], self._shape[1])
+        return self.window(r0, r1, c0, c1)[ri, ci]
+
+
 # grid utilities
 def array_locations(properties):
     """
@@ -1979,11 +3578,17 @@ def image_file(grid_file, image_file=None, image_type=gxmap.RASTER_FORMAT_PNG, p
 
     :return:            image file name.
 
+    PNG images of colour grids are written directly without a map, see `Grid.color_png`.
+
     .. versionadded:: 9.3.1
+
+    .. versionchanged:: 2022.1 direct PNG images of colour grids
     """
 
-    if color_map is None:
-        with Grid.open(grid_file) as g:
+    with Grid.open_pooled(grid_file) as g:
+        if g.is_color and _direct_png(image_type, contour, display_area):
+            return g.color_png(image_file, pix_width=pix_width, pix_32_bit=pix_32_bit)
+        if color_map is None:
             color_map = g.get_default_color_map()
 
     with gxagg.Aggregate_image.new(grid_file, shade=shade, color_map=color_map, contour=contour) as agg:
@@ -203,7 +203,7 @@ class GridFFT:
 
             if feath:
                 _xx, _xy = (xpg.n_cols() - grid.nx) // 2, (xpg.n_rows() - grid.ny) // 2
-                prep_grid = gxgrdu.feather(prep_grid, min(_xx, _xy))
+                prep_grid = gxgrdu.feather(prep_grid, min(_xx, _xy), in_place=True)
 
             return prep_grid
 
@@ -212,7 +212,7 @@ class GridFFT:
         gxc = gx.gx()  # for logging
 
         if not isinstance(grid, gxgrd.Grid):
-            grid = gxgrd.Grid.open(grid)
+            grid = gxgrd.Grid.open_pooled(grid)
         self._source_grid = grid
         self._name = self._source_grid.name
 
@@ -251,7 +251,7 @@ class GridFFT:
             exp_grid = gxgrd.Grid.from_data_array(ppg, properties=props)
 
             gxc.log(_t('Minimum-curvature surface fill...'))
-            self._prep_grid = gxgrdu.feather(gxgrdu.flood(exp_grid), min(xx, xy))
+            self._prep_grid = gxgrdu.feather(gxgrdu.flood(exp_grid), min(xx, xy), in_place=True)
 
         self._prep_grid.gximg.set_tr(self._trend)
 
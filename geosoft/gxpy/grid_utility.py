@@ -10,8 +10,13 @@ Geosoft grid and image utilities.
     
 """
 import os
+import re
+import ast
+import json
+import time
 import numpy as np
 import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import geosoft
 import geosoft.gxapi as gxapi
@@ -23,6 +28,7 @@ from . import view as gxv
 from . import group as gxgrp
 from . import gdb as gxgdb
 from . import geometry as gxgeo
+from . import coordinate_system as gxcs
 from . import utility as gxu
 from . import geometry_utility as gxgeou
 from . import grid_fft as gxfft
@@ -51,6 +57,18 @@ TILT_ANGLE = 5
 RETURN_PPOINT = 0
 RETURN_LIST_OF_PPOINT = 1
 RETURN_GDB = 2
+RETURN_ARRAYS = 3
+TILE_SHAPE = (512, 512)  #: default tile shape for tiled grid processing
+SAMPLE_BILINEAR = 0
+SAMPLE_NEAREST = 1
+MOSAIC_FIRST = 0
+MOSAIC_LAST = 1
+MOSAIC_MEAN = 2
+MOSAIC_FEATHER = 3
+CONVERT_DONE = 0
+CONVERT_SKIPPED = 1
+CONVERT_FAILED = 2
+CONVERT_BYTES_IN_FLIGHT = 1024 ** 3  #: default limit on source bytes converted at the same time
 
 
 def _t(s):
@@ -80,7 +98,7 @@ def remove_trend(grid, file_name=None, method=TREND_EDGE, overwrite=False):
     """
 
     if not isinstance(grid, gxgrd.Grid):
-        grid = gxgrd.Grid.open(grid, dtype=np.float64, mode=gxgrd.FILE_READ)
+        grid = gxgrd.Grid.open_pooled(grid, dtype=np.float64)
 
     # need GS_DOUBLE grids
     if grid.gxtype != gxapi.GS_DOUBLE:
@@ -127,6 +145,8 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
         work with longer wavelengths, but at the expense of speed and edge effects in cases of very powerful
         anomalies along the edge of a grid.
 
+    .. seealso:: `derivatives` to calculate several derivatives in one pass.
+
     .. versionadded 9.4
     """
 
@@ -134,7 +154,7 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
 
         # float64 grids for grid_vd
         if not isinstance(g, gxgrd.Grid):
-            g = gxgrd.Grid.open(g, dtype=np.float64, mode=gxgrd.FILE_READ)
+            g = gxgrd.Grid.open_pooled(g, dtype=np.float64)
 
         if g.dtype != np.float64:
             g = g.copy(g, gx.gx().temp_file('.grd(GRD)'), dtype=np.float32, overwrite=True)
@@ -185,7 +205,7 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
 
     # need float32 grids for grid_filt
     if not isinstance(grid, gxgrd.Grid):
-        grid = gxgrd.Grid.open(grid, dtype=np.float32, mode=gxgrd.FILE_READ)
+        grid = gxgrd.Grid.open_pooled(grid, dtype=np.float32)
 
     if dtype is None:
         return_dtype = grid.dtype
@@ -242,6 +262,146 @@ def derivative(grid, derivative_type, file_name=None, overwrite=False, dtype=Non
     return gxgrd.reopen(dxy, dtype=return_dtype)
 
 
+def _horizontal_difference(data, axis):
+    # central differences along an axis, one-sided where a neighbour is at the edge or dummy
+    ahead = np.full(data.shape, np.nan)
+    behind = np.full(data.shape, np.nan)
+    if axis == 1:
+        ahead[:, :-1] = data[:, 1:] - data[:, :-1]
+        behind[:, 1:] = data[:, 1:] - data[:, :-1]
+    else:
+        ahead[:-1] = data[1:] - data[:-1]
+        behind[1:] = data[1:] - data[:-1]
+    both = ~(np.isnan(ahead) | np.isnan(behind))
+    result = np.where(np.isnan(ahead), behind, ahead)
+    result[both] = (ahead[both] + behind[both]) * 0.5
+    return result
+
+
+def derivatives(grid, derivative_types, file_names=None, overwrite=False, dtype=None, fft=True, block_rows=None):
+    """
+    Calculate one or more derivatives of a grid in a single streaming pass.
+
+    The horizontal derivatives and all derived products are calculated together from blocks of grid rows,
+    each read with the row above and below (a sliding 3-row window), and only the requested grids are
+    written. If a Z derivative is needed it is calculated first, as in `derivative`, and streamed
+    through the same pass.
+
+    :param grid:                `geosoft.gxpy.grid.Grid` instance, or a file name
+    :param derivative_types:    derivative type, or a list of types, see `derivative`:
+                                `DERIVATIVE_X`, `DERIVATIVE_Y`, `DERIVATIVE_Z`, `DERIVATIVE_XY`,
+                                `DERIVATIVE_XYZ` or `TILT_ANGLE`.
+    :param file_names:          file name, or list of file names for each type, `None` for temporary files
+    :param overwrite:           True to overwrite existing files
+    :param dtype:               dtype for the returned grids, default is the same as the passed grid.
+    :param fft:                 `False` calculate the Z derivative with a space-domain convolution rather
+                                than an FFT.
+    :param block_rows:          number of rows per block, default limits blocks to `grid.BULK_BLOCK_BYTES`
+    :returns:                   `geosoft.gxpy.grid.Grid` instance, or list of instances for a list of types
+
+    .. note:: Horizontal derivatives are central differences between neighbouring cells, or one-sided
+        differences where a neighbouring cell is off the grid or dummy. These match `derivative` where
+        the neighbouring cells are valid.
+
+    .. versionadded:: 2022.1
+    """
+
+    single = not isinstance(derivative_types, (list, tuple))
+    if single:
+        derivative_types = [derivative_types]
+        file_names = [file_names]
+    elif file_names is None:
+        file_names = [None] * len(derivative_types)
+    if len(file_names) != len(derivative_types):
+        raise GridUtilityException(_t('Need a file name for each derivative type'))
+    for dt in derivative_types:
+        if dt not in (DERIVATIVE_X, DERIVATIVE_Y, DERIVATIVE_Z, DERIVATIVE_XY, DERIVATIVE_XYZ, TILT_ANGLE):
+            raise GridUtilityException(_t('Unknown derivative type {}').format(dt))
+
+    opened = not isinstance(grid, gxgrd.Grid)
+    if opened:
+        grid = gxgrd.Grid.open_pooled(grid)
+    dzg = None
+    results = []
+    try:
+        if dtype is None:
+            dtype = grid.dtype
+        uom = grid.unit_of_measure + '/' + grid.coordinate_system.unit_of_measure
+
+        # the Z derivative is written directly to its result if requested
+        if {DERIVATIVE_Z, DERIVATIVE_XYZ, TILT_ANGLE} & set(derivative_types):
+            dz_name = None
+            if DERIVATIVE_Z in derivative_types:
+                dz_name = file_names[derivative_types.index(DERIVATIVE_Z)]
+            dzg = derivative(grid, DERIVATIVE_Z, file_name=dz_name, overwrite=overwrite, fft=fft)
+            if dz_name is None and DERIVATIVE_Z not in derivative_types:
+                dzg.delete_files()
+
+        properties = grid.properties()
+        properties['dtype'] = dtype
+        writers = []
+        for dt, fn in zip(derivative_types, file_names):
+            if dt == DERIVATIVE_Z:
+                results.append(None)
+                writers.append(None)
+                continue
+            if fn is None:
+                fn = gx.gx().temp_file('.grd(GRD)')
+            result = gxgrd.Grid.new(fn, properties, overwrite=overwrite)
+            result.unit_of_measure = 'radians' if dt == TILT_ANGLE else uom
+            results.append(result)
+            writers.append(result.row_writer())
+
+        nx, ny = grid.nx, grid.ny
+        if block_rows is None:
+            block_rows = grid._block_length(nx, 8 * (4 + len(derivative_types)))
+        block_rows = max(1, int(block_rows))
+        try:
+            if any(w is not None for w in writers):
+                for row0 in range(0, ny, block_rows):
+                    nrows = min(block_rows, ny - row0)
+                    top = max(0, row0 - 1)
+                    window = grid.read_window(top, min(ny, row0 + nrows + 1) - top, dtype=np.float64)
+                    block = slice(row0 - top, row0 - top + nrows)
+
+                    with np.errstate(invalid='ignore'):
+                        dx = _horizontal_difference(window[block], 1) / grid.dx
+                        dy = _horizontal_difference(window, 0)[block] / grid.dy
+                        if dzg is not None:
+                            dz = dzg.read_window(row0, nrows, dtype=np.float64)
+                        products = {DERIVATIVE_X: dx, DERIVATIVE_Y: dy}
+                        for dt, writer in zip(derivative_types, writers):
+                            if writer is None:
+                                continue
+                            if dt not in products:
+                                if dt == DERIVATIVE_XY:
+                                    products[dt] = np.hypot(dx, dy)
+                                elif dt == DERIVATIVE_XYZ:
+                                    products[dt] = np.sqrt(dx * dx + dy * dy + dz * dz)
+                                else:
+                                    products[dt] = np.arctan2(dz, np.hypot(dx, dy))
+                            writer.write(products[dt])
+        finally:
+            for writer in writers:
+                if writer is not None:
+                    writer.close()
+
+        for i, dt in enumerate(derivative_types):
+            if dt == DERIVATIVE_Z:
+                results[i] = gxgrd.reopen(dzg, dtype=dtype)
+                dzg = None
+            else:
+                results[i] = gxgrd.reopen(results[i])
+
+    finally:
+        if dzg is not None:
+            dzg.close()
+        if opened:
+            grid.close()
+
+    return results[0] if single else results
+
+
 def tilt_depth(grid, resolution=None, return_as=RETURN_PPOINT, gdb=None, overwrite=False, fft=True):
     """
     Return estimate of the depth sources of potential filed anomalies.
@@ -328,7 +488,7 @@ def sample(grid, xyz):
     """
 
     if not isinstance(grid, gxgrd.Grid):
-        grid = gxgrd.Grid(grid, dtype=np.float64)
+        grid = gxgrd.Grid.open_pooled(grid, dtype=np.float64)
 
     if isinstance(xyz, gxgeo.Geometry):
         if xyz.coordinate_system != grid.coordinate_system:
@@ -342,6 +502,133 @@ def sample(grid, xyz):
     return vvz.np
 
 
+def sample_points(grids, xy, method=SAMPLE_BILINEAR, tile_shape=None):
+    """
+    Sample one or more co-registered grids at many point locations.
+
+    Points are located in the grid index space, sorted by grid tile, and each tile needed is read
+    once from each grid, so the cost is proportional to the number of points plus the number of
+    tiles that contain points, not the grid size. All interpolation is done with numpy.
+
+    :param grids:       `geosoft.gxpy.grid.Grid` instance or grid file name, or a list of these.
+                        All grids must have the same dimensions, origin, cell size and rotation.
+    :param xy:          numpy array shaped (-1, 2) or (-1, 3) of (x, y[, z]) locations in the grid
+                        coordinate system, or a `geosoft.gxpy.geometry.PPoint` instance, which is
+                        reprojected to the grid coordinate system if necessary.
+    :param method:      `SAMPLE_BILINEAR` (default) to interpolate between the four surrounding grid
+                        points, or `SAMPLE_NEAREST` for the nearest grid point.
+    :param tile_shape:  (rows, columns) of the tiles read from the grids, default `TILE_SHAPE`
+    :returns:           numpy float64 array of sampled values, numpy.nan outside the grids and where
+                        a required grid value is a dummy. For a single grid the array is 1-dimensional,
+                        for a list of grids the array is shaped (n_points, n_grids).
+
+    .. seealso:: `sample`, which samples one grid using the native library.
+
+    .. versionadded:: 2022.1
+    """
+
+    single = not isinstance(grids, (list, tuple))
+    if single:
+        grids = [grids]
+
+    opened = []
+    try:
+        grid_list = []
+        for g in grids:
+            if not isinstance(g, gxgrd.Grid):
+                g = gxgrd.Grid.open_pooled(g)
+                opened.append(g)
+            if g.is_color:
+                raise GridUtilityException(_t('Cannot sample colour grid {}').format(g.file_name))
+            grid_list.append(g)
+        g0 = grid_list[0]
+        for g in grid_list[1:]:
+            if (g.nx, g.ny, g.x0, g.y0, g.dx, g.dy, g.rot) != (g0.nx, g0.ny, g0.x0, g0.y0, g0.dx, g0.dy, g0.rot):
+                raise GridUtilityException(_t('Grid {} is not co-registered with grid {}')
+                                           .format(g.file_name, g0.file_name))
+
+        if isinstance(xy, gxgeo.Geometry):
+            if xy.coordinate_system != g0.coordinate_system:
+                xy = gxgeo.PPoint(xy, coordinate_system=g0.coordinate_system)
+            if xy.coordinate_system.is_oriented:
+                xy = xy.coordinate_system.oriented_from_xyz(xy)
+            xy = xy.pp
+        xy = np.asarray(xy, dtype=np.float64)
+        if xy.ndim != 2 or xy.shape[1] < 2:
+            raise GridUtilityException(_t('Points must be shaped (-1, 2) or (-1, 3), not {}').format(xy.shape))
+
+        # fractional grid index of each point
+        x = xy[:, 0] - g0.x0
+        y = xy[:, 1] - g0.y0
+        if g0.rot != 0.:
+            cos, sin = math.cos(math.radians(g0.rot)), math.sin(math.radians(g0.rot))
+            x, y = x * cos - y * sin, y * cos + x * sin
+        col = x / g0.dx
+        row = y / g0.dy
+
+        npoints = len(xy)
+        result = np.full((npoints, len(grid_list)), np.nan)
+        nx, ny = g0.nx, g0.ny
+        with np.errstate(invalid='ignore'):
+            if method == SAMPLE_NEAREST:
+                inside = (col >= -0.5) & (col < nx - 0.5) & (row >= -0.5) & (row < ny - 0.5)
+                c0 = np.clip(np.rint(col[inside]), 0, nx - 1).astype(np.int64)
+                r0 = np.clip(np.rint(row[inside]), 0, ny - 1).astype(np.int64)
+                stencil = 1
+            else:
+                inside = (col >= 0.) & (col <= nx - 1) & (row >= 0.) & (row <= ny - 1)
+                c0 = np.clip(np.floor(col[inside]), 0, max(0, nx - 2)).astype(np.int64)
+                r0 = np.clip(np.floor(row[inside]), 0, max(0, ny - 2)).astype(np.int64)
+                stencil = 2
+        index = np.flatnonzero(inside)
+        if len(index) == 0:
+            return result[:, 0] if single else result
+
+        if tile_shape is None:
+            tile_shape = TILE_SHAPE
+        th, tw = int(tile_shape[0]), int(tile_shape[1])
+        ntx = (nx + tw - 1) // tw
+        key = (r0 // th) * ntx + (c0 // tw)
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        index = index[order]
+        r0 = r0[order]
+        c0 = c0[order]
+        if stencil == 2:
+            fc = col[index] - c0
+            fr = row[index] - r0
+        starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+        ends = np.append(starts[1:], len(key))
+
+        for start, end in zip(starts, ends):
+            tr, tc = divmod(int(key[start]), ntx)
+            tr0 = tr * th
+            tc0 = tc * tw
+            # tiles overlap by one row and column so that every stencil is inside one tile
+            nrows = min(th + stencil - 1, ny - tr0)
+            ncols = min(tw + stencil - 1, nx - tc0)
+            lr = r0[start: end] - tr0
+            lc = c0[start: end] - tc0
+            for ig, g in enumerate(grid_list):
+                tile = g.read_window(tr0, nrows, tc0, ncols, dtype=np.float64)
+                if stencil == 1:
+                    result[index[start: end], ig] = tile[lr, lc]
+                    continue
+                lr1 = np.minimum(lr + 1, nrows - 1)
+                lc1 = np.minimum(lc + 1, ncols - 1)
+                wc = fc[start: end]
+                wr = fr[start: end]
+                z0 = tile[lr, lc] + wc * (tile[lr, lc1] - tile[lr, lc])
+                z1 = tile[lr1, lc] + wc * (tile[lr1, lc1] - tile[lr1, lc])
+                result[index[start: end], ig] = z0 + wr * (z1 - z0)
+
+    finally:
+        for g in opened:
+            g.close()
+
+    return result[:, 0] if single else result
+
+
 def grid_mosaic(mosaic, grid_list, type_decorate=''):
     """
     Combine a set of grids into a single grid.  Raises an error if the resulting grid is too large.
@@ -350,106 +637,225 @@ def grid_mosaic(mosaic, grid_list, type_decorate=''):
     :param grid_list:       list of input grid names
     :param type_decorate:   decoration for input grids if not default
     :returns:               `geosoft.gxpy.grid.Grid` instance
+    :raises:                GridUtilityException if a grid is rotated
 
     .. note:: If the coordinate systems are different the grids are
         reprojected to the coordinate system of the first grid.
 
+    .. seealso:: `mosaic_grids`, which supports blending of overlapping grids.
+
     .. versionadded:: 9.4
+
+    .. versionchanged:: 2022.1 built by `mosaic_grids` in blocks of rows. Where grids overlap valid data
+        from later grids replaces data from earlier grids, and dummies never replace valid data. Rotated
+        grids raise `GridUtilityException`, previously they were placed as if they were not rotated.
     """
 
-    def props(gn, repro=None):
-        with gxgrd.Grid.open(gn) as gg:
-            if repro:
-                gg.gximg.create_projected2(repro[0], repro[1])
-            return gg.properties()
-
-    def dimension(glist):
-
-        def dimg(_gd, _rep=None):
-            prp = props(_gd, _rep)
-            _x0 = prp.get('x0')
-            _y0 = prp.get('y0')
-            _xm = _x0 + (prp.get('nx') - 1) * prp.get('dx')
-            _ym = _y0 + (prp.get('ny') - 1) * prp.get('dy')
-            _ipj = prp.get('coordinate_system').gxipj
-            cell = prp.get('dx')
-            return _x0, _y0, _xm, _ym, (_ipj, cell)
-
-        def ndim(_x0, _xm, _dx):
-            return int((_xm - _x0 + _dx / 2.0) / _dx) + 1
-
-        dx0, dy0, dxm, dym, drepro = dimg(glist[0])
-        for gd in glist[1:]:
-            xx0, yy0, xxm, yym, r = dimg(gd, drepro)
-            if xx0 < dx0:
-                dx0 = xx0
-            if yy0 < dy0:
-                dy0 = yy0
-            if xxm > dxm:
-                dxm = xxm
-            if yym > dym:
-                dym = yym
-
-        # calculate new grid dimension
-        _p = props(glist[0])
-        nnx = ndim(dx0, dxm, _p.get('dx'))
-        nny = ndim(dy0, dym, _p.get('dy'))
-
-        return dx0, dy0, nnx, nny, dxm, dym
-
-    def locate(_x0, _y0, _p):
-
-        _dx = _p.get('dx')
-        _dy = _p.get('dy')
-        dsx = round((p.get('x0') - _x0) / _dx)
-        dsy = round((p.get('y0') - _y0) / _dy)
-
-        return dsx, dsy
-
-    def paste(gn, _mpg):
-        with gxgrd.Grid.open(gn) as _g:
-            _p = _g.properties()
-            _nx = _p.get('nx')
-            _ny = _p.get('ny')
-            gpg = _g.gxpg()
-            destx, desty = locate(x0, y0, _p)
-            gxc.log('    +{} nx,ny({},{})'.format(_g, _nx, _ny))
-            gxc.log('     Copy ({},{}) -> ({},{}) of ({},{})'.format(_nx, _ny, destx, desty, mnx, mny))
-            _mpg.copy_subset(gpg, desty, destx, 0, 0, _ny, _nx)
-            return
+    return mosaic_grids(grid_list, file_name=mosaic, blend=MOSAIC_LAST, type_decorate=type_decorate)
+
+
+def _edge_taper(length, width):
+    # raised cosine weights rising from the edges to 1 at `width` cells in from each edge
+    d = np.minimum(np.arange(length), np.arange(length)[::-1]) + 1.
+    return np.where(d < width, 0.5 - 0.5 * np.cos(np.pi * d / max(width, 1)), 1.)
+
+
+def mosaic_plan(grid_list, type_decorate=''):
+    """
+    Plan the placement of grids in a mosaic, see `mosaic_grids`.
+
+    The output grid has the coordinate system and cell size of the first grid and covers all grids.
+    Grids with a different coordinate system or cell size are reprojected to match the first grid.
+
+    :param grid_list:       list of grid file names
+    :param type_decorate:   decoration for input grids if not default
+    :returns:               (properties, placements), where properties is the mosaic grid properties
+                            dictionary and placements is a list of dictionaries, one for each input grid:
+
+        ============= ==============================================================
+        'grid'        decorated grid file name
+        'reproject'   True if the grid must be reprojected to the mosaic
+        'row', 'col'  mosaic row and column of the first grid cell
+        'nrows'       number of rows, in mosaic cells
+        'ncols'       number of columns, in mosaic cells
+        'overlaps'    list of the indexes of other grids that overlap this grid
+        ============= ==============================================================
+
+    Rotated grids are not supported and raise `GridUtilityException`.
+
+    .. versionadded:: 2022.1
+    """
 
-    gxc = gx.gx()
     if len(grid_list) == 0:
         raise GridUtilityException(_t('At least one grid is required'))
 
-    # create list of grids, all matching on coordinate system of first grid
-    grids = []
-    for i in range(len(grid_list)):
-        grids.append(gxgrd.decorate_name(grid_list[i], type_decorate))
+    placements = []
+    properties = None
+    for gn in grid_list:
+        gn = gxgrd.decorate_name(gn, type_decorate)
+        with gxgrd.Grid.open(gn, mode=gxgrd.FILE_READ) as g:
+            if properties is None:
+                properties = g.properties()
+                reproject = False
+            else:
+                reproject = (g.coordinate_system != properties['coordinate_system']) or \
+                            (g.dx != properties['dx']) or (g.dy != properties['dy'])
+                if reproject:
+                    g.gximg.create_projected2(properties['coordinate_system'].gxipj, properties['dx'])
+            if g.rot != 0.:
+                raise GridUtilityException(_t('Cannot mosaic rotated grid {}').format(gn))
+            placements.append({'grid': gn, 'reproject': reproject,
+                               'x0': g.x0, 'y0': g.y0, 'nrows': g.ny, 'ncols': g.nx})
+
+    dx = properties['dx']
+    dy = properties['dy']
+    x0 = min(p['x0'] for p in placements)
+    y0 = min(p['y0'] for p in placements)
+    for p in placements:
+        p['col'] = int(round((p.pop('x0') - x0) / dx))
+        p['row'] = int(round((p.pop('y0') - y0) / dy))
+    properties['x0'] = x0
+    properties['y0'] = y0
+    properties['nx'] = max(p['col'] + p['ncols'] for p in placements)
+    properties['ny'] = max(p['row'] + p['nrows'] for p in placements)
+
+    # overlapping windows
+    r0 = np.array([p['row'] for p in placements])
+    c0 = np.array([p['col'] for p in placements])
+    r1 = r0 + np.array([p['nrows'] for p in placements])
+    c1 = c0 + np.array([p['ncols'] for p in placements])
+    for i, p in enumerate(placements):
+        overlap = (r0 < r1[i]) & (r1 > r0[i]) & (c0 < c1[i]) & (c1 > c0[i])
+        overlap[i] = False
+        p['overlaps'] = [int(j) for j in np.flatnonzero(overlap)]
+
+    return properties, placements
+
+
+def mosaic_grids(grid_list, file_name=None, blend=MOSAIC_LAST, feather_width=20, type_decorate='',
+                 overwrite=False, block_rows=None, threads=None):
+    """
+    Mosaic a set of grids into a single grid.
+
+    A placement plan is made with `mosaic_plan`, and the mosaic is then built and written one block of rows
+    at a time, so memory is bounded by the mosaic width regardless of the number and size of the grids.
+    Grids are read, and reprojected if necessary, one at a time in the calling thread because native grid
+    handles belong to the thread of the GX context. Pasting data into the mosaic runs in other threads
+    while the following grids are read: grids that do not overlap other grids are pasted in parallel, and
+    grids that overlap are pasted in order by one thread and blended with the `blend` rule. Only valid
+    data is pasted, so dummy areas of a grid never replace data from another grid.
+
+    :param grid_list:       list of grid file names
+    :param file_name:       mosaic grid name, decorate with '(HGD)' to get an HGD. If not specified a
+                            temporary grid is created.
+    :param blend:           how overlapping data is combined:
+
+        =============== ======================================================
+        MOSAIC_FIRST    data from the first grid in the list
+        MOSAIC_LAST     data from the last grid in the list (default)
+        MOSAIC_MEAN     mean of the overlapping data
+        MOSAIC_FEATHER  mean weighted by a raised-cosine taper that reduces
+                        the weight of data within `feather_width` cells of
+                        the edge of each grid
+        =============== ======================================================
+
+    :param feather_width:   `MOSAIC_FEATHER` taper width in cells
+    :param type_decorate:   decoration for input grids if not default
+    :param overwrite:       `True` to overwrite an existing mosaic grid
+    :param block_rows:      number of rows per block, default limits blocks to `grid.BULK_BLOCK_BYTES`
+    :param threads:         number of threads used to paste grids that do not overlap other grids,
+                            default is the number of cores
+    :returns:               `geosoft.gxpy.grid.Grid` instance
+    :raises:                GridUtilityException if a grid is rotated
+
+    .. versionadded:: 2022.1
+    """
+
+    if blend not in (MOSAIC_FIRST, MOSAIC_LAST, MOSAIC_MEAN, MOSAIC_FEATHER):
+        raise GridUtilityException(_t('Invalid blend rule {}').format(blend))
 
-    # output grid
-    x0, y0, nx, ny, xm, ym = dimension(grids)
-    p = props(grids[0])
-    p['x0'] = x0
-    p['y0'] = y0
-    p['nx'] = nx
-    p['ny'] = ny
-    gxc.log('')
-    gxc.log('Mosaic: dim({},{}) x({},{}) y({},{}), cell({})...'.format(nx, ny, x0, xm, y0, ym, p.get('dx')))
-    master = gxgrd.Grid.new(mosaic, p)
-    gxc.log('Memory image ready ({}) dim({},{}) x0,y0({},{})'.
-            format(master, master.nx, master.ny, master.x0, master.y0))
+    properties, plan = mosaic_plan(grid_list, type_decorate)
+    nx = properties['nx']
+    ny = properties['ny']
+    gx.gx().log('Mosaic of {} grids: dim({},{})'.format(len(plan), nx, ny))
 
-    # paste grids onto master
-    mnx = master.nx
-    mny = master.ny
-    mpg = master.gxpg()
-    for g in grids:
-        paste(g, mpg)
+    if file_name is None:
+        file_name = gx.gx().temp_file('.grd(GRD)')
+    result = gxgrd.Grid.new(file_name, properties, overwrite=overwrite)
+    if block_rows is None:
+        block_rows = result._block_length(nx, 24)
+    weighted = blend in (MOSAIC_MEAN, MOSAIC_FEATHER)
+
+    def paste(value, weight, data, row, grid_row, p):
+        # paste data from grid_row of the grid at row of the block
+        c0 = p['col']
+        c1 = c0 + data.shape[1]
+        valid = ~np.isnan(data)
+        if weighted:
+            if blend == MOSAIC_FEATHER:
+                w = _edge_taper(p['nrows'], feather_width)[grid_row: grid_row + data.shape[0], np.newaxis] * \
+                    _edge_taper(p['ncols'], feather_width)
+            else:
+                w = 1.
+            w = np.where(valid, w, 0.)
+            value[row: row + data.shape[0], c0: c1] += np.where(valid, data, 0.) * w
+            weight[row: row + data.shape[0], c0: c1] += w
+        else:
+            np.copyto(value[row: row + data.shape[0], c0: c1], data, where=valid)
 
-    gxc.log('Mosaic completed: {}'.format(mosaic))
+    # paste order, the last pasted wins for MOSAIC_FIRST and MOSAIC_LAST
+    order = list(range(len(plan)))
+    if blend == MOSAIC_FIRST:
+        order.reverse()
 
-    return master
+    opened = {}
+    executor = ThreadPoolExecutor(max_workers=threads)
+    ordered = ThreadPoolExecutor(max_workers=1)
+    try:
+        with result.row_writer(threaded=True) as writer:
+            for row0 in range(0, ny, block_rows):
+                row1 = min(ny, row0 + block_rows)
+                value = np.zeros((row1 - row0, nx)) if weighted else np.full((row1 - row0, nx), np.nan)
+                weight = np.zeros((row1 - row0, nx)) if weighted else None
+
+                futures = []
+                for i in order:
+                    p = plan[i]
+                    r0 = max(row0, p['row'])
+                    r1 = min(row1, p['row'] + p['nrows'])
+                    if r0 >= r1:
+                        continue
+
+                    g = opened.get(i)
+                    if g is None:
+                        g = gxgrd.Grid.open(p['grid'], mode=gxgrd.FILE_READ)
+                        if p['reproject']:
+                            g.gximg.create_projected2(properties['coordinate_system'].gxipj, properties['dx'])
+                        opened[i] = g
+
+                    # native reads stay in this thread, the thread of the GX context
+                    data = g.read_window(r0 - p['row'], r1 - r0, dtype=np.float64)
+                    pool = ordered if p['overlaps'] else executor
+                    futures.append(pool.submit(paste, value, weight, data, r0 - row0, r0 - p['row'], p))
+
+                    if r1 == p['row'] + p['nrows']:
+                        opened.pop(i).close()
+
+                for f in wait(futures).done:
+                    f.result()
+                if weighted:
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        value = np.where(weight > 0., value / weight, np.nan)
+                writer.write(value)
+
+    finally:
+        executor.shutdown()
+        ordered.shutdown()
+        for g in opened.values():
+            g.close()
+
+    gx.gx().log('Mosaic completed: {}'.format(file_name))
+    return gxgrd.reopen(result)
 
 
 def grid_bool(g1, g2, joined_grid=None, opt=1, size=3, olap=1):
@@ -530,6 +936,9 @@ def contour_points(grid, value, max_segments=1000, resolution=None,
         RETURN_PPOINT         return results as a single `geosoft.gxpy.geometry.PPoint` instance
         RETURN_LIST_OF_PPOINT return results as a list of `geosoft.gxpy.geometry.PPoint` instances
         RETURN_GDB            return result as a `geosoft.gxpy.gdb.Geosoft_gdb` instance
+        RETURN_ARRAYS         return (offsets, xyz, level_index) arrays from `contour_arrays`, in
+                              which case `value` can be a list of levels. Locations are the
+                              grid cell edge crossings and `resolution` is not applied.
         ===================== ====================================================================
 
     :param gdb:         return database name, or a `geosoft.gxpy.gdv.Geosoft_database` instance. If not
@@ -541,8 +950,13 @@ def contour_points(grid, value, max_segments=1000, resolution=None,
         will have a z value 0.0.
 
     .. versionadded:: 9.4
+
+    .. versionchanged:: 2022.1 added `RETURN_ARRAYS`
     """
 
+    if return_as == RETURN_ARRAYS and gdb is None:
+        return contour_arrays(grid, value)
+
     if isinstance(grid, gxgrd.Grid):
         extent = grid.extent
         with grid.copy(grid) as g:
@@ -620,6 +1034,309 @@ def contour_points(grid, value, max_segments=1000, resolution=None,
     return pplist
 
 
+def _contour_cases():
+    # Marching-squares segments for each cell case, oriented with values >= level on the left.
+    # Cell corners are numbered counter-clockwise a(0), b(1), c(2), d(3) from (row, col), and edge k
+    # joins corner k to corner k + 1. Cases 16 and 17 are saddle cases 5 and 10 with a high centre.
+    segments = np.full((18, 2, 2), -1, dtype=np.int64)
+    for case in range(18):
+        bits = case if case < 16 else (5, 10)[case - 16]
+        high = [(bits >> k) & 1 for k in range(4)]
+        falling = [k for k in range(4) if high[k] and not high[(k + 1) % 4]]
+        rising = [k for k in range(4) if not high[k] and high[(k + 1) % 4]]
+        if len(falling) == 1:
+            segments[case, 0] = (falling[0], rising[0])
+        elif len(falling) == 2:
+            step = 1 if case >= 16 else -1
+            for i, k in enumerate(falling):
+                segments[case, i] = (k, (k + step) % 4)
+    return segments
+
+
+_CONTOUR_CASES = _contour_cases()
+
+
+def _contour_block(data, row0, levels, nx, ny):
+    # contour segments (from_node, to_node, from_rc, to_rc) of the cells of a block of rows
+
+    a = data[:-1, :-1]
+    b = data[:-1, 1:]
+    c = data[1:, 1:]
+    d = data[1:, :-1]
+    with np.errstate(invalid='ignore'):
+        cmin = np.fmin(np.fmin(a, b), np.fmin(c, d)).ravel()
+        cmax = np.fmax(np.fmax(a, b), np.fmax(c, d)).ravel()
+    valid = ~(np.isnan(a) | np.isnan(b) | np.isnan(c) | np.isnan(d)).ravel()
+
+    # (cell, level) pairs for all levels in (cell min, cell max]
+    cells = np.flatnonzero(valid)
+    lo = np.searchsorted(levels, cmin[cells], 'right')
+    hi = np.searchsorted(levels, cmax[cells], 'right')
+    count = hi - lo
+    cells = np.repeat(cells, count)
+    if len(cells) == 0:
+        return None
+    first = np.repeat(np.cumsum(count) - count, count)
+    lev = np.repeat(lo, count) + (np.arange(len(cells)) - first)
+    level = levels[lev]
+
+    ncols = nx - 1
+    i, j = np.divmod(cells, ncols)
+    corners = np.stack((a.ravel()[cells], b.ravel()[cells], c.ravel()[cells], d.ravel()[cells]))
+    high = corners >= level
+    case = high[0] * 1 + high[1] * 2 + high[2] * 4 + high[3] * 8
+    saddle = (case == 5) | (case == 10)
+    if saddle.any():
+        centre = corners[:, saddle].mean(axis=0) >= level[saddle]
+        case[saddle] = np.where(centre, np.where(case[saddle] == 5, 16, 17), case[saddle])
+
+    # crossing of edge k: node id, (row, col) location. Node ids are grouped by level so that
+    # the nodes of a contour are close together.
+    nhedge = ny * ncols
+    nedges = nhedge + (ny - 1) * nx
+    gi = i + row0
+    edge_ids = (gi * ncols + j, nhedge + gi * nx + j + 1, (gi + 1) * ncols + j, nhedge + gi * nx + j)
+
+    def crossing(k, sel):
+        v0 = corners[k, sel]
+        v1 = corners[(k + 1) % 4, sel]
+        t = (level[sel] - v0) / (v1 - v0)
+        r = gi[sel].astype(np.float64)
+        cc = j[sel].astype(np.float64)
+        if k == 0:
+            cc = cc + t
+        elif k == 1:
+            cc = cc + 1.
+            r = r + t
+        elif k == 2:
+            r = r + 1.
+            cc = cc + 1. - t
+        else:
+            r = r + 1. - t
+        return lev[sel] * nedges + edge_ids[k][sel], r, cc
+
+    nodes = [[], []]
+    locations = [[], []]
+    for s in range(2):
+        for end in range(2):
+            edge = _CONTOUR_CASES[case, s, end]
+            for k in range(4):
+                sel = np.flatnonzero(edge == k)
+                if len(sel):
+                    node, r, cc = crossing(k, sel)
+                    nodes[end].append((sel + s * len(cells), node))
+                    locations[end].append((sel + s * len(cells), r, cc))
+
+    def gather(parts, nsegments):
+        node = np.full(nsegments, -1, dtype=np.int64)
+        for sel, n in parts:
+            node[sel] = n
+        return node
+
+    def gather_rc(parts, nsegments):
+        rc = np.empty((nsegments, 2))
+        for sel, r, cc in parts:
+            rc[sel, 0] = r
+            rc[sel, 1] = cc
+        return rc
+
+    nsegments = 2 * len(cells)
+    from_node = gather(nodes[0], nsegments)
+    keep = from_node >= 0
+    return (from_node[keep], gather(nodes[1], nsegments)[keep],
+            gather_rc(locations[0], nsegments)[keep], gather_rc(locations[1], nsegments)[keep])
+
+
+def _walk(start, succ, stop):
+    # walk from start nodes in step until reaching a stop node or the end of a list, returns the
+    # (walker, node, distance) of every node visited and the (node, distance) at which each walker stopped
+    walkers = [np.zeros(0, dtype=np.int64)]
+    visited = [np.zeros(0, dtype=np.int64)]
+    distances = [np.zeros(0, dtype=np.int64)]
+    walker = np.arange(len(start))
+    node = start
+    end = np.full(len(start), -1, dtype=np.int64)
+    end_distance = np.zeros(len(start), dtype=np.int64)
+    distance = 0
+    while len(node):
+        walkers.append(walker)
+        visited.append(node)
+        distances.append(np.full(len(node), distance))
+        node = succ[node]
+        distance += 1
+        going = node >= 0
+        stopped = going & stop[np.maximum(node, 0)]
+        end[walker[stopped]] = node[stopped]
+        end_distance[walker[stopped]] = distance
+        going &= ~stopped
+        end_distance[walker[~going & ~stopped]] = distance
+        walker = walker[going]
+        node = node[going]
+    return np.concatenate(walkers), np.concatenate(visited), np.concatenate(distances), end, end_distance
+
+
+def _link_lists(pred, succ):
+    """
+    Rank the nodes of a set of linked lists and loops. Loops are opened at their lowest node.
+
+    :param pred:    predecessor of each node, -1 for none
+    :param succ:    successor of each node, -1 for none
+    :returns:       (head, rank, closed), the first node of the list of each node, the distance of each
+                    node from its head, and `True` for the heads of loops
+    """
+    n = len(pred)
+    head = np.full(n, -1, dtype=np.int64)
+    rank = np.zeros(n, dtype=np.int64)
+    closed = np.zeros(n, dtype=bool)
+    no_stop = np.zeros(n, dtype=bool)
+
+    # lists, walked from their heads
+    start = np.flatnonzero(pred < 0)
+    walker, node, distance, _, _ = _walk(start, succ, no_stop)
+    head[node] = start[walker]
+    rank[node] = distance
+
+    # loops, walked between anchors at the local minima of the node numbers, which include the lowest node
+    loop = np.flatnonzero(head < 0)
+    if len(loop):
+        anchor = np.zeros(n, dtype=bool)
+        anchor[loop] = (loop < pred[loop]) & (loop < succ[loop])
+        start = np.flatnonzero(anchor)
+        walker, node, distance, next_anchor, length = _walk(start, succ, anchor)
+
+        # walk each anchor around its loop of anchors to find the lowest anchor, and its distance
+        index = np.full(n, -1, dtype=np.int64)
+        index[start] = np.arange(len(start))
+        next_index = index[next_anchor]
+        lowest = np.arange(len(start))
+        to_lowest = np.zeros(len(start), dtype=np.int64)
+        total = length.copy()
+        active = np.flatnonzero(next_index != np.arange(len(start)))
+        at = next_index[active]
+        while len(active):
+            lower = start[at] < start[lowest[active]]
+            lowest[active[lower]] = at[lower]
+            to_lowest[active[lower]] = total[active[lower]]
+            total[active] += length[at]
+            at = next_index[at]
+            going = at != active
+            active = active[going]
+            at = at[going]
+        from_lowest = (total - to_lowest) % total
+
+        a = walker
+        head[node] = start[lowest[a]]
+        rank[node] = from_lowest[a] + distance
+        closed[start[lowest]] = True
+
+    return head, rank, closed
+
+
+def contour_arrays(grid, levels, block_rows=None):
+    """
+    Contour a grid at one or more levels, returning the contours as contiguous arrays.
+
+    Contours are traced with a numpy marching-squares algorithm in a single pass over blocks of grid rows
+    for all levels at once, and segments are stitched into polylines. Polylines are oriented such that values
+    greater than or equal to the level are on the left, and closed polylines end with their first point.
+
+    :param grid:        `geosoft.gxpy.grid.Grid` instance or grid file name
+    :param levels:      contour level, or a list or array of levels
+    :param block_rows:  number of rows per block, default limits blocks to `grid.BULK_BLOCK_BYTES`
+    :returns:           (offsets, xyz, level_index) where `xyz` is a (n, 3) float64 array of all polyline
+                        points, polyline `i` is `xyz[offsets[i]: offsets[i + 1]]` and it contours level
+                        `levels[level_index[i]]`. Polylines are ordered by level index.
+
+    .. note::   Contours through 3D oriented grids will be oriented in 3D. Grids that are not 3D oriented
+        will have a z value 0.0.
+
+    .. seealso:: `contour_points`
+
+    .. versionadded:: 2022.1
+    """
+
+    levels = np.atleast_1d(np.asarray(levels, dtype=np.float64))
+    if levels.ndim != 1 or np.any(np.isnan(levels)):
+        raise GridUtilityException(_t('Contour levels must be a list of numbers'))
+    sort = np.argsort(levels, kind='stable')
+    sorted_levels = levels[sort]
+
+    opened = not isinstance(grid, gxgrd.Grid)
+    if opened:
+        grid = gxgrd.Grid.open_pooled(grid)
+    try:
+        if grid.is_color:
+            raise GridUtilityException(_t('Cannot contour colour grid {}').format(grid.file_name))
+        nx, ny = grid.nx, grid.ny
+        if block_rows is None:
+            block_rows = grid._block_length(nx, 8 * (1 + len(levels)))
+        block_rows = max(1, int(block_rows))
+
+        # blocks of rows overlap by one row, the rows shared by the cells of each block
+        parts = []
+        for row0 in range(0, ny - 1, block_rows):
+            nrows = min(block_rows, ny - 1 - row0) + 1
+            data = grid.read_window(row0, nrows, dtype=np.float64)
+            segments = _contour_block(data, row0, sorted_levels, nx, ny)
+            if segments is not None:
+                parts.append(segments)
+
+        x0, y0, dx, dy, rot = grid.x0, grid.y0, grid.dx, grid.dy, grid.rot
+        cs = grid.coordinate_system
+    finally:
+        if opened:
+            grid.close()
+
+    if not parts:
+        return np.zeros(1, dtype=np.int64), np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+
+    from_node = np.concatenate([p[0] for p in parts])
+    to_node = np.concatenate([p[1] for p in parts])
+    nodes, index = np.unique(np.concatenate((from_node, to_node)), return_inverse=True)
+    nseg = len(from_node)
+    src = index[:nseg]
+    dst = index[nseg:]
+    rc = np.empty((len(nodes), 2))
+    rc[src] = np.concatenate([p[2] for p in parts])
+    rc[dst] = np.concatenate([p[3] for p in parts])
+
+    # every node has at most one predecessor and one successor
+    pred = np.full(len(nodes), -1, dtype=np.int64)
+    pred[dst] = src
+
+    succ = np.full(len(nodes), -1, dtype=np.int64)
+    succ[src] = dst
+    head, rank, closed = _link_lists(pred, succ)
+    level_index = sort[nodes // (ny * (nx - 1) + (ny - 1) * nx)]
+    order = np.lexsort((rank, head, level_index[head]))
+    rc = rc[order]
+    starts = np.flatnonzero(rank[order] == 0)
+    polyline_head = head[order][starts]
+    polyline_level = level_index[polyline_head]
+
+    # repeat the first point at the end of closed polylines
+    ends = np.append(starts[1:], len(order))
+    is_closed = closed[polyline_head]
+    rc = np.insert(rc, ends[is_closed], rc[starts[is_closed]], axis=0)
+    shift = np.concatenate(([0], np.cumsum(is_closed)))
+    offsets = np.append(starts, len(order)) + shift
+
+    gx_ = rc[:, 1] * dx
+    gy_ = rc[:, 0] * dy
+    xyz = np.zeros((len(rc), 3))
+    if rot != 0.:
+        cos, sin = math.cos(math.radians(rot)), math.sin(math.radians(rot))
+        xyz[:, 0] = x0 + gx_ * cos + gy_ * sin
+        xyz[:, 1] = y0 - gx_ * sin + gy_ * cos
+    else:
+        xyz[:, 0] = x0 + gx_
+        xyz[:, 1] = y0 + gy_
+    if cs is not None and cs.is_oriented:
+        xyz = cs.xyz_from_oriented(xyz)
+
+    return offsets, xyz, polyline_level
+
+
 def calculate_slope_standard_deviation(grid):
     """
     Return the standard deviation of the slopes.
@@ -651,7 +1368,320 @@ def calculate_slope_standard_deviation(grid):
             grid.close()
 
 
-def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=250, pass_tol=99.):
+def _mc_ghosts(p):
+    # two ghost nodes around the grid, extrapolated linearly from the edge for zero edge curvature
+    p[1, 2:-2] = 2. * p[2, 2:-2] - p[3, 2:-2]
+    p[0, 2:-2] = 3. * p[2, 2:-2] - 2. * p[3, 2:-2]
+    p[-2, 2:-2] = 2. * p[-3, 2:-2] - p[-4, 2:-2]
+    p[-1, 2:-2] = 3. * p[-3, 2:-2] - 2. * p[-4, 2:-2]
+    p[:, 1] = 2. * p[:, 2] - p[:, 3]
+    p[:, 0] = 3. * p[:, 2] - 2. * p[:, 3]
+    p[:, -2] = 2. * p[:, -3] - p[:, -4]
+    p[:, -1] = 3. * p[:, -3] - 2. * p[:, -4]
+
+
+def _mc_relax(surface, free, tension=0., tol=0., pastol=100., itrmax=200, omega=1.4):
+    """
+    Relax a surface towards a continuous curvature spline in tension, Smith and Wessel (1990).
+
+    Nodes are updated with over-relaxed Gauss-Seidel sweeps of the 13-point stencil of
+    `(1 - tension) * del4(z) - tension * del2(z) = 0`. The stencil reaches two nodes in each direction,
+    so nodes are updated in 9 interleaved (row % 3, col % 3) sub-lattices, each of which is a single
+    vectorized update.
+
+    :param surface: 2D float64 array, at least 2 x 2, updated in place
+    :param free:    2D boolean array, `True` for nodes to solve, `False` for fixed nodes
+    :param tension: tension between 0 and 1
+    :param tol:     change tolerance in a sweep
+    :param pastol:  percentage of free nodes that must change less than `tol` to stop
+    :param itrmax:  maximum number of sweeps
+    :param omega:   over-relaxation factor
+    :returns:       number of sweeps
+    """
+
+    ny, nx = surface.shape
+    nfree = np.count_nonzero(free)
+    if nfree == 0:
+        return 0
+    weight = free.astype(np.float64) * omega
+    allowed = nfree - nfree * pastol * 0.01
+
+    p = np.zeros((ny + 4, nx + 4))
+    p[2:-2, 2:-2] = surface
+    t = min(max(float(tension), 0.), 1.)
+    c1 = (8. * (1. - t) + t) / (20. * (1. - t) + 4. * t)
+    c2 = 2. * (1. - t) / (20. * (1. - t) + 4. * t)
+    c3 = (1. - t) / (20. * (1. - t) + 4. * t)
+
+    sweep = 0
+    while sweep < itrmax:
+        sweep += 1
+        _mc_ghosts(p)
+        failed = 0
+        for a in range(3):
+            for b in range(3):
+
+                def s(di, dj):
+                    return p[2 + a + di: 2 + ny + di: 3, 2 + b + dj: 2 + nx + dj: 3]
+
+                centre = s(0, 0)
+                delta = c1 * (s(-1, 0) + s(1, 0) + s(0, -1) + s(0, 1)) - \
+                    c2 * (s(-1, -1) + s(-1, 1) + s(1, -1) + s(1, 1)) - \
+                    c3 * (s(-2, 0) + s(2, 0) + s(0, -2) + s(0, 2))
+                delta -= centre
+                delta *= weight[a::3, b::3]
+                centre += delta
+                failed += np.count_nonzero(np.abs(delta) > tol)
+        if failed <= allowed:
+            break
+
+    surface[:] = p[2:-2, 2:-2]
+    return sweep
+
+
+def _mc_relax_masked(surface, free, tension=0., tol=0., pastol=100., itrmax=200, omega=1.4):
+    """
+    Relax only the free nodes of a surface, the work in each sweep is proportional to the number of
+    free nodes. See `_mc_relax` for the parameters.
+    """
+
+    ny, nx = surface.shape
+    rows, cols = np.nonzero(free)
+    nfree = len(rows)
+    if nfree == 0:
+        return 0
+    allowed = nfree - nfree * pastol * 0.01
+
+    p = np.zeros((ny + 4, nx + 4))
+    p[2:-2, 2:-2] = surface
+    pf = p.ravel()
+    w = nx + 4
+    t = min(max(float(tension), 0.), 1.)
+    c1 = (8. * (1. - t) + t) / (20. * (1. - t) + 4. * t)
+    c2 = 2. * (1. - t) / (20. * (1. - t) + 4. * t)
+    c3 = (1. - t) / (20. * (1. - t) + 4. * t)
+
+    # padded flat indices of the free nodes of each of the 9 (row % 3, col % 3) sub-lattices
+    color = (rows % 3) * 3 + cols % 3
+    flat = (rows + 2) * w + cols + 2
+    lattices = [flat[color == c] for c in range(9)]
+    lattices = [i for i in lattices if len(i)]
+
+    sweep = 0
+    while sweep < itrmax:
+        sweep += 1
+        _mc_ghosts(p)
+        failed = 0
+        for i in lattices:
+            delta = c1 * (pf[i - w] + pf[i + w] + pf[i - 1] + pf[i + 1]) - \
+                c2 * (pf[i - w - 1] + pf[i - w + 1] + pf[i + w - 1] + pf[i + w + 1]) - \
+                c3 * (pf[i - 2 * w] + pf[i + 2 * w] + pf[i - 2] + pf[i + 2])
+            delta -= pf[i]
+            delta *= omega
+            pf[i] += delta
+            failed += np.count_nonzero(np.abs(delta) > tol)
+        if failed <= allowed:
+            break
+
+    surface[free] = p[2:-2, 2:-2][free]
+    return sweep
+
+
+def _mc_fill(surface, free, tension=0., tol=0., pastol=100., itrmax=200):
+    # fill the free nodes of a surface, initialised from a recursively filled grid of half the resolution
+    ny, nx = surface.shape
+    if not free.any():
+        return
+    if min(nx, ny) > 8:
+        nyc = (ny - 2) // 2 + 2
+        nxc = (nx - 2) // 2 + 2
+
+        # coarse node (i, j) is the mean of the fixed fine nodes around fine node (2i, 2j)
+        value = np.zeros((2 * nyc + 1, 2 * nxc + 1))
+        count = np.zeros(value.shape)
+        value[1: ny + 1, 1: nx + 1] = np.where(free, 0., surface)
+        count[1: ny + 1, 1: nx + 1] = ~free
+        coarse = np.zeros((nyc, nxc))
+        coarse_count = np.zeros((nyc, nxc))
+        for di in range(3):
+            for dj in range(3):
+                coarse += value[di: di + 2 * nyc: 2, dj: dj + 2 * nxc: 2]
+                coarse_count += count[di: di + 2 * nyc: 2, dj: dj + 2 * nxc: 2]
+        coarse_free = coarse_count == 0.
+        coarse[~coarse_free] /= coarse_count[~coarse_free]
+        _mc_fill(coarse, coarse_free, tension, tol, pastol, itrmax)
+        surface[free] = _mc_refine(coarse, (ny, nx))[free]
+    else:
+        surface[free] = surface[~free].mean()
+    _mc_relax_masked(surface, free, tension, tol, pastol, itrmax)
+
+
+def _mc_refine(coarse, shape):
+    # bilinear interpolation of a coarse surface to a grid of twice the resolution
+    ny, nx = shape
+    nyc, nxc = coarse.shape
+    i = np.arange(ny) * 0.5
+    j = np.arange(nx) * 0.5
+    i0 = np.minimum(i.astype(np.int64), nyc - 1)
+    j0 = np.minimum(j.astype(np.int64), nxc - 1)
+    i1 = np.minimum(i0 + 1, nyc - 1)
+    j1 = np.minimum(j0 + 1, nxc - 1)
+    fi = np.minimum(i - i0, 1.)[:, np.newaxis]
+    fj = np.minimum(j - j0, 1.)
+    top = coarse[i0][:, j0] * (1. - fj) + coarse[i0][:, j1] * fj
+    bottom = coarse[i1][:, j0] * (1. - fj) + coarse[i1][:, j1] * fj
+    return top * (1. - fi) + bottom * fi
+
+
+def _mc_snap(gx, gy, v, factor, shape):
+    # mean of data values at the nearest node of a grid of nodes every `factor` cells
+    ny, nx = shape
+    col = np.rint(gx / factor).astype(np.int64)
+    row = np.rint(gy / factor).astype(np.int64)
+    inside = (col >= 0) & (col < nx) & (row >= 0) & (row < ny)
+    node = row[inside] * nx + col[inside]
+    count = np.bincount(node, minlength=nx * ny)
+    total = np.bincount(node, weights=v[inside], minlength=nx * ny)
+    fixed = count > 0
+    value = np.zeros(nx * ny)
+    value[fixed] = total[fixed] / count[fixed]
+    return value.reshape(shape), fixed.reshape(shape)
+
+
+def _near_data(fixed, radius):
+    # True for nodes within `radius` cells (Euclidean) of a fixed node
+    ny, nx = fixed.shape
+    g = np.where(fixed, 0., np.inf)
+    for i in range(1, ny):
+        np.minimum(g[i], g[i - 1] + 1., out=g[i])
+    for i in range(ny - 2, -1, -1):
+        np.minimum(g[i], g[i + 1] + 1., out=g[i])
+    g *= g
+    d2 = g.copy()
+    for d in range(1, min(int(radius), nx - 1) + 1):
+        np.minimum(d2[:, d:], g[:, :-d] + d * d, out=d2[:, d:])
+        np.minimum(d2[:, :-d], g[:, d:] + d * d, out=d2[:, :-d])
+    return d2 <= radius * radius
+
+
+def minimum_curvature(data,
+                      file_name=None, overwrite=False,
+                      unit_of_measure=None,
+                      coordinate_system=None,
+                      cs=None,
+                      area=None,
+                      bkd=None,
+                      tol=None,
+                      pastol=100.,
+                      itrmax=200,
+                      ti=0.,
+                      icgr=8):
+    """
+    Create a minimum-curvature surface grid from (x, y, value) arrays, solved in-process.
+
+    This solves the same continuous curvature spline in tension as
+    `geosoft.gxpy.grid.Grid.minimum_curvature` (Smith and Wessel, 1990), but directly from
+    numpy arrays, without building a temporary database. The surface is first solved on a coarse grid of
+    `icgr` cells, and each solution is interpolated to initialise the next finer grid until the final
+    cell size is reached. Data are honoured at the nearest grid node, and data that fall on the same node
+    are averaged.
+
+    :param data:        (x, y, value) data, as a (n, 3) array or a tuple of three arrays. Data with
+                        a value of `nan` are ignored.
+    :param file_name:   name of the grid file, `None` for a temporary grid.
+    :param overwrite:   `True` to overwrite existing file
+    :param unit_of_measure: string unit of measurement descriptor.
+    :param coordinate_system:   coordinate system
+
+    Gridding parameters have the same meaning as in `geosoft.gxpy.grid.Grid.minimum_curvature`:
+
+    :param cs:      The grid cell size in reference system units, default is a quarter of the
+                    nominal sample interval, `sqrt(area / #data)`.
+    :param area:    (xmin, ymin, xmax, ymax) - grid area, default is the data limits. Data outside the
+                    area are not used.
+    :param bkd:     Blanking distance, the default is the nominal sample interval.
+    :param tol:     The tolerance required for each grid cell. The default is 0.1
+                    percent of the range of the data.
+    :param pastol:  The percentage of points that must meet the tolerance, default is 100.
+    :param itrmax:  Maximum number of iterations at each grid resolution, default is 200.
+    :param ti:      The degree of internal tension (between 0 and 1), default 0.
+    :param icgr:    The course grid size relative to the final grid size, 16, 8, 4, 2 or 1. The
+                    default is 8.
+    :returns:       `geosoft.gxpy.grid.Grid` instance
+
+    .. seealso:: `geosoft.gxpy.grid.Grid.minimum_curvature`
+
+    .. versionadded:: 2022.1
+    """
+
+    if isinstance(data, tuple):
+        x, y, v = (np.asarray(d, dtype=np.float64).ravel() for d in data)
+    else:
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 3)
+        x, y, v = data[:, 0], data[:, 1], data[:, 2]
+    valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(v))
+    x, y, v = x[valid], y[valid], v[valid]
+    if len(v) == 0:
+        raise GridUtilityException(_t('No valid data to grid'))
+    if icgr not in (1, 2, 4, 8, 16):
+        raise GridUtilityException(_t('Coarse grid factor icgr must be 16, 8, 4, 2 or 1, found {}').format(icgr))
+
+    if area is None:
+        area = (x.min(), y.min(), x.max(), y.max())
+    xmin, ymin, xmax, ymax = (float(a) for a in area)
+    width = xmax - xmin
+    height = ymax - ymin
+    nominal = math.sqrt(width * height / len(v)) if width * height > 0. else max(width, height) / len(v)
+    if nominal <= 0.:
+        nominal = 1.
+    if not cs:
+        cs = nominal * 0.25
+    cs = float(cs)
+    if not bkd:
+        bkd = nominal
+    nx = max(2, int(math.ceil(width / cs - 1.0e-6)) + 1)
+    ny = max(2, int(math.ceil(height / cs - 1.0e-6)) + 1)
+    if tol is None:
+        tol = (v.max() - v.min()) * 0.001
+    tol = max(float(tol), 1.0e-25)
+
+    gx.gx().log('Minimum curvature: {} data, dim({},{}), cell {}'.format(len(v), nx, ny, cs))
+
+    # data locations in final grid cells
+    gcol = (x - xmin) / cs
+    grow = (y - ymin) / cs
+
+    surface = None
+    factor = icgr
+    while factor >= 1:
+        shape = ((ny - 2) // factor + 2, (nx - 2) // factor + 2)
+        value, fixed = _mc_snap(gcol, grow, v, factor, shape)
+        if surface is None:
+            surface = np.full(shape, v.mean())
+        else:
+            surface = _mc_refine(surface, shape)
+        surface[fixed] = value[fixed]
+        _mc_relax(surface, ~fixed, ti, tol, pastol, itrmax)
+        factor //= 2
+
+    surface[~_near_data(fixed, bkd / cs)] = np.nan
+
+    properties = {'nx': nx, 'ny': ny, 'x0': xmin, 'y0': ymin, 'dx': cs, 'dy': cs, 'rot': 0.,
+                  'dtype': np.float32}
+    if coordinate_system is not None:
+        properties['coordinate_system'] = coordinate_system
+    if file_name is None:
+        file_name = gx.gx().temp_file('.grd(GRD)')
+    grd = gxgrd.Grid.new(file_name, properties, overwrite=overwrite)
+    with grd.row_writer() as writer:
+        writer.write(surface)
+    if unit_of_measure is not None:
+        grd.unit_of_measure = unit_of_measure
+    return gxgrd.reopen(grd)
+
+
+def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=250, pass_tol=99.,
+          void_fill=False, tension=0.):
     """
     Flood blank areas in a grid based on a minimum-curvature surface.
 
@@ -662,11 +1692,21 @@ def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=
     :param max_iterations:  maximum iterations for fiting the surface
     :param pass_tol:        percentage of data that needs to pass the tolerance test when definint
                             the minimum-curfacture surface. The default is 99%.
+    :param void_fill:       `True` to solve only for the dummy cells of the grid, leaving valid cells
+                            unchanged. The surface in the dummy areas is first solved on coarser grids to
+                            initialise each finer grid, and `max_iterations` applies at each resolution.
+                            The work is proportional to the size of the dummy areas rather than to the
+                            size of the grid. The default `False` re-grids every valid cell with
+                            `geosoft.gxpy.grid.Grid.minimum_curvature`.
+    :param tension:         degree of internal tension between 0 (minimum curvature, the default) and
+                            1 (harmonic, which will not overshoot the data around dummy areas).
     :return:                `geosoft.gxpy.grid.Grid` instance of a flooded grid.
 
     .. seealso:: `geosoft.gxpy.grid.Grid.minimum_curvature`
 
     .. versionadded:: 9.4
+
+    .. versionchanged:: 2022.1 added `void_fill` and `tension`
     """
 
     def pg_rows(n):
@@ -680,6 +1720,9 @@ def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=
     if not isinstance(grid, gxgrd.Grid):
         grid = gxgrd.Grid.open(grid)
 
+    if void_fill:
+        return _flood_void(grid, file_name, overwrite, tolerance, max_iterations, pass_tol, tension)
+
     pg = grid.gxpg(False)
     rvv = gxvv.GXvv(dtype=grid.dtype)
     rvv.length = grid.nx
@@ -697,74 +1740,372 @@ def flood(grid, file_name=None, overwrite=False, tolerance=None, max_iterations=
                                                itrmax=max_iterations,
                                                pastol=pass_tol,
                                                tol=tolerance,
+                                               ti=tension,
                                                icgr=16,
                                                max_segments=grid.ny)
     filled_grid.set_properties(grid.properties())
     return filled_grid
 
 
-def feather(grid, width, edge_value=None, file_name=None, overwrite=False):
+def _flood_void(grid, file_name, overwrite, tolerance, max_iterations, pass_tol, tension):
+    # flood by solving only the dummy cells of the grid
+
+    data = grid.read_window(dtype=np.float64)
+    free = np.isnan(data)
+    nvoid = np.count_nonzero(free)
+    if nvoid == data.size:
+        raise GridUtilityException(_t('Grid has no valid data to flood'))
+    gx.gx().log('Flood {} dummy cells of {}'.format(nvoid, data.size))
+
+    if tolerance is None:
+        tolerance = np.std(data[~free], ddof=1) * 0.001 if data.size - nvoid > 1 else 0.
+    if nvoid:
+        _mc_fill(data, free, tension, max(float(tolerance), 1.0e-25), pass_tol, max_iterations)
+
+    if file_name is None:
+        file_name = gx.gx().temp_file('.grd(GRD)')
+    filled_grid = gxgrd.Grid.new(file_name, grid.properties(), overwrite=overwrite)
+    with filled_grid.row_writer() as writer:
+        writer.write(data)
+    return gxgrd.reopen(filled_grid)
+
+
+def _feather_taper(length, width):
+    # cosine taper from 0 at the edges to 1 at `width` cells in from the edge
+    taper = np.ones(length)
+    if width > 0:
+        e = np.cos(np.arange(1, width + 1) * (math.pi / width)) * 0.5 + 0.5
+        taper[-width:] = e
+        taper[:width] = e[::-1]
+    return taper
+
+
+def feather(grid, width, edge_value=None, file_name=None, overwrite=False, in_place=False):
     """
     Feather the edge of a grid to a constant value at the edge.
 
-    :param grid:        `geosoft.gxpy.grid.Grid` instance, or a file name
+    :param grid:        `geosoft.gxpy.grid.Grid` instance, or a file name, or a 2D numpy array
     :param file_name:   feathered grid file name, temporary created if `None`.
     :param overwrite:   `True` to overwrite existing file
     :param width:       feather width in cells around the grid, must be <= half the grid dimension
     :param edge_value:  edge value, default is the data mean
-    :return:            feathered grid `geosoft.gxpy.grid.Grid`
+    :param in_place:    `True` to feather the grid or numpy array in place. A grid must be writable.
+    :return:            feathered grid `geosoft.gxpy.grid.Grid`, or a numpy array if a numpy array is
+                        feathered.
+
+    The separable 2D taper is built once and applied to blocks of rows in a single pass. Numpy
+    arrays are feathered with numpy only, dummies are numpy.nan.
 
     .. versionadded:: 9.4
-    """
 
-    def _feather(dlen, w):
-        ff = np.ones(dlen)
-        e = np.array([math.cos((i + 1) * math.pi/w) for i in range(w)]) * 0.5 + 0.5
-        ff[-len(e):] = e
-        ff[:len(e)] = e[::-1]
-        return ff
+    .. versionchanged:: 2022.1 single pass in blocks of rows, added `in_place` and numpy arrays.
+    """
 
-    if not isinstance(grid, gxgrd.Grid):
-        grid = gxgrd.Grid.open(grid)
+    close_grid = False
+    if isinstance(grid, np.ndarray):
+        ny, nx = grid.shape
+    else:
+        if not isinstance(grid, gxgrd.Grid):
+            grid = gxgrd.Grid.open(grid, mode=gxgrd.FILE_READWRITE if in_place else gxgrd.FILE_READ)
+            close_grid = not in_place
+        nx, ny = grid.nx, grid.ny
 
-    if (width > grid.nx // 2) or (width > grid.ny // 2):
+    width = int(width)
+    if (width > nx // 2) or (width > ny // 2):
         raise GridUtilityException(_t('Width {} must be less than half the dimension ({}, {})')
-                                   .format(width, grid.nx, grid.ny))
+                                   .format(width, nx, ny))
+
+    row_taper = _feather_taper(ny, width)[:, np.newaxis]
+    col_taper = _feather_taper(nx, width)
+
+    if isinstance(grid, np.ndarray):
+        if edge_value is None:
+            edge_value = np.nanmean(grid)
+        if in_place:
+            if grid.dtype.kind != 'f':
+                raise GridUtilityException(_t('Only float arrays can be feathered in place'))
+            grid -= edge_value
+            grid *= row_taper * col_taper
+            grid += edge_value
+            return grid
+        return (grid - edge_value) * (row_taper * col_taper) + edge_value
 
     if edge_value is None:
         edge_value = grid.statistics()['mean']
 
-    pg = grid.gxpg()
-    pgf = gxapi.GXPG.create(pg.n_rows(), pg.n_cols(), pg.e_type())
-    vv = gxvv.GXvv(dtype=gxu.dtype_gx(pg.e_type()))
+    if in_place:
+        if grid._readonly:
+            raise GridUtilityException(_t('Grid {} is read-only').format(grid.file_name))
+        result = grid
+    else:
+        if file_name is None:
+            file_name = gx.gx().temp_file('.grd(GRD)')
+        result = gxgrd.Grid.new(file_name, properties=grid.properties(), overwrite=overwrite)
+
+    block_rows = grid._block_length(nx, 8)
+    with result.row_writer(threaded=True) as writer:
+        for row in range(0, ny, block_rows):
+            data = grid.read_rows(row, min(block_rows, ny - row), dtype=np.float64)
+            data -= edge_value
+            data *= row_taper[row: row + len(data)] * col_taper
+            data += edge_value
+            writer.write(data)
+
+    if in_place:
+        return grid
+    if close_grid:
+        grid.close()
+    return gxgrd.reopen(result)
+
+
+def _dummy_logic(f):
+    # comparisons and logic with a dummy operand are dummy, as in GXIEXP
+    def logic(*args):
+        args = [np.asarray(a, dtype=np.float64) for a in args]
+        dummy = np.isnan(args[0])
+        for a in args[1:]:
+            dummy = dummy | np.isnan(a)
+        return np.where(dummy, np.nan, f(*args))
+    return logic
+
+
+def _dummy_where(test, a, b):
+    # cond ? a : b, dummy where the condition is dummy
+    test = np.asarray(test, dtype=np.float64)
+    return np.where(np.isnan(test), np.nan, np.where(test != 0., a, b))
+
+
+_EXPRESSION_FUNCTIONS = {
+    'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+    'atan2': np.arctan2, 'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'min': np.minimum, 'max': np.maximum, 'pow': np.power, 'ceil': np.ceil, 'floor': np.floor,
+    'round': np.round, 'isnan': np.isnan,
+    '_and': _dummy_logic(np.logical_and), '_or': _dummy_logic(np.logical_or),
+    '_not': _dummy_logic(np.logical_not), '_where': _dummy_where,
+    '_eq': _dummy_logic(np.equal), '_ne': _dummy_logic(np.not_equal),
+    '_lt': _dummy_logic(np.less), '_le': _dummy_logic(np.less_equal),
+    '_gt': _dummy_logic(np.greater), '_ge': _dummy_logic(np.greater_equal)}
+_EXPRESSION_COMPARE = {ast.Eq: '_eq', ast.NotEq: '_ne', ast.Lt: '_lt', ast.LtE: '_le', ast.Gt: '_gt',
+                       ast.GtE: '_ge'}
+_EXPRESSION_CONSTANTS = {'pi': math.pi, 'e': math.e, 'DUMMY': np.nan, 'dummy': np.nan}
+_EXPRESSION_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+                     ast.Name, ast.Load, ast.Constant,
+                     ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.FloorDiv,
+                     ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+                     ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+def _split_top_level(text, sep):
+    # split at separators that are not inside parentheses
+    parts = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append(text[start: i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _c_ternary(text):
+    # convert C "cond ? a : b" to Python "(a if cond else b)", recursively within parentheses
+    out = ''
+    i = 0
+    while i < len(text):
+        if text[i] == '(':
+            depth = 1
+            j = i + 1
+            while j < len(text) and depth:
+                depth += {'(': 1, ')': -1}.get(text[j], 0)
+                j += 1
+            if depth:
+                raise GridUtilityException(_t('Unbalanced parentheses in "{}"').format(text))
+            out += '(' + ','.join(_c_ternary(a) for a in _split_top_level(text[i + 1: j - 1], ',')) + ')'
+            i = j
+        else:
+            out += text[i]
+            i += 1
+
+    q = _split_top_level(out, '?')
+    if len(q) == 1:
+        return out
+    # the matching ':' is the first one not claimed by a nested '?'
+    rest = '?'.join(q[1:])
+    depth = 0
+    nested = 0
+    for i, c in enumerate(rest):
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif depth == 0 and c == '?':
+            nested += 1
+        elif depth == 0 and c == ':':
+            if nested == 0:
+                return '(({}) if ({}) else ({}))'.format(_c_ternary(rest[:i]), q[0], _c_ternary(rest[i + 1:]))
+            nested -= 1
+    raise GridUtilityException(_t('Missing ":" in "{}"').format(text))
+
+
+def _operand_end(text, i):
+    # index past the operand that starts at text[i], which is a number, a name, a function call,
+    # a parenthesised expression or a C "!" applied to one of these
+    while i < len(text) and text[i].isspace():
+        i += 1
+    if text[i: i + 1] == '!':
+        return _operand_end(text, i + 1)
+    m = re.match(r'[A-Za-z_]\w*\s*(?=\()|[A-Za-z_]\w*|(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?', text[i:])
+    if m:
+        i += m.end()
+        if text[i: i + 1] != '(':
+            return i
+    elif text[i: i + 1] != '(':
+        raise GridUtilityException(_t('Missing operand for "!" in "{}"').format(text))
+    depth = 0
+    for j in range(i, len(text)):
+        depth += {'(': 1, ')': -1}.get(text[j], 0)
+        if depth == 0:
+            return j + 1
+    raise GridUtilityException(_t('Unbalanced parentheses in "{}"').format(text))
+
+
+def _c_not(text):
+    # convert C "!a" to "_not(a)", the C "!" applies only to the operand that follows it
+    out = ''
+    i = 0
+    while i < len(text):
+        if text[i] == '!' and text[i + 1: i + 2] != '=':
+            j = _operand_end(text, i + 1)
+            out += '_not({})'.format(_c_not(text[i + 1: j]))
+            i = j
+        else:
+            out += text[i]
+            i += 1
+    return out
+
 
-    f = _feather(pg.n_cols(), width)
-    for row in range(pg.n_rows()):
-        pg.read_row(row, 0, 0, vv.gxvv)
-        df = (vv.np - edge_value) * f + edge_value
-        pgf.write_row(row, 0, 0, gxvv.GXvv(df).gxvv)
+class _ExpressionTransformer(ast.NodeTransformer):
+    # make python logic element-wise on numpy arrays
 
-    f = _feather(pg.n_rows(), width)
-    for col in range(pg.n_cols()):
-        pgf.read_col(col, 0, 0, vv.gxvv)
-        df = (vv.np - edge_value) * f + edge_value
-        pgf.write_col(col, 0, 0, gxvv.GXvv(df).gxvv)
+    @staticmethod
+    def _call(name, args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        name = '_and' if isinstance(node.op, ast.And) else '_or'
+        result = node.values[0]
+        for v in node.values[1:]:
+            result = self._call(name, [result, v])
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call('_not', [node.operand])
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return self._call('_where', [node.test, node.body, node.orelse])
+
+    @staticmethod
+    def _is_dummy(node):
+        return isinstance(node, ast.Name) and node.id in ('DUMMY', 'dummy')
+
+    def _compare(self, left, op, right):
+        # "== DUMMY" tests for dummies, other comparisons with a dummy are dummy
+        if isinstance(op, (ast.Eq, ast.NotEq)) and (self._is_dummy(left) or self._is_dummy(right)):
+            test = self._call('isnan', [right if self._is_dummy(left) else left])
+            return test if isinstance(op, ast.Eq) else self._call('_not', [test])
+        return self._call(_EXPRESSION_COMPARE[type(op)], [left, right])
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left = node.left
+        result = None
+        for op, right in zip(node.ops, node.comparators):
+            c = self._compare(left, op, right)
+            result = c if result is None else self._call('_and', [result, c])
+            left = right
+        return result
 
-    return gxgrd.Grid.from_data_array(pgf, file_name=file_name, overwrite=overwrite, properties=grid.properties())
 
+def _compile_expression(expr, operands):
+    """
+    Compile a Python/C style grid expression into a list of (name, code) statements. The last
+    statement assigns the result '_'.
+    """
 
-def expression(grids, expr, result_file_name=None, overwrite=False):
+    statements = []
+    names = set(operands) | set(_EXPRESSION_CONSTANTS)
+    lines = [line.strip() for line in expr.split(';')]
+    lines = [line for line in lines if line]
+    if not lines:
+        raise GridUtilityException(_t('Empty expression'))
+
+    for line in lines:
+        target = '_'
+        lhs, eq, rhs = line.partition('=')
+        if eq and rhs[:1] != '=' and lhs[-1:] not in ('!', '<', '>', '=') and lhs.strip().isidentifier():
+            target = lhs.strip()
+            line = rhs
+
+        text = line.replace('&&', ' and ').replace('||', ' or ')
+        text = _c_not(text)
+        try:
+            tree = ast.parse(_c_ternary(text).strip(), mode='eval')
+        except SyntaxError as e:
+            raise GridUtilityException(_t('Invalid expression "{}": {}').format(line, e))
+        for node in ast.walk(tree):
+            if not isinstance(node, _EXPRESSION_NODES):
+                raise GridUtilityException(_t('Unsupported syntax "{}" in "{}"')
+                                           .format(node.__class__.__name__, line))
+            if isinstance(node, ast.Call) and \
+                    not (isinstance(node.func, ast.Name) and node.func.id in _EXPRESSION_FUNCTIONS):
+                raise GridUtilityException(_t('Unknown function in "{}"').format(line))
+            if isinstance(node, ast.Name) and node.id not in names and node.id not in _EXPRESSION_FUNCTIONS:
+                raise GridUtilityException(_t('Unknown name "{}" in "{}"').format(node.id, line))
+        tree = ast.fix_missing_locations(_ExpressionTransformer().visit(tree))
+        statements.append((target, compile(tree, '<expression>', 'eval')))
+        names.add(target)
+
+    if '_' not in names:
+        raise GridUtilityException(_t('Expression does not assign a result to "_"'))
+    return statements
+
+
+def expression(grids, expr, result_file_name=None, overwrite=False, block_rows=None):
     """
     Apply an expressing to grids.
 
     :param grids:       dictionary of named grid operands, or a list of grids (see example below). If a list
                         is provided the operand names will be 'g1', 'g2', 'g3', etc...
     :param expr:        expression string to apply, conforms to Python/C math expression syntax. The expression
-                        can have multiple lines, each line terminated by a ';' character.
+                        can have multiple lines, each line terminated by a ';' character. A line can assign
+                        an intermediate name, as in 'x = g1 * 2', otherwise the line is assigned to the
+                        result '_'.
     :param result_file_name:    optional result grid file name, if `None` a temporary grid is created.
     :param overwrite:   True to overwrite existing grid
+    :param block_rows:  number of rows evaluated at a time, default limits blocks to `grid.BULK_BLOCK_BYTES`
     :return:            `Grid` instance that contains the resuilt of the expression.
 
+    Co-registered grids are evaluated with numpy one block of rows at a time, reading each operand once
+    as float64 and streaming the result to the output grid. Dummies are numpy.nan, and results that are
+    not finite, such as from a division by zero, are dummies. Operators are Python operators, and the
+    C operators `&&`, `||`, `!` and `cond ? a : b`. As in `geosoft.gxapi.GXIEXP`, comparisons and
+    logic with a dummy operand are dummy, so `cond ? a : b` is dummy where `cond` is dummy, and
+    `== DUMMY` or `!= DUMMY` test for dummies. Functions are `abs`, `sqrt`, `exp`, `log`, `log10`,
+    `sin`, `cos`, `tan`, `asin`, `acos`, `atan`, `atan2`, `sinh`, `cosh`, `tanh`, `min`, `max`, `pow`,
+    `ceil`, `floor`, `round` and `isnan`, and constants are `pi`, `e` and `DUMMY`. Grids that are not
+    co-registered are evaluated by the native `geosoft.gxapi.GXIEXP`.
+
     *Example*
 
     .. code::
@@ -782,10 +2123,13 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
         # add using named operands
         sum = gxgrd.expression({'a': grid_1, 'b': grid_2}, 'a+b')
 
+        # intermediate results and C-style logic
+        sum = gxgrd.expression({'a': grid_1, 'b': grid_2}, 'a+b; t=_*2; _=(t>100 && b>0) ? t : DUMMY')
+
     .. versionadded 9.4
-    """
 
-    exp = gxapi.GXIEXP.create()
+    .. versionchanged 2022.1 evaluated with numpy in blocks of rows
+    """
 
     # build default operands dict from list of grids
     if not isinstance(grids, dict):
@@ -796,6 +2140,56 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
             i += 1
         grids = gd
 
+    opened = []
+    try:
+        operands = {}
+        for k, g in grids.items():
+            if not isinstance(g, gxgrd.Grid):
+                g = gxgrd.Grid.open_pooled(g)
+                opened.append(g)
+            operands[k] = g
+
+        g0 = next(iter(operands.values()))
+        registration = (g0.nx, g0.ny, g0.x0, g0.y0, g0.dx, g0.dy, g0.rot)
+        if any((g.nx, g.ny, g.x0, g.y0, g.dx, g.dy, g.rot) != registration for g in operands.values()):
+            return _expression_native(grids, expr, result_file_name, overwrite)
+
+        statements = _compile_expression(expr, operands)
+
+        properties = g0.properties()
+        properties['dtype'] = np.float64
+        if result_file_name is None:
+            result_file_name = gx.gx().temp_file('.grd(GRD)')
+        result = gxgrd.Grid.new(file_name=result_file_name, properties=properties, overwrite=overwrite)
+
+        if block_rows is None:
+            block_rows = g0._block_length(g0.nx, 8 * (len(operands) + 2))
+        namespace = dict(_EXPRESSION_FUNCTIONS)
+        namespace.update(_EXPRESSION_CONSTANTS)
+        with result.row_writer(threaded=True) as writer:
+            for row in range(0, g0.ny, block_rows):
+                nrows = min(block_rows, g0.ny - row)
+                for k, g in operands.items():
+                    namespace[k] = g.read_rows(row, nrows, dtype=np.float64)
+                with np.errstate(all='ignore'):
+                    for target, code in statements:
+                        namespace[target] = eval(code, {'__builtins__': {}}, namespace)
+                    value = np.broadcast_to(np.asarray(namespace['_'], dtype=np.float64), (nrows, g0.nx))
+                    value = np.where(np.isfinite(value), value, np.nan)
+                writer.write(value)
+
+    finally:
+        for g in opened:
+            g.close()
+
+    return gxgrd.reopen(result)
+
+
+def _expression_native(grids, expr, result_file_name=None, overwrite=False):
+    # evaluate an expression with GXIEXP, which resamples grids that are not co-registered
+
+    exp = gxapi.GXIEXP.create()
+
     # add grids to the expression
     properties = None
     delete_list = []
@@ -825,3 +2219,682 @@ def expression(grids, expr, result_file_name=None, overwrite=False):
         g.delete_files()
 
     return gxgrd.reopen(result)
+
+
+def kernel_mean(data, radius=1):
+    """
+    Tile kernel that returns the mean of valid (non-nan) values in a square window centred on each point.
+
+    :param data:    2D numpy float array
+    :param radius:  window radius in cells, the window is (2 * radius + 1) cells square
+    :returns:       2D numpy float array of the same shape, nan where the window has no valid data
+
+    Use with `tiled_process` and `halo >= radius`.
+
+    .. versionadded:: 2022.1
+    """
+
+    valid = ~np.isnan(data)
+    values = np.where(valid, data, 0.)
+
+    def window_sum(a):
+        # summed-area table, padded with a zero row and column
+        w = 2 * radius + 1
+        c = np.zeros((a.shape[0] + w, a.shape[1] + w))
+        c[radius + 1: radius + 1 + a.shape[0], radius + 1: radius + 1 + a.shape[1]] = a
+        c = c.cumsum(axis=0).cumsum(axis=1)
+        return c[w:, w:] - c[:-w, w:] - c[w:, :-w] + c[:-w, :-w]
+
+    total = window_sum(values)
+    count = window_sum(valid.astype(np.float64))
+    result = np.full(data.shape, np.nan)
+    np.divide(total, count, out=result, where=count > 0.5)
+    return result
+
+
+def _run_kernel(kernel, data, args):
+    return kernel(data, *args)
+
+
+def tiled_process(grid, kernel, args=(), halo=0, tile_shape=None, file_name=None, overwrite=False,
+                  dtype=None, processes=None, pad=None):
+    """
+    Apply a numpy kernel to a grid in overlapping tiles, in parallel, and return the result grid.
+
+    The grid is split into tiles, each extended by a `halo` of neighbouring cells. The kernel is called
+    for each extended tile in a pool of processes and the valid interior of each result is stitched into
+    the output grid. Tiles are processed one band of tiles at a time, so memory is bounded by a band of
+    grid rows regardless of the grid size.
+
+    :param grid:        `geosoft.gxpy.grid.Grid` instance, or a grid file name
+    :param kernel:      function `kernel(data, *args)`, where `data` is a 2D float64 numpy array of a
+                        tile with its halo, dummies are numpy.nan. The kernel must return an array of
+                        the same shape. To run in a process pool the kernel must be a module-level
+                        function. See `kernel_mean` for an example.
+    :param args:        tuple of additional arguments passed to the kernel
+    :param halo:        width in cells of the neighbourhood the kernel needs around each point
+    :param tile_shape:  (rows, columns) of each tile excluding the halo, default is `TILE_SHAPE`
+    :param file_name:   result grid file name, if `None` a temporary grid is created
+    :param overwrite:   `True` to overwrite existing file
+    :param dtype:       result data type, default is the grid data type
+    :param processes:   number of processes, default is the number of cores. Use 1 to run in this process.
+    :param pad:         how to fill the halo beyond the grid edges: `None` (default) fills with numpy.nan,
+                        otherwise a `numpy.pad` mode, for example 'edge' or 'reflect'.
+    :returns:           `geosoft.gxpy.grid.Grid` instance of the result
+
+    *Example*
+
+    .. code::
+
+        import geosoft.gxpy.grid_utility as gxgrdu
+
+        # 5x5 moving average using all cores
+        smooth = gxgrdu.tiled_process('some_grid.grd', gxgrdu.kernel_mean, args=(2,), halo=2)
+
+    .. versionadded:: 2022.1
+    """
+
+    if tile_shape is None:
+        tile_shape = TILE_SHAPE
+    th, tw = int(tile_shape[0]), int(tile_shape[1])
+    halo = int(halo)
+    if (th <= 0) or (tw <= 0) or (halo < 0):
+        raise GridUtilityException(_t('Invalid tile shape {} or halo {}').format(tile_shape, halo))
+
+    close_grid = False
+    if not isinstance(grid, gxgrd.Grid):
+        grid = gxgrd.Grid.open_pooled(grid)
+        close_grid = True
+    if processes is None:
+        processes = os.cpu_count()
+
+    nx = grid.nx
+    ny = grid.ny
+    properties = grid.properties()
+    if dtype is not None:
+        properties['dtype'] = dtype
+    if file_name is None:
+        file_name = gx.gx().temp_file('.grd(GRD)')
+
+    def extended_band(r0, r1):
+        # rows r0 - halo to r1 + halo, padded to full halo width on all sides
+        e0 = max(0, r0 - halo)
+        e1 = min(ny, r1 + halo)
+        band = grid.read_rows(e0, e1 - e0, dtype=np.float64)
+        pad_width = ((halo - (r0 - e0), halo - (e1 - r1)), (halo, halo))
+        if pad is None:
+            return np.pad(band, pad_width, mode='constant', constant_values=np.nan)
+        return np.pad(band, pad_width, mode=pad)
+
+    result = None
+    executor = None
+    try:
+        result = gxgrd.Grid.new(file_name=file_name, properties=properties, overwrite=overwrite)
+        if processes > 1:
+            executor = ProcessPoolExecutor(max_workers=processes)
+        with result.row_writer() as writer:
+            for r0 in range(0, ny, th):
+                r1 = min(ny, r0 + th)
+                band = extended_band(r0, r1)
+                tiles = []
+                for c0 in range(0, nx, tw):
+                    c1 = min(nx, c0 + tw)
+                    tile = band[:, c0: c1 + 2 * halo]
+                    if executor is None:
+                        tiles.append((c0, c1, _run_kernel(kernel, tile, args)))
+                    else:
+                        tiles.append((c0, c1, executor.submit(_run_kernel, kernel, tile, args)))
+
+                band_result = np.empty((r1 - r0, nx))
+                for c0, c1, tile_result in tiles:
+                    if executor is not None:
+                        tile_result = tile_result.result()
+                    if tile_result.shape != (r1 - r0 + 2 * halo, c1 - c0 + 2 * halo):
+                        raise GridUtilityException(_t('Kernel returned shape {}, expected {}')
+                                                   .format(tile_result.shape,
+                                                           (r1 - r0 + 2 * halo, c1 - c0 + 2 * halo)))
+                    band_result[:, c0: c1] = tile_result[halo: halo + r1 - r0, halo: halo + c1 - c0]
+                writer.write(band_result)
+
+    except:
+        # do not leave a partial result
+        if result is not None:
+            result.delete_files()
+            result.close()
+        raise
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if close_grid:
+            grid.close()
+
+    return gxgrd.reopen(result)
+
+
+class GridStatistics:
+    """
+    Single-pass streaming statistics of grid data, mergeable across tiles, grids and processes.
+
+    Data is added in blocks of any shape, with numpy.nan as dummies. Exact count, dummy count, min, max,
+    mean and variance are accumulated, and the distribution is summarised in a compact t-digest from which
+    approximate percentiles and histograms are calculated. Statistics accumulated separately, for example
+    from tiles of a grid processed in different processes, are combined with `merge` without re-reading
+    any data. Instances can be pickled.
+
+    :param histogram_range: (min, max) range of an exact fixed-bin histogram. If not specified the histogram
+                            is approximated from the t-digest over the data range.
+    :param bins:            number of histogram bins
+    :param compression:     t-digest compression, the approximate number of centroids retained. Larger values
+                            improve percentile accuracy at the cost of memory and time.
+
+    *Example*
+
+    .. code::
+
+        import geosoft.gxpy.grid_utility as gxgrdu
+
+        stats = gxgrdu.GridStatistics().add_grid('grid_a.grd')
+        stats.merge(gxgrdu.GridStatistics().add_grid('grid_b.grd'))
+        print(stats.statistics(), stats.percentile([5, 50, 95]))
+
+    .. versionadded:: 2022.1
+    """
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__, self.__dict__)
+
+    def __init__(self, histogram_range=None, bins=256, compression=200):
+        self._compression = int(compression)
+        self._bins = int(bins)
+        if histogram_range is not None:
+            self._edges = np.linspace(float(histogram_range[0]), float(histogram_range[1]), self._bins + 1)
+            self._counts = np.zeros(self._bins, dtype=np.int64)
+        else:
+            self._edges = None
+            self._counts = None
+        self._n = 0
+        self._n_dummy = 0
+        self._mean = 0.
+        self._m2 = 0.
+        self._min = np.inf
+        self._max = -np.inf
+        self._means = np.zeros(0)
+        self._weights = np.zeros(0)
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='mergesort')
+        means = means[order]
+        weights = weights[order]
+        q = (np.cumsum(weights) - 0.5 * weights) / weights.sum()
+        k = np.floor(self._compression * (np.arcsin(np.clip(2. * q - 1., -1., 1.)) / np.pi + 0.5))
+        starts = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+
+    def add(self, data):
+        """
+        Add a block of data.
+
+        :param data:    numpy array of any shape, numpy.nan values are dummies
+        :returns:       self
+
+        .. versionadded:: 2022.1
+        """
+
+        data = np.asarray(data, dtype=np.float64).ravel()
+        valid = data[~np.isnan(data)]
+        self._n_dummy += data.size - valid.size
+        n = valid.size
+        if n == 0:
+            return self
+
+        mean = valid.mean()
+        m2 = np.square(valid - mean).sum()
+        self._combine(n, mean, m2, valid.min(), valid.max())
+
+        if self._counts is not None:
+            self._counts += np.histogram(valid, self._edges)[0]
+
+        self._compress(np.concatenate((self._means, valid)),
+                       np.concatenate((self._weights, np.ones(n))))
+        return self
+
+    def add_grid(self, grid, block_rows=None):
+        """
+        Add all data from a grid, read one block of rows at a time.
+
+        :param grid:        `geosoft.gxpy.grid.Grid` instance or a grid file name
+        :param block_rows:  number of rows per block, the default limits blocks to `grid.BULK_BLOCK_BYTES`
+        :returns:           self
+
+        .. versionadded:: 2022.1
+        """
+
+        if not isinstance(grid, gxgrd.Grid):
+            with gxgrd.Grid.open_pooled(grid) as g:
+                return self.add_grid(g, block_rows)
+
+        if block_rows is None:
+            block_rows = grid._block_length(grid.nx, 8)
+        for row in range(0, grid.ny, block_rows):
+            self.add(grid.read_rows(row, min(block_rows, grid.ny - row), dtype=np.float64))
+        return self
+
+    def _combine(self, n, mean, m2, vmin, vmax):
+        # parallel variance combination of Chan et al.
+        total = self._n + n
+        delta = mean - self._mean
+        self._m2 += m2 + delta * delta * self._n * n / total
+        self._mean += delta * n / total
+        self._n = total
+        self._min = min(self._min, vmin)
+        self._max = max(self._max, vmax)
+
+    def merge(self, other):
+        """
+        Merge statistics from another `GridStatistics` instance into this instance.
+
+        :param other:   `GridStatistics` instance. Either both or neither instance must have an exact
+                        histogram, and exact histograms must have the same histogram range and bins.
+        :returns:       self
+
+        .. versionadded:: 2022.1
+        """
+
+        if (self._counts is None) != (other._counts is None) or \
+                (self._counts is not None and not np.array_equal(self._edges, other._edges)):
+            raise GridUtilityException(_t('Cannot merge statistics with different histograms'))
+        if self._counts is not None:
+            self._counts += other._counts
+        self._n_dummy += other._n_dummy
+        if other._n == 0:
+            return self
+        self._combine(other._n, other._mean, other._m2, other._min, other._max)
+        self._compress(np.concatenate((self._means, other._means)),
+                       np.concatenate((self._weights, other._weights)))
+        return self
+
+    @property
+    def num_data(self):
+        """number of valid data values"""
+        return self._n
+
+    @property
+    def num_dummy(self):
+        """number of dummy values"""
+        return self._n_dummy
+
+    @property
+    def min(self):
+        """minimum, None if there is no valid data"""
+        return float(self._min) if self._n else None
+
+    @property
+    def max(self):
+        """maximum, None if there is no valid data"""
+        return float(self._max) if self._n else None
+
+    @property
+    def mean(self):
+        """mean, None if there is no valid data"""
+        return float(self._mean) if self._n else None
+
+    @property
+    def variance(self):
+        """sample variance, None if there are fewer than 2 valid data values"""
+        return float(self._m2 / (self._n - 1)) if self._n > 1 else None
+
+    @property
+    def sd(self):
+        """sample standard deviation, None if there are fewer than 2 valid data values"""
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def _cdf_points(self):
+        # cumulative weight at each centroid, anchored by the exact min and max
+        cum = np.cumsum(self._weights) - 0.5 * self._weights
+        return (np.concatenate(([0.], cum, [float(self._n)])),
+                np.concatenate(([self._min], self._means, [self._max])))
+
+    def percentile(self, q):
+        """
+        Approximate percentiles.
+
+        :param q:   percentile or sequence of percentiles in the range 0 to 100
+        :returns:   percentile value or numpy array of values, None or nan if there is no valid data
+
+        .. versionadded:: 2022.1
+        """
+
+        if self._n == 0:
+            return None if np.ndim(q) == 0 else np.full(np.shape(q), np.nan)
+        cum, values = self._cdf_points()
+        result = np.interp(np.asarray(q, dtype=np.float64) * (self._n / 100.), cum, values)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def histogram(self):
+        """
+        Fixed-bin histogram.
+
+        :returns:   (counts, edges) numpy arrays, as for `numpy.histogram`. If the instance was created
+                    with a `histogram_range` counts are exact, otherwise counts are approximated from
+                    the t-digest over bins spanning the data range.
+
+        .. versionadded:: 2022.1
+        """
+
+        if self._counts is not None:
+            return self._counts.copy(), self._edges.copy()
+        if self._n == 0:
+            return np.zeros(self._bins, dtype=np.int64), np.linspace(0., 1., self._bins + 1)
+
+        edges = np.linspace(self._min, self._max, self._bins + 1)
+        cum, values = self._cdf_points()
+        cdf = np.interp(edges, values, cum)
+        cdf[-1] = self._n
+        counts = np.diff(np.rint(cdf)).astype(np.int64)
+        return counts, edges
+
+    def statistics(self):
+        """
+        Statistics as a dictionary, with keys consistent with `geosoft.gxpy.grid.Grid.statistics`:
+
+        =============== ============================
+        min             minimum
+        max             maximum
+        mean            mean
+        variance        sample variance
+        sd              sample standard deviation
+        sum             sum of all data
+        median          approximate median
+        num_data        number of valid data values
+        num_dummy       number of dummy values
+        =============== ============================
+
+        .. versionadded:: 2022.1
+        """
+
+        return {'min': self.min,
+                'max': self.max,
+                'mean': self.mean,
+                'variance': self.variance,
+                'sd': self.sd,
+                'sum': float(self._mean * self._n) if self._n else None,
+                'median': self.percentile(50.),
+                'num_data': self._n,
+                'num_dummy': self._n_dummy}
+
+
+def _grid_files(file_name):
+    # files on disk of a decorated grid name, ER Mapper data is in a file next to the header
+    path, base, root, ext, _ = gxgrd.name_parts(file_name)
+    files = [os.path.join(path, base)]
+    if ext.lower() == '.ers':
+        files.append(os.path.join(path, root))
+    return files
+
+
+def _files_stamp(files):
+    # (size, mtime) of each file, None if any file is missing
+    stamp = []
+    for f in files:
+        try:
+            st = os.stat(f)
+        except OSError:
+            return None
+        stamp.append([st.st_size, st.st_mtime_ns])
+    return stamp
+
+
+def _files_crc(files):
+    crc = 0
+    for f in files:
+        if os.path.isfile(f):
+            crc = gxu.crc32_file(f, crc)
+    return crc
+
+
+_conversion_gx = None
+
+
+def _conversion_worker_init():
+    # each worker process needs its own GX context
+    global _conversion_gx
+    _conversion_gx = gx.GXpy()
+
+
+def _convert_grid(source, target, dtype, coordinate_system, crc):
+    t0 = time.perf_counter()
+    try:
+        with gxgrd.Grid.open(source, coordinate_system=coordinate_system) as g:
+            cells = g.nx * g.ny
+            gxgrd.Grid.copy(g, target, dtype=dtype, overwrite=True).close()
+        source_crc = _files_crc(_grid_files(source)) if crc else None
+    except (geosoft.GXRuntimeError, gxapi.GXAPIError, OSError) as e:
+        return {'error': str(e), 'seconds': time.perf_counter() - t0}
+    return {'error': None, 'cells': cells, 'seconds': time.perf_counter() - t0, 'crc': source_crc}
+
+
+def _conversion_failed(e, t0):
+    # result of a conversion that raised an exception outside of _convert_grid, such as a worker
+    # process that failed to start or a result that could not be returned
+    return {'error': '{}: {}'.format(e.__class__.__name__, e), 'seconds': time.perf_counter() - t0}
+
+
+def convert_grids(jobs, workers=None, bytes_in_flight=None, skip_current=True, manifest=None, crc=False):
+    """
+    Convert a batch of grids to other formats, data types or coordinate systems in parallel.
+
+    :param jobs:            list of conversion jobs, each a tuple (source, target, dtype, coordinate_system),
+                            where source and target are decorated grid file names, for example
+                            ('elevation.ers(ERM)', 'elevation.grd(GRD)', numpy.float32, None).
+                            dtype and coordinate_system are optional and default to those of the source.
+                            The coordinate system can be anything accepted by
+                            `geosoft.gxpy.coordinate_system.Coordinate_system`.
+    :param workers:         number of worker processes, default is the number of cores. Use 1 to convert
+                            in this process.
+    :param bytes_in_flight: limit on the total size of source grids being converted at the same time,
+                            default is `CONVERT_BYTES_IN_FLIGHT`. A grid larger than the limit is converted
+                            on its own.
+    :param skip_current:    `True` (default) to skip jobs with up-to-date targets, see below.
+    :param manifest:        JSON file that records the source and target state of each completed conversion.
+                            The file is created if it does not exist.
+    :param crc:             `True` to also record the CRC of source grids in the manifest, such that a source
+                            with a changed modification time but the same size and content is still current.
+    :returns:               list of job results in the order of `jobs`, each a dictionary:
+
+        ================ ==============================================================
+        'source'         source grid
+        'target'         target grid
+        'status'         `CONVERT_DONE`, `CONVERT_SKIPPED` or `CONVERT_FAILED`
+        'error'          error message if the conversion failed, otherwise None
+        'seconds'        conversion time in seconds
+        'cells'          number of grid cells converted
+        'bytes'          source grid size on disk
+        'cells_per_sec'  conversion throughput in cells per second
+        'bytes_per_sec'  conversion throughput in source bytes per second
+        ================ ==============================================================
+
+    With a manifest, a target is up to date if the target files have not changed since they were
+    created, the job dtype and coordinate system are the same, and the source files have the same size
+    and modification time, or the same CRC if `crc` is `True`. Without a manifest a target is up to date
+    if it is newer than the source.
+
+    Each worker process creates its own GX context. A job that fails for any reason, including a
+    worker process that fails, is reported as `CONVERT_FAILED` and the other jobs continue. Worker
+    processes are started by importing the main script, which must therefore be import-safe.
+
+    *Example*
+
+    .. code::
+
+        import glob
+        import geosoft.gxpy.grid_utility as gxgrdu
+
+        if __name__ == '__main__':
+            jobs = [(ers + '(ERM)', ers[:-4] + '.grd(GRD)') for ers in glob.glob('surveys/*.ers')]
+            results = gxgrdu.convert_grids(jobs, manifest='surveys/conversion.json')
+
+    .. versionadded:: 2022.1
+    """
+
+    if bytes_in_flight is None:
+        bytes_in_flight = CONVERT_BYTES_IN_FLIGHT
+    if workers is None:
+        workers = os.cpu_count()
+    workers = max(1, int(workers))
+
+    records = {}
+    if manifest and os.path.isfile(manifest):
+        with open(manifest) as f:
+            records = json.load(f)
+
+    # normalise jobs to picklable arguments
+    tasks = []
+    for job in jobs:
+        job = tuple(job)
+        if len(job) < 2:
+            raise GridUtilityException(_t('A conversion job needs a source and target: {}').format(job))
+        source, target = job[0], job[1]
+        dtype = job[2] if len(job) > 2 else None
+        cs = job[3] if len(job) > 3 else None
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+        if isinstance(cs, gxcs.Coordinate_system):
+            cs = cs.json
+        source_files = _grid_files(source)
+        source_stamp = _files_stamp(source_files)
+        tasks.append({'source': source, 'target': target, 'dtype': dtype, 'cs': cs,
+                      'params': [None if dtype is None else dtype.str, cs],
+                      'key': os.path.normcase(os.path.abspath(_grid_files(target)[0])),
+                      'source_files': source_files,
+                      'source_stamp': source_stamp,
+                      'bytes': sum(s[0] for s in source_stamp) if source_stamp else 0})
+
+    def up_to_date(task):
+        target_stamp = _files_stamp(_grid_files(task['target']))
+        if target_stamp is None or task['source_stamp'] is None:
+            return False
+        record = records.get(task['key'])
+        if record is None:
+            if manifest:
+                return False
+            return min(s[1] for s in target_stamp) >= max(s[1] for s in task['source_stamp'])
+        if record['params'] != task['params'] or record['target'] != target_stamp:
+            return False
+        if record['source'] == task['source_stamp']:
+            return True
+        if record.get('crc') is None or [s[0] for s in record['source']] != [s[0] for s in task['source_stamp']]:
+            return False
+        if _files_crc(task['source_files']) != record['crc']:
+            return False
+        record['source'] = task['source_stamp']
+        return True
+
+    results = [None] * len(tasks)
+
+    def finish(i, result):
+        task = tasks[i]
+        seconds = result['seconds']
+        r = {'source': task['source'],
+             'target': task['target'],
+             'status': CONVERT_FAILED if result['error'] else CONVERT_DONE,
+             'error': result['error'],
+             'seconds': seconds,
+             'cells': result.get('cells', 0),
+             'bytes': task['bytes']}
+        r['cells_per_sec'] = r['cells'] / seconds if seconds > 0. else 0.
+        r['bytes_per_sec'] = r['bytes'] / seconds if seconds > 0. else 0.
+        results[i] = r
+        if r['status'] == CONVERT_FAILED:
+            records.pop(task['key'], None)
+            gx.gx().log(_t('Convert {} -> {} failed: {}').format(task['source'], task['target'], r['error']))
+        else:
+            records[task['key']] = {'params': task['params'],
+                                    'source': _files_stamp(task['source_files']),
+                                    'target': _files_stamp(_grid_files(task['target'])),
+                                    'crc': result.get('crc')}
+            gx.gx().log(_t('Convert {} -> {}: {:.2f}s, {:.1f} Mcells/s, {:.1f} MB/s')
+                        .format(task['source'], task['target'], seconds,
+                                r['cells_per_sec'] * 1.e-6, r['bytes_per_sec'] / 1048576.))
+
+    pending = []
+    for i, task in enumerate(tasks):
+        if skip_current and up_to_date(task):
+            results[i] = {'source': task['source'], 'target': task['target'], 'status': CONVERT_SKIPPED,
+                          'error': None, 'seconds': 0., 'cells': 0, 'bytes': task['bytes'],
+                          'cells_per_sec': 0., 'bytes_per_sec': 0.}
+        else:
+            pending.append(i)
+
+    t0 = time.perf_counter()
+    executor = None
+    try:
+        if workers == 1 or len(pending) <= 1:
+            for i in pending:
+                task = tasks[i]
+                t_job = time.perf_counter()
+                try:
+                    result = _convert_grid(task['source'], task['target'], task['dtype'], task['cs'], crc)
+                except Exception as e:
+                    result = _conversion_failed(e, t_job)
+                finish(i, result)
+
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                           initializer=_conversion_worker_init)
+            in_flight = {}
+            in_flight_bytes = 0
+            next_job = 0
+            while next_job < len(pending) or in_flight:
+
+                # submit while workers are free and the byte budget allows
+                while next_job < len(pending) and len(in_flight) < workers:
+                    i = pending[next_job]
+                    nbytes = tasks[i]['bytes']
+                    if in_flight and (in_flight_bytes + nbytes > bytes_in_flight):
+                        break
+                    task = tasks[i]
+                    next_job += 1
+                    t_job = time.perf_counter()
+                    try:
+                        future = executor.submit(_convert_grid, task['source'], task['target'],
+                                                 task['dtype'], task['cs'], crc)
+                    except Exception as e:
+                        # the pool is broken
+                        finish(i, _conversion_failed(e, t_job))
+                        continue
+                    in_flight[future] = (i, t_job)
+                    in_flight_bytes += nbytes
+
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, t_job = in_flight.pop(future)
+                    in_flight_bytes -= tasks[i]['bytes']
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = _conversion_failed(e, t_job)
+                    finish(i, result)
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if manifest:
+            temp = manifest + '.tmp'
+            with open(temp, 'w') as f:
+                json.dump(records, f, indent=1)
+            os.replace(temp, manifest)
+
+    seconds = time.perf_counter() - t0
+    converted = [r for r in results if r is not None and r['status'] == CONVERT_DONE]
+    total_bytes = sum(r['bytes'] for r in converted)
+    gx.gx().log(_t('Converted {} of {} grids in {:.2f}s, {:.1f} MB/s, {} skipped')
+                .format(len(converted), len(tasks), seconds,
+                        total_bytes / 1048576. / seconds if seconds > 0. else 0.,
+                        len(tasks) - len(pending)))
+
+    return results
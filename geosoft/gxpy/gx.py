@@ -47,6 +47,14 @@ class GXException(geosoft.GXRuntimeError):
 _singleton_getattr_default = object()
 _is_sphinx_build = os.environ.get('GEOSOFT_SPHINX_BUILD', '0') == '1'
 _tls = threading.local()
+_close_hooks = []
+
+
+def _register_close_hook(func):
+    """register a function called on the closing thread before a GX context is deleted"""
+    if func not in _close_hooks:
+        _close_hooks.append(func)
+
 
 def _get_gx_instance():
     return GXpyContext._get_instance()
@@ -292,6 +300,9 @@ class GXpyContext:
 
             self.log('\nGX closing')
 
+            for hook in _close_hooks:
+                hook()
+
             temp_folder = self.temp_folder()
             if temp_folder and (temp_folder != gxu.folder_temp()):
                 shutil.rmtree(temp_folder, ignore_errors=False, onerror=_log_file_error)
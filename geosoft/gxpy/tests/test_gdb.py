@@ -373,6 +373,76 @@ class Test(GXPYTest):
 
             gdb.discard()
 
+    def test_read_all(self):
+        self.start()
+
+        with gxdb.Geosoft_gdb.open(self.gdb_name) as gdb:
+            channels = ['X', 'Y', 'Z', 'dx']
+            data, lines, offsets, fids = gdb.read_all(channels, dtype=np.float64)
+            self.assertEqual(lines, list(gdb.list_lines()))
+            self.assertEqual(len(offsets), len(lines) + 1)
+            self.assertEqual(list(data), channels)
+            for c in channels:
+                self.assertEqual(data[c].shape, (offsets[-1],))
+                self.assertTrue(data[c].flags['C_CONTIGUOUS'])
+            for i, line in enumerate(lines):
+                npd, ch, fid = gdb.read_line(line, channels)
+                self.assertEqual(fids[i], fid)
+                for j, c in enumerate(channels):
+                    self.assertTrue(np.array_equal(data[c][offsets[i]: offsets[i + 1]], npd[:, j], equal_nan=True))
+
+            # channel types, and a stop after the first line
+            data, lines, offsets, fids = gdb.read_all('X', lines=['D578625', lines[0]], stop=lambda: True)
+            self.assertEqual(lines, ['D578625'])
+            self.assertEqual(data['X'].dtype, gdb.channel_dtype('X'))
+            self.assertEqual(list(offsets), [0, 832])
+            self.assertEqual(data['X'][10], 578625.0)
+
+    def test_read_all_va(self):
+        self.start()
+
+        with gxdb.Geosoft_gdb.new() as gdb:
+            va = gxdb.Channel.new(gdb, 'va', array=3)
+            gdb.write_channel('L0', 'x', np.arange(4.))
+            gdb.write_channel('L0', va, np.arange(12.).reshape((4, 3)))
+            gdb.write_channel('L1', 'x', np.arange(2.), fid=(2., 1.))
+            gdb.write_channel('L1', va, np.arange(6.).reshape((2, 3)), fid=(2., 1.))
+            gdb.write_channel('L2', 'y', np.arange(5.))
+
+            data, lines, offsets, fids = gdb.read_all(['x', 'va'])
+            self.assertEqual(lines, ['L0', 'L1', 'L2'])
+            self.assertEqual(list(offsets), [0, 4, 6, 6])
+            self.assertEqual(fids[1], (2., 1.))
+            self.assertEqual(data['va'].shape, (6, 3))
+            self.assertEqual(data['va'][5].tolist(), [3., 4., 5.])
+            self.assertEqual(data['x'].tolist(), [0., 1., 2., 3., 0., 1.])
+
+    def test_iter_lines(self):
+        self.start()
+
+        with gxdb.Geosoft_gdb.open(self.gdb_name) as gdb:
+            lines = list(gdb.list_lines())
+            channels = ['X', 'Y', 'Z']
+            for prefetch in (0, 1, 3):
+                n = 0
+                for line, npd, ch, fid in gdb.iter_lines(channels, prefetch=prefetch):
+                    self.assertEqual(line, lines[n])
+                    npd_line, ch_line, fid_line = gdb.read_line(line, channels)
+                    self.assertTrue(np.array_equal(npd, npd_line, equal_nan=True))
+                    self.assertEqual(ch, ch_line)
+                    self.assertEqual(fid, fid_line)
+                    n += 1
+                self.assertEqual(n, len(lines))
+
+            # stop early, the reader must let go
+            for line, npd, ch, fid in gdb.iter_lines(lines=lines[1:], prefetch=2, dtype=np.float32):
+                self.assertEqual(line, lines[1])
+                self.assertEqual(npd.dtype, np.float32)
+                break
+
+            with self.assertRaises(gxdb.GdbException):
+                list(gdb.iter_lines(['X', 'not_a_channel'], prefetch=2))
+
     def test_read_vv_GDB(self):
         self.start()
 
@@ -469,6 +539,26 @@ class Test(GXPYTest):
                 self.assertEqual(npd.shape, (832,1))
                 self.assertEqual(npd.shape[1], len(ch))
 
+                full, full_ch, full_fid = gdb.read_line('D2')
+                npd, ch, fid, mask = gdb.read_line('D2', dummy=gxdb.READ_REMOVE_DUMMYROWS, return_mask=True)
+                self.assertEqual(mask.shape, (832,))
+                self.assertEqual(np.count_nonzero(mask), 825)
+                self.assertEqual(fid, full_fid)
+                self.assertTrue(np.array_equal(npd, full[mask]))
+                self.assertTrue(np.isnan(full[~mask]).any(axis=1).all())
+
+                npd, ch, fid, mask = gdb.read_line('D2', dummy=gxdb.READ_REMOVE_DUMMYCOLUMNS, return_mask=True)
+                self.assertEqual(np.count_nonzero(mask), 2)
+                self.assertEqual(ch, [c for c, keep in zip(full_ch, mask) if keep])
+
+                npd, ch, fid, mask = gdb.read_line('D2', channels=('x', 'y'), dtype=np.int32,
+                                                   dummy=gxdb.READ_REMOVE_DUMMYCOLUMNS, return_mask=True)
+                self.assertEqual(np.count_nonzero(mask), 1)
+                self.assertEqual(ch, [c for c, keep in zip(['x', 'y'], mask) if keep])
+
+                npd, ch, fid, mask = gdb.read_line('D2', return_mask=True)
+                self.assertTrue(mask.all())
+
                 px = geosoft.gxpy.geometry.Point2(gdb.extent_xyz)
                 self.assertEqual(str(px), '_point2_[(578625.0, 7773625.0, -5261.5553894043005) (578625.0, 7782875.0, 1062.4999999999964)]')
 
@@ -539,6 +629,47 @@ class Test(GXPYTest):
             finally:
                 gdb.discard()
 
+    def test_extent_incremental(self):
+        self.start()
+
+        name = None
+        try:
+            with gxdb.Geosoft_gdb.new() as gdb:
+                name = gdb.file_name
+                gdb.write_line('L0', np.array([[0., 10.], [5., 12.], [np.nan, 11.]]), ['x', 'y'])
+                gdb.write_line('L1', np.array([[1., 20.], [2., 21.]]), ['x', 'y'])
+                gdb.xyz_channels = ('x', 'y')
+                self.assertEqual(gdb.extent.extent_xy, (0., 10., 5., 21.))
+
+                # writing a spatial channel updates the extent
+                gdb.write_channel('L1', 'x', np.array([-3., 2.]))
+                self.assertEqual(gdb.extent.extent_xy, (-3., 10., 5., 21.))
+
+                # selection
+                gdb.select_lines('L1', select=False)
+                self.assertEqual(gdb.extent.extent_xy, (0., 10., 5., 12.))
+                gdb.select_lines('L1')
+
+                # discarded changes are not kept
+                gdb.commit()
+                gdb.write_channel('L0', 'y', np.array([100., 101.]))
+                self.assertEqual(gdb.extent.extent_xy, (-3., 20., 5., 101.))
+                gdb.discard()
+                self.assertEqual(gdb.extent.extent_xy, (-3., 10., 5., 21.))
+
+                gdb.delete_line('L1')
+                self.assertEqual(gdb.extent.extent_xy, (0., 10., 5., 12.))
+
+            self.assertTrue(os.path.isfile(name + '.extent'))
+            with gxdb.Geosoft_gdb.open(name) as gdb:
+                self.assertEqual(gdb.extent.extent_xy, (0., 10., 5., 12.))
+                gdb.clear_extent()
+                self.assertEqual(gdb.extent.extent_xy, (0., 10., 5., 12.))
+
+        finally:
+            gxdb.delete_files(name)
+            self.assertFalse(os.path.isfile(name + '.extent'))
+
     def test_write_vv_GDB(self):
         self.start()
 
@@ -1166,6 +1297,48 @@ class Test(GXPYTest):
             finally:
                 gdb.discard()
 
+    def test_cache(self):
+        self.start()
+
+        with gxdb.Geosoft_gdb.new() as gdb:
+            gdb.write_channel('L0', 'x', np.arange(4.))
+            gdb.write_channel('L0', 'y', np.arange(4.) * 2.)
+            self.assertEqual(gdb.list_channels(), {'x': gdb.channel_name_symb('x')[1],
+                                                   'y': gdb.channel_name_symb('y')[1]})
+            self.assertEqual(gdb.channel_width('x'), 1)
+            self.assertEqual(gdb.scan_line_fid('L0', ['x', 'y'])[:4], (0., 1., 3., 2))
+
+            # writes change fiducials and lengths
+            gdb.write_channel('L0', 'y', np.arange(10.), fid=(-1., 0.5))
+            self.assertEqual(gdb.channel_fid('L0', 'y'), (-1., 0.5))
+            self.assertEqual(gdb.scan_line_fid('L0', ['x', 'y'])[:4], (-1., 0.5, 3.5, 2))
+            npd, ch, fid = gdb.read_line('L0', ['x', 'y'])
+            self.assertEqual(npd.shape, (10, 2))
+
+            # new, renamed and deleted channels and lines
+            gxdb.Channel.new(gdb, 'va', array=3)
+            self.assertEqual(len(gdb.list_channels()), 3)
+            self.assertEqual(gdb.channel_width('va'), 3)
+            gxdb.Channel(gdb, 'va').name = 'vb'
+            self.assertRaises(gxdb.GdbException, gdb.channel_name_symb, 'va')
+            self.assertEqual(gdb.channel_width('vb'), 3)
+            self.assertTrue('vb' in gdb.list_channels())
+            gdb.delete_channel('vb')
+            self.assertFalse('vb' in gdb.list_channels())
+            self.assertRaises(gxdb.GdbException, gdb.channel_name_symb, 'vb')
+
+            gdb.write_channel('L1', 'x', np.arange(2.))
+            self.assertEqual(gdb.line_name_symb('L1')[0], 'L1')
+            gdb.delete_line('L1')
+            self.assertRaises(gxdb.GdbException, gdb.line_name_symb, 'L1')
+
+            # channel list is a copy
+            channels = gdb.list_channels()
+            channels['z'] = 0
+            self.assertFalse('z' in gdb.list_channels())
+
+            gdb.clear_cache()
+            self.assertEqual(gdb.channel_fid('L0', 'y'), (-1., 0.5))
 
     def test_create_line_name(self):
         self.start()
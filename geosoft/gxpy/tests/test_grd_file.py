@@ -0,0 +1,139 @@
+import unittest
+import os
+import sys
+import subprocess
+import numpy as np
+
+import geosoft
+import geosoft.gxpy.grid as gxgrd
+import geosoft.gxpy.grd_file as gxgrdf
+
+from base import GXPYTest
+
+
+class Test(GXPYTest):
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpGXPYTest()
+        cls.data_folder = os.path.normpath(os.path.join(os.path.dirname(cls._test_case_py),
+                                                        '..', '..', '..', 'examples', 'data'))
+        cls.samples = [os.path.join(cls.data_folder, f) for f in ('TMI.GRD',
+                                                                  'bhn_tmi_250m.grd',
+                                                                  'test.grd',
+                                                                  'Wittichica DEM.grd')]
+
+    def test_version(self):
+        self.start()
+        self.assertEqual(gxgrdf.__version__, geosoft.__version__)
+
+    def test_read_samples(self):
+        self.start()
+
+        for sample in self.samples:
+            with gxgrdf.GrdFile.open(sample) as grd, gxgrd.Grid.open(sample) as g:
+                self.assertTrue(grd.is_compressed)
+                self.assertEqual(grd.shape, (g.ny, g.nx))
+                p = grd.properties()
+                gp = g.properties()
+                for key in ('nx', 'ny', 'x0', 'y0', 'dx', 'dy', 'rot', 'is_color', 'dtype'):
+                    self.assertEqual(p[key], gp[key], key)
+
+                data = g.np(dtype=np.float64)
+                self.assertTrue(np.array_equal(grd.np(), data, equal_nan=True))
+                self.assertTrue(np.array_equal(grd[10:20, 5:9], data[10:20, 5:9], equal_nan=True))
+                self.assertTrue(np.array_equal(grd[3], data[3], equal_nan=True))
+
+    def test_round_trip(self):
+        self.start()
+
+        for sample in self.samples:
+            with gxgrdf.GrdFile.open(sample) as grd:
+                data = grd.np()
+                properties = grd.properties()
+
+            file_name = os.path.join(self.gx.temp_folder(), os.path.basename(sample))
+            gxgrdf.GrdFile.from_data_array(data, file_name, properties, overwrite=True).close()
+
+            with gxgrdf.GrdFile.open(file_name) as grd:
+                self.assertFalse(grd.is_compressed)
+                self.assertTrue(isinstance(grd.raw, np.memmap))
+                self.assertEqual(grd.properties(), properties)
+                self.assertEqual(grd.header['NVPTS'], np.count_nonzero(~np.isnan(data)))
+                self.assertAlmostEqual(grd.header['IZMIN'], np.nanmin(data), 3)
+                self.assertAlmostEqual(grd.header['IZMAX'], np.nanmax(data), 3)
+                self.assertTrue(np.array_equal(grd.np(), data, equal_nan=True))
+
+            # the native engine reads the pure-python grid
+            with gxgrd.Grid.open(file_name + '(GRD)') as g:
+                self.assertEqual(g.nx, properties['nx'])
+                self.assertEqual(g.ny, properties['ny'])
+                self.assertEqual(g.x0, properties['x0'])
+                self.assertTrue(np.array_equal(g.np(dtype=np.float64), data, equal_nan=True))
+
+    def test_write(self):
+        self.start()
+
+        file_name = os.path.join(self.gx.temp_folder(), 'test_write.grd')
+        data = np.arange(12, dtype=np.int16).reshape(3, 4)
+        with gxgrdf.GrdFile.from_data_array(data, file_name, {'x0': 10., 'dx': 2., 'rot': 15.}) as grd:
+            self.assertEqual(grd.dtype, np.int16)
+            grd[1, 1] = np.nan
+            grd[2] = [1.6, 2., 3., np.nan]
+
+        with gxgrdf.GrdFile.open(file_name, mode=gxgrdf.FILE_READWRITE) as grd:
+            self.assertEqual(grd.x0, 10.)
+            self.assertEqual(grd.dy, 2.)
+            self.assertEqual(grd.rot, 15.)
+            self.assertEqual(grd.header['NVPTS'], 10)
+            self.assertTrue(np.isnan(grd[1, 1]))
+            self.assertEqual(list(grd.np(dtype=np.int16)[2]), [2, 2, 3, grd.dummy])
+            grd.raw[0, 0] = 7
+
+        with gxgrdf.GrdFile.open(file_name) as grd:
+            self.assertEqual(grd[0, 0], 7.)
+            self.assertRaises(gxgrdf.GrdFileException, grd.__setitem__, (0, 0), 1.)
+
+        with gxgrd.Grid.open(file_name) as g:
+            self.assertEqual(g.rot, 15.)
+            self.assertEqual(g.dtype, np.int16)
+            self.assertEqual(g.statistics()['num_dummy'], 2)
+
+        self.assertRaises(gxgrdf.GrdFileException, gxgrdf.GrdFile.new, file_name, {'nx': 4, 'ny': 3})
+        self.assertRaises(gxgrdf.GrdFileException, gxgrdf.GrdFile.open, self.samples[0],
+                          mode=gxgrdf.FILE_READWRITE)
+
+
+class TestStandalone(unittest.TestCase):
+
+    def test_import_without_gxapi(self):
+
+        # grd_file must work on systems that do not have the Geosoft native libraries
+        script = '\n'.join(["import sys",
+                             "import numpy as np",
+                             "sys.modules['geosoft.gxapi'] = None",
+                             "import geosoft.gxpy.grd_file as gxgrdf",
+                             "assert 'geosoft.gxpy.gx' not in sys.modules",
+                             "file_name = sys.argv[1]",
+                             "data = np.arange(12, dtype=np.float32).reshape(3, 4)",
+                             "gxgrdf.GrdFile.from_data_array(data, file_name, overwrite=True).close()",
+                             "with gxgrdf.GrdFile.open(file_name) as grd:",
+                             "    assert np.array_equal(grd.np(), data)"])
+        package_folder = os.path.dirname(os.path.dirname(os.path.abspath(geosoft.__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (package_folder, env.get('PYTHONPATH')) if p)
+        file_name = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'standalone.grd')
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        try:
+            result = subprocess.run([sys.executable, '-c', script, file_name], env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.assertEqual(result.returncode, 0, result.stdout.decode(errors='replace'))
+        finally:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+
+###############################################################################################
+
+if __name__ == '__main__':
+
+    unittest.main()
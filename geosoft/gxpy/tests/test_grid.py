@@ -332,6 +332,57 @@ class Test(GXPYTest):
                 self.assertAlmostEqual(ex[2], 7.905440298447842)
                 self.assertAlmostEqual(ex[3], 44.032434361820314)
 
+    def test_virtual_window(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np()
+            window = os.path.join(self.folder, 'testwindow.grd(GRD)')
+            with gxgrd.Grid.index_window(g, window, 4, 2, 96, 5, overwrite=True) as gw:
+                gw.delete_files()
+                pw = gw.properties()
+                stw = gw.statistics()
+
+            with gxgrd.Grid.index_window(g, x0=4, y0=2, nx=96, ny=5, virtual=True) as vw:
+                self.assertTrue(isinstance(vw, gxgrd.GridWindow))
+                self.assertEqual(vw.name, 'test_grid_1_(4,2)(96,5)')
+                self.assertEqual(vw.offset, (4, 2))
+                pv = vw.properties()
+                for k in ('nx', 'ny', 'dx', 'dy', 'rot', 'dtype'):
+                    self.assertEqual(pv[k], pw[k])
+                self.assertAlmostEqual(pv['x0'], pw['x0'])
+                self.assertAlmostEqual(pv['y0'], pw['y0'])
+                self.assertTrue(np.array_equal(vw.np(), data[2:7, 4:100], equal_nan=True))
+                self.assertTrue(np.array_equal(vw.read_row(1).np, g.read_row(3, 4, 96).np))
+                self.assertAlmostEqual(vw.statistics()['mean'], stw['mean'])
+                self.assertEqual(vw.statistics()['num_dummy'], stw['num_dummy'])
+                self.assertRaises(gxgrd.GridException, vw.write_row, data[0, :96], 0)
+                self.assertRaises(gxgrd.GridException, vw.row_writer)
+
+                # a window of a window reads from the parent
+                with gxgrd.Grid.index_window(vw, x0=10, y0=1, nx=5, ny=3, virtual=True) as vw2:
+                    self.assertTrue(vw2.parent is g)
+                    self.assertEqual(vw2.offset, (14, 3))
+                    self.assertTrue(np.array_equal(vw2.np(), data[3:6, 14:19], equal_nan=True))
+
+                # native access materialises the window
+                self.assertFalse(vw.is_materialized)
+                self.assertEqual(vw.gximg.nx(), 96)
+                self.assertTrue(vw.is_materialized)
+
+                with vw.materialize() as gm:
+                    gm.delete_files()
+                    self.assertTrue(np.array_equal(gm.np(), data[2:7, 4:100], equal_nan=True))
+                with gxgrd.Grid.copy(vw, window, overwrite=True) as gc:
+                    gc.delete_files()
+                    self.assertAlmostEqual(gc.x0, pw['x0'])
+                    self.assertTrue(np.array_equal(gc.np(), data[2:7, 4:100], equal_nan=True))
+
+            self.assertRaises(gxgrd.GridException, gxgrd.Grid.index_window, g, x0=99, nx=5, virtual=True)
+
+        with gxgrd.Grid.index_window(self.g1f, x0=4, y0=2, nx=96, ny=5, virtual=True) as vw:
+            self.assertTrue(np.array_equal(vw.np(), data[2:7, 4:100], equal_nan=True))
+
     def test_from_array(self):
         self.start()
 
@@ -634,6 +685,33 @@ class Test(GXPYTest):
                 self.assertEqual(gm.xyz(0), (18.595203516590775, 39.8775426296126, 1007.0))
                 self.assertEqual(gm.xyz((g.nx - 1, g.ny - 1)), (19.00281516607315, 40.75166863280787, 1008.0342903237216))
 
+    def test_iter_chunks(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g2f) as g:
+            xyzv = g.xyzv()
+            nrows = 0
+            for x, y, z, v in g.iter_chunks(rows=7):
+                self.assertTrue(x.shape == y.shape == z.shape == v.shape)
+                self.assertTrue(np.allclose(x, xyzv[nrows: nrows + v.shape[0], :, 0]))
+                self.assertTrue(np.allclose(y, xyzv[nrows: nrows + v.shape[0], :, 1]))
+                self.assertTrue(np.array_equal(v, xyzv[nrows: nrows + v.shape[0], :, 3], equal_nan=True))
+                nrows += v.shape[0]
+            self.assertEqual(nrows, g.ny)
+
+            with gxgrd.Grid.copy(g) as gm:
+                gm.rot = 30.
+                x, y, z = gm.xyz_rows(5, 3)
+                for ix, iy in ((0, 5), (40, 6), (100, 7)):
+                    self.assertAlmostEqual(x[iy - 5, ix], gm.xy_from_index(ix, iy)[0])
+                    self.assertAlmostEqual(y[iy - 5, ix], gm.xy_from_index(ix, iy)[1])
+                    self.assertEqual(gm.xyz((ix, iy))[:2], (x[iy - 5, ix], y[iy - 5, ix]))
+
+                cs_name = gxcs.name_from_hcs_orient_vcs(gm.coordinate_system.hcs, '0, 0, 1000, 0, -90, 25', '')
+                gm.coordinate_system = cs_name
+                x, y, z = gm.xyz_rows()
+                self.assertEqual(gm.xyz((g.nx - 1, g.ny - 1)), (x[-1, -1], y[-1, -1], z[-1, -1]))
+
     def test_figure_map(self):
         self.start()
         map_file = gxgrd.figure_map(self.g1f, map_file='figure_map.map', title='image_test', features='all').file_name
@@ -676,6 +754,228 @@ class Test(GXPYTest):
             self.assertEqual(col_2[2], 102)
             self.assertEqual(col_2[3], 255)
 
+    def test_rgba(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.gcf) as gc:
+            data = gc.np()
+            p = gc.properties()
+            self.assertTrue(np.array_equal(gc.read_rgba(), data))
+            self.assertTrue(np.array_equal(gc.read_rgba(100, 10, 90, 20), data[100:110, 90:110]))
+            out = np.zeros((153, 254, 4), dtype=np.uint8)
+            self.assertTrue(gc.read_rgba(out=out) is out)
+            self.assertRaises(gxgrd.GridException, gc.read_rgba, out=np.zeros((153, 254, 3), dtype=np.uint8))
+
+        with gxgrd.Grid.from_rgba(data, properties=p) as g:
+            g.delete_files()
+            self.assertTrue(g.is_color)
+            self.assertEqual((g.nx, g.ny), (254, 153))
+            self.assertAlmostEqual(g.x0, p['x0'])
+            self.assertTrue(np.array_equal(g.np(), data))
+
+            patch = np.zeros((5, 6, 4), dtype=np.uint8)
+            patch[..., 0] = 255
+            patch[..., 3] = 255
+            patch[2, 3, 3] = 0
+            g.write_rgba(patch, row=10, col=20)
+            rgba = g.read_rgba()
+            self.assertEqual(tuple(rgba[10, 20]), (255, 0, 0, 255))
+            self.assertEqual(tuple(rgba[12, 23]), (0, 0, 0, 0))
+            self.assertTrue(np.array_equal(rgba[:10], data[:10]))
+
+            png = g.image_file(pix_32_bit=True)
+            with open(png, 'rb') as f:
+                self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+            self.assertTrue(os.path.isfile(os.path.splitext(png)[0] + '.pgw'))
+            png = g.color_png(os.path.join(self.folder, 'rgba.png'), pix_width=127)
+            with open(os.path.splitext(png)[0] + '.pgw') as f:
+                world = [float(v) for v in f.read().split()]
+            self.assertAlmostEqual(world[0], p['dx'] * 2.)
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            self.assertRaises(gxgrd.GridException, g.write_rgba, data)
+        self.assertRaises(gxgrd.GridException, gxgrd.Grid.from_rgba, data, 'rgba.ers(ERM)')
+
+    def test_read_rows(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np()
+            for row in (0, 50, 100):
+                self.assertTrue(np.array_equal(data[row], g.read_row(row).np, equal_nan=True))
+
+            rows = g.read_rows(10, 20, block_rows=3)
+            self.assertEqual(rows.shape, (20, 101))
+            self.assertTrue(np.array_equal(rows, data[10:30], equal_nan=True))
+
+            out = np.zeros((g.ny, g.nx), dtype=np.float64)
+            self.assertTrue(g.np(out=out) is out)
+            self.assertEqual(np.nansum(out), 10081870.0)
+            self.assertEqual(91, np.count_nonzero(np.isnan(out)))
+
+            big = np.zeros((200, 200), dtype=np.float64)
+            g.read_rows(out=big[50:151, 20:121])
+            self.assertEqual(np.nansum(big), 10081870.0)
+
+            self.assertRaises(gxgrd.GridException, g.read_rows, 100, 2)
+            self.assertRaises(gxgrd.GridException, g.read_rows, out=np.zeros((10, 10)))
+
+    def test_row_writer(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np()
+            properties = g.properties()
+
+        for threaded in (False, True):
+            with gxgrd.Grid.new(properties=properties) as gw:
+                with gw.row_writer(block_rows=10, threaded=threaded) as writer:
+                    writer.write(data[:45])
+                    writer.write(data[45])
+                    writer.write(data[46:])
+                self.assertEqual(writer.rows_written, 101)
+                self.assertTrue(np.array_equal(gw.np(), data, equal_nan=True))
+                self.assertRaises(gxgrd.GridException, writer.write, data[0])
+
+        with gxgrd.Grid.new(properties=properties) as gw:
+            with gw.row_writer(row=100, order=-1) as writer:
+                writer.write(data[::-1])
+            self.assertTrue(np.array_equal(gw.np(), data, equal_nan=True))
+            with gw.row_writer(row=5, col=10, ncols=3) as writer:
+                writer.write([[1., np.nan, 3.]])
+            self.assertEqual(gw.array[5, 10], 1.)
+            self.assertTrue(np.isnan(gw.array[5, 11]))
+            self.assertRaises(gxgrd.GridException, gw.row_writer(row=101).write, data[0])
+
+    def test_open_pooled(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            with gxgrd.Grid.copy(g, gx.gx().temp_file('.grd(GRD)')) as gc:
+                file_name = gc.file_name_decorated
+                data = gc.np()
+
+        gxgrd.clear_handle_pool()
+        st0 = gxgrd.handle_pool_statistics()
+        with gxgrd.Grid.open_pooled(file_name) as g1, gxgrd.Grid.open_pooled(file_name) as g2:
+            self.assertTrue(g1.gximg is g2.gximg)
+            self.assertEqual(gxgrd.handle_pool_statistics()['in_use'], st0['in_use'] + 1)
+            self.assertTrue(np.array_equal(g2.np(), data, equal_nan=True))
+            self.assertRaises(gxgrd.GridException, g1.set_properties, g1.properties())
+            x0 = g1.x0
+            cs = str(g1.coordinate_system)
+            for name, value in (('x0', x0 + 1.), ('y0', 1.), ('dx', 2.), ('dy', 2.), ('rot', 10.),
+                                ('coordinate_system', 'NAD83 / UTM zone 17N')):
+                self.assertRaises(gxgrd.GridException, setattr, g1, name, value)
+        self.assertEqual(gxgrd.handle_pool_statistics()['idle'], 1)
+
+        # the reused handle is unchanged
+        with gxgrd.Grid.open_pooled(file_name) as g:
+            self.assertEqual(g.x0, x0)
+            self.assertEqual(g.rot, 0.)
+            self.assertEqual(str(g.coordinate_system), cs)
+            self.assertTrue(np.array_equal(g.np(), data, equal_nan=True))
+        st = gxgrd.handle_pool_statistics()
+        self.assertEqual(st['opened'] - st0['opened'], 1)
+        self.assertEqual(st['reused'] - st0['reused'], 2)
+
+        # a writer commit invalidates the pooled handle
+        with gxgrd.Grid.open(file_name, mode=gxgrd.FILE_READWRITE) as g:
+            g.write_row(np.zeros(g.nx), 0)
+        with gxgrd.Grid.open_pooled(file_name) as g:
+            self.assertEqual(np.nansum(g.read_row(0).np), 0.)
+        self.assertEqual(gxgrd.handle_pool_statistics()['opened'] - st0['opened'], 2)
+
+        gxgrd.delete_files(file_name)
+        self.assertEqual(gxgrd.handle_pool_statistics()['idle'], 0)
+
+    def test_array(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np()
+            a = g.array
+            self.assertEqual(a.shape, (101, 101))
+            self.assertEqual(a[0, 0], 771.0)
+            self.assertEqual(a[-1, -1], 243.0)
+            self.assertTrue(np.array_equal(a[20:40, 55:90], data[20:40, 55:90], equal_nan=True))
+            self.assertTrue(np.array_equal(a[::7, ::-3], data[::7, ::-3], equal_nan=True))
+            self.assertTrue(np.array_equal(a[50], data[50], equal_nan=True))
+            self.assertTrue(np.array_equal(np.asarray(a), data, equal_nan=True))
+
+            a = g.tiled_array(tile_shape=(16, 16), cache_bytes=16 * 16 * 4 * 3)
+            self.assertTrue(g.array is a)
+            self.assertTrue(np.array_equal(a[:, 30:40], data[:, 30:40], equal_nan=True))
+            self.assertTrue(a.cached_bytes <= a.cache_bytes)
+            misses = a.misses
+            a[100, 30]
+            self.assertEqual(a.misses, misses)
+            self.assertRaises(IndexError, a.__getitem__, (101, 0))
+
+    def test_overviews(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            self.assertEqual(g.overviews, [])
+            self.assertEqual(g.overview_level(1.0e9), 0)
+            data = g.np(dtype=np.float64)
+
+            files = g.build_overviews(min_size=32)
+            self.assertTrue(len(files) > 0)
+            self.assertEqual(g.overviews, files)
+            self.assertTrue(files[0].endswith('.ovr1.mean.grd'))
+            with gxgrd.Grid.open(files[-1]) as ovr:
+                self.assertTrue(ovr.coordinate_system == g.coordinate_system)
+            self.assertEqual(g.overview_level(g.dx * 2.5), 1)
+
+            ovr, p = g.read_overview(g.dx * 2)
+            self.assertEqual(p['level'], 1)
+            self.assertEqual(ovr.shape, ((g.ny + 1) // 2, (g.nx + 1) // 2))
+            self.assertEqual(p['dx'], g.dx * 2)
+            self.assertAlmostEqual(p['x0'], g.x0 + 0.5 * g.dx)
+            self.assertAlmostEqual(p['y0'], g.y0 + 0.5 * g.dy)
+            block = data[10:12, 20:22]
+            if not np.all(np.isnan(block)):
+                self.assertAlmostEqual(ovr[5, 10], np.nanmean(block), 3)
+
+            ovr, p = g.read_overview(g.dx * 1000., row=8, nrows=40, col=16, ncols=40)
+            self.assertEqual(p['level'], len(files))
+            self.assertAlmostEqual(p['x0'], g.x0 + (16 >> p['level']) * p['dx'] + 0.5 * ((1 << p['level']) - 1) * g.dx)
+
+            window, p = g.read_overview(g.dx, row=8, nrows=4, col=16, ncols=5)
+            self.assertEqual(p['level'], 0)
+            self.assertTrue(np.array_equal(window, data[8:12, 16:21], equal_nan=True))
+
+        # overviews persist with the grid
+        with gxgrd.Grid.open(self.mag) as g:
+            self.assertEqual(g.overviews, files)
+            image = g.image_file(pix_width=(g.nx + 3) // 4)
+            self.assertTrue(os.path.isfile(image))
+
+            nearest = g.build_overviews(method=gxgrd.OVERVIEW_NEAREST, min_size=32)
+            self.assertTrue(nearest[0].endswith('.ovr1.nearest.grd'))
+            self.assertFalse(any(os.path.exists(f) for f in files))
+
+        with gxgrd.Grid.open(self.mag) as g:
+            self.assertEqual(g.overviews, nearest)
+            ovr, p = g.read_overview(g.dx * 2)
+            self.assertEqual(p['x0'], g.x0)
+            self.assertTrue(np.array_equal(ovr, data[::2, ::2], equal_nan=True))
+
+        # each level is the mean of the valid grid cells
+        data = np.arange(64, dtype=np.float64).reshape(8, 8)
+        data[0, 0:3] = np.nan
+        data[1:4, 3] = np.nan
+        with gxgrd.Grid.from_data_array(data) as g:
+            g.build_overviews(min_size=1)
+            for level in (1, 2, 3):
+                ovr, p = g.read_overview(g.dx * (1 << level))
+                self.assertEqual(p['level'], level)
+                step = 1 << level
+                expected = [[np.nanmean(data[r: r + step, c: c + step]) for c in range(0, 8, step)]
+                            for r in range(0, 8, step)]
+                self.assertTrue(np.allclose(ovr, expected), level)
+
     def test_image_file(self):
         self.start()
 
@@ -3,6 +3,7 @@ import os
 import numpy as np
 
 import geosoft
+import geosoft.gxapi as gxapi
 import geosoft.gxpy.system as gsys
 import geosoft.gxpy.grid as gxgrd
 import geosoft.gxpy.grid_utility as gxgrdu
@@ -68,6 +69,43 @@ class Test(GXPYTest):
             self.assertEqual(properties.get('ny'),101)
             self.assertEqual(str(properties.get('coordinate_system')),'WGS 84')
 
+    def test_mosaic_grids(self):
+        self.start()
+
+        glist = [self.g1f, self.g2f]
+        properties, plan = gxgrdu.mosaic_plan(glist)
+        self.assertEqual(properties['nx'], 201)
+        self.assertEqual(properties['ny'], 101)
+        self.assertEqual(len(plan), 2)
+        self.assertFalse(plan[1]['reproject'])
+        self.assertEqual(plan[0]['col'], 0)
+        self.assertEqual(plan[0]['overlaps'], [1])
+
+        layers = []
+        for p in plan:
+            with gxgrd.Grid.open(p['grid']) as g:
+                layer = np.full((properties['ny'], properties['nx']), np.nan)
+                layer[p['row']: p['row'] + p['nrows'], p['col']: p['col'] + p['ncols']] = g.np(dtype=np.float64)
+                layers.append(layer)
+        last = np.where(np.isnan(layers[1]), layers[0], layers[1])
+        first = np.where(np.isnan(layers[0]), layers[1], layers[0])
+        with np.errstate(invalid='ignore'):
+            mean = np.nanmean(np.stack(layers), axis=0)
+
+        for blend, expected in ((gxgrdu.MOSAIC_LAST, last),
+                                (gxgrdu.MOSAIC_FIRST, first),
+                                (gxgrdu.MOSAIC_MEAN, mean)):
+            with gxgrdu.mosaic_grids(glist, blend=blend, block_rows=13) as grd:
+                self.assertEqual(grd.x0, properties['x0'])
+                self.assertTrue(np.allclose(grd.np(dtype=np.float64), expected, equal_nan=True))
+
+        with gxgrdu.mosaic_grids(glist, blend=gxgrdu.MOSAIC_FEATHER, feather_width=5) as grd:
+            data = grd.np(dtype=np.float64)
+            self.assertTrue(np.array_equal(np.isnan(data), np.isnan(mean)))
+            self.assertEqual(data[50, 20], layers[0][50, 20])
+
+        self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.mosaic_grids, glist, blend=99)
+
     def test_bool(self):
         self.start()
 
@@ -164,6 +202,41 @@ class Test(GXPYTest):
         self.assertAlmostEqual(dxg.statistics()['sd'], 0.7668436702132574, 2)
         self.assertEqual(dxg.unit_of_measure, 'nT/m')
 
+    def test_fused_derivatives(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag, mode=gxgrd.FILE_READWRITE) as g:
+            g.unit_of_measure = 'nT'
+
+        types = (gxgrdu.DERIVATIVE_X, gxgrdu.DERIVATIVE_Y, gxgrdu.DERIVATIVE_Z,
+                 gxgrdu.DERIVATIVE_XY, gxgrdu.DERIVATIVE_XYZ, gxgrdu.TILT_ANGLE)
+        with gxgrd.Grid.open(self.mag) as grd:
+            data = grd.np(dtype=np.float64)
+
+            # cells with all neighbours valid
+            valid = ~np.isnan(data)
+            inner = np.zeros(data.shape, dtype=bool)
+            inner[1:-1, 1:-1] = valid[1:-1, 1:-1] & valid[:-2, 1:-1] & valid[2:, 1:-1] & \
+                valid[1:-1, :-2] & valid[1:-1, 2:]
+
+            fused = gxgrdu.derivatives(grd, types, fft=False, block_rows=17)
+            self.assertEqual(len(fused), len(types))
+            for dt, result in zip(types, fused):
+                with gxgrdu.derivative(grd, dt, fft=False) as expected, result:
+                    self.assertEqual(result.dtype, grd.dtype)
+                    self.assertEqual(result.unit_of_measure, expected.unit_of_measure)
+                    a = result.np(dtype=np.float64)[inner]
+                    b = expected.np(dtype=np.float64)[inner]
+                    self.assertTrue(np.allclose(a, b, rtol=1.0e-4, atol=1.0e-5 * np.abs(b).max()))
+
+            with gxgrdu.derivatives(self.mag, gxgrdu.DERIVATIVE_XY, dtype=np.float64) as dxy:
+                self.assertEqual(dxy.dtype, np.float64)
+                self.assertEqual(dxy.unit_of_measure, 'nT/m')
+
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.derivatives, grd, [99])
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.derivatives, grd,
+                              [gxgrdu.DERIVATIVE_X, gxgrdu.DERIVATIVE_Y], file_names=['dx.grd'])
+
     def test_contour_xy(self):
         self.start()
 
@@ -194,6 +267,45 @@ class Test(GXPYTest):
                 self.assertTrue(isinstance(xyp, gxgdb.Geosoft_gdb))
                 self.assertEqual(len(xyp.list_lines()), 9)
 
+    def test_contour_arrays(self):
+        self.start()
+
+        # concentric circles
+        yy, xx = np.mgrid[0: 101, 0: 101]
+        cone = np.hypot(xx - 50.3, yy - 50.7)
+        props = {'x0': 1000., 'y0': 2000., 'dx': 10., 'dy': 10.}
+        with gxgrd.Grid.from_data_array(cone, properties=props) as grd:
+            offsets, xyz, level_index = gxgrdu.contour_arrays(grd, [20., 10.], block_rows=7)
+            self.assertEqual(list(level_index), [0, 1])
+            self.assertEqual(offsets[-1], len(xyz))
+            for i, radius in enumerate((200., 100.)):
+                circle = xyz[offsets[i]: offsets[i + 1]]
+                self.assertTrue(np.array_equal(circle[0], circle[-1]))
+                r = np.hypot(circle[:, 0] - 1503., circle[:, 1] - 2507.)
+                self.assertTrue(np.allclose(r, radius, atol=0.5))
+                self.assertTrue(np.all(circle[:, 2] == 0.))
+
+            same = gxgrdu.contour_points(grd, [20., 10.], return_as=gxgrdu.RETURN_ARRAYS)
+            self.assertTrue(np.array_equal(same[0], offsets))
+            self.assertTrue(np.array_equal(same[1], xyz))
+
+            offsets, xyz, level_index = gxgrdu.contour_arrays(grd, 1000.)
+            self.assertEqual((len(offsets), len(xyz), len(level_index)), (1, 0, 0))
+
+        # many levels, points are on the contoured level
+        with gxgrd.Grid.open(self.mag) as grd:
+            st = grd.statistics()
+            levels = np.linspace(st['min'], st['max'], 500)[1:-1]
+            offsets, xyz, level_index = gxgrdu.contour_arrays(grd, levels)
+            self.assertTrue(np.all(np.diff(level_index) >= 0))
+            self.assertTrue(np.all(np.diff(offsets) > 1))
+            values = gxgrdu.sample_points(grd, xyz)
+            contoured = np.repeat(levels[level_index], np.diff(offsets))
+            # points on the edge of a dummy cell can sample as dummy
+            valid = ~np.isnan(values)
+            self.assertGreater(np.count_nonzero(valid), len(values) * 0.9)
+            self.assertTrue(np.allclose(values[valid], contoured[valid], atol=1.0e-6 * (st['max'] - st['min'])))
+
     def test_tilt_depth(self):
         self.start()
 
@@ -255,6 +367,55 @@ class Test(GXPYTest):
         filled_gd.close(discard=True)
         feath_gd.close(discard=True)
 
+    def test_flood_void(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            data = g.np(dtype=np.float64)
+            valid = ~np.isnan(data)
+            holed = data.copy()
+            holed[20:30, 15:40] = np.nan
+            holed[-5:, :8] = np.nan
+            voids = valid & np.isnan(holed)
+
+            with gxgrd.Grid.from_data_array(holed) as gh:
+                with gxgrdu.flood(gh, void_fill=True) as filled_gd:
+                    self.assertEqual(filled_gd.statistics()['num_dummy'], 0)
+                    filled = filled_gd.np(dtype=np.float64)
+                self.assertTrue(np.array_equal(filled[~np.isnan(holed)], holed[~np.isnan(holed)]))
+                error = np.abs(filled[voids] - data[voids]).mean()
+                self.assertLess(error, np.nanstd(data))
+
+                with gxgrdu.flood(gh, void_fill=True, tension=1., file_name='filled', overwrite=True) as harmonic:
+                    self.assertEqual(harmonic.statistics()['num_dummy'], 0)
+                    harmonic.delete_files()
+
+            with gxgrd.Grid.from_data_array(np.full((5, 5), np.nan)) as gd:
+                self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.flood, gd, void_fill=True)
+
+    def test_feather_array(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as g:
+            data = g.np(dtype=np.float64)
+            mean = g.statistics()['mean']
+
+            with gxgrdu.feather(g, 10) as fg:
+                feathered = fg.np(dtype=np.float64)
+            self.assertTrue(np.allclose(gxgrdu.feather(data, 10, edge_value=mean), feathered, equal_nan=True))
+            self.assertEqual(feathered[0, 0], mean)
+            self.assertEqual(feathered[g.ny // 2, g.nx // 2], data[g.ny // 2, g.nx // 2])
+
+            in_place = data.copy()
+            self.assertTrue(gxgrdu.feather(in_place, 10, edge_value=mean, in_place=True) is in_place)
+            self.assertTrue(np.allclose(in_place, feathered, equal_nan=True))
+
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.feather, g, 10, in_place=True)
+
+            with gxgrd.Grid.copy(g, dtype=np.float64) as gc:
+                self.assertTrue(gxgrdu.feather(gc, 10, edge_value=mean, in_place=True) is gc)
+                self.assertTrue(np.allclose(gc.np(), feathered, equal_nan=True))
+
     def test_expression(self):
         self.start()
 
@@ -266,6 +427,236 @@ class Test(GXPYTest):
             x = gxgrdu.expression((grd, grd), 'g1-g2')
             self.assertEqual(x.statistics()['mean'], 0.)
 
+        with gxgrd.Grid.open(self.mag) as grd:
+            data = grd.np(dtype=np.float64)
+            with gxgrd.Grid.copy(grd, dtype=np.int32) as gint:
+                idata = gint.np(dtype=np.float64)
+                for expr in ('g1 + g2 * 2', 'sqrt(abs(g1 - g2))', 'g1 > 5000 ? g1 : g2'):
+                    native = gxgrdu._expression_native({'g1': grd, 'g2': gint}, expr).np(dtype=np.float64)
+                    numpy = gxgrdu.expression((grd, gint), expr, block_rows=17).np(dtype=np.float64)
+                    self.assertTrue(np.allclose(native, numpy, equal_nan=True), expr)
+
+                x = gxgrdu.expression({'a': grd, 'b': gint}, 'a - b; t = _ * 2; _ = (t > 0 && b > 0) ? t : DUMMY')
+                with np.errstate(invalid='ignore'):
+                    t = (data - idata) * 2
+                    expected = np.where((t > 0) & (idata > 0), t, np.nan)
+                self.assertTrue(np.allclose(x.np(dtype=np.float64), expected, equal_nan=True))
+
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.expression, (grd,), 'g1.real')
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.expression, (grd,), 'unknown(g1)')
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.expression, (grd,), '!+g1')
+
+    def test_expression_dummy(self):
+        self.start()
+
+        nan = np.nan
+        with gxgrd.Grid.from_data_array(np.array([[1., 5., nan], [nan, 0., 3.]])) as a, \
+                gxgrd.Grid.from_data_array(np.full((2, 3), 2.)) as b:
+            for expr, expected in (('a == DUMMY ? 0 : a', [[1., 5., 0.], [0., 0., 3.]]),
+                                   ('a != DUMMY', [[1., 1., 0.], [0., 1., 1.]]),
+                                   ('a > b ? 1 : 0', [[0., 1., nan], [nan, 0., 1.]]),
+                                   ('a > b && b > 0', [[0., 1., nan], [nan, 0., 1.]]),
+                                   ('!a > b', [[0., 0., nan], [nan, 0., 0.]]),
+                                   ('!(a > b)', [[1., 0., nan], [nan, 1., 0.]]),
+                                   ('!!a + 1', [[2., 2., nan], [nan, 1., 2.]])):
+                x = gxgrdu.expression({'a': a, 'b': b}, expr)
+                self.assertTrue(np.array_equal(x.np(dtype=np.float64), np.array(expected), equal_nan=True), expr)
+
+    def test_tiled_process(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as grd:
+            data = grd.np(dtype=np.float64)
+            expected = gxgrdu.kernel_mean(data, 2)
+
+            with gxgrdu.tiled_process(grd, gxgrdu.kernel_mean, args=(2,), halo=2,
+                                      tile_shape=(50, 70), processes=1) as serial:
+                self.assertEqual(serial.nx, grd.nx)
+                self.assertEqual(serial.ny, grd.ny)
+                self.assertTrue(np.allclose(serial.np(dtype=np.float64), expected, equal_nan=True))
+
+            with gxgrdu.tiled_process(grd, gxgrdu.kernel_mean, args=(2,), halo=2,
+                                      tile_shape=(50, 70), processes=2) as pooled:
+                self.assertTrue(np.allclose(pooled.np(dtype=np.float64), expected, equal_nan=True))
+
+            self.assertRaises(gxgrdu.GridUtilityException,
+                              gxgrdu.tiled_process, grd, gxgrdu.kernel_mean, halo=-1)
+
+            # a failed result is deleted
+            def bad_shape(data):
+                return data[1:]
+
+            def bad_kernel(data):
+                raise ValueError('kernel failed')
+
+            file_name = os.path.join(self.folder, 'tiled_failed.grd')
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.tiled_process, grd, bad_shape, halo=1,
+                              file_name=file_name, processes=1)
+            self.assertFalse(os.path.exists(file_name))
+            self.assertRaises(ValueError, gxgrdu.tiled_process, grd, bad_kernel, file_name=file_name, processes=1)
+            self.assertFalse(os.path.exists(file_name))
+
+    def test_grid_statistics(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as grd:
+            expected = grd.statistics()
+            data = grd.np(dtype=np.float64)
+
+            stats = gxgrdu.GridStatistics().add_grid(grd, block_rows=7)
+            st = stats.statistics()
+            self.assertEqual(st['num_data'], expected['num_data'])
+            self.assertEqual(st['num_dummy'], expected['num_dummy'])
+            self.assertAlmostEqual(st['min'], expected['min'])
+            self.assertAlmostEqual(st['max'], expected['max'])
+            self.assertAlmostEqual(st['mean'], expected['mean'], 6)
+            self.assertAlmostEqual(st['sd'], expected['sd'], 6)
+
+            valid = data[~np.isnan(data)]
+            rng = valid.max() - valid.min()
+            for q, v in zip((1, 25, 50, 75, 99), stats.percentile((1, 25, 50, 75, 99))):
+                self.assertLess(abs(v - np.percentile(valid, q)), rng * 0.005)
+            counts, edges = stats.histogram()
+            self.assertEqual(counts.sum(), len(valid))
+            self.assertEqual(len(edges), len(counts) + 1)
+
+            # merge statistics of two halves with exact histograms
+            hrange = (valid.min(), valid.max())
+            half = grd.ny // 2
+            s1 = gxgrdu.GridStatistics(histogram_range=hrange, bins=50).add(data[:half])
+            s2 = gxgrdu.GridStatistics(histogram_range=hrange, bins=50).add(data[half:])
+            merged = s1.merge(s2).statistics()
+            self.assertEqual(merged['num_data'], st['num_data'])
+            self.assertEqual(merged['num_dummy'], st['num_dummy'])
+            self.assertAlmostEqual(merged['mean'], st['mean'], 8)
+            self.assertAlmostEqual(merged['variance'], st['variance'], 6)
+            self.assertEqual(list(s1.histogram()[0]), list(np.histogram(valid, s1.histogram()[1])[0]))
+
+            self.assertRaises(gxgrdu.GridUtilityException, s1.merge, gxgrdu.GridStatistics())
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.GridStatistics().merge, s1)
+
+    def test_sample_points(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.mag) as grd:
+            rng = np.random.RandomState(11)
+            ix = rng.uniform(-5, grd.nx + 5, 5000)
+            iy = rng.uniform(-5, grd.ny + 5, 5000)
+            xy = np.array([grd.xy_from_index(i, j) for i, j in zip(ix, iy)])
+            xyz = np.column_stack((xy, np.zeros(len(xy))))
+
+            native = gxgrdu.sample(grd, xyz)
+            native[native == gxapi.rDUMMY] = np.nan
+            vect = gxgrdu.sample_points(grd, xy, tile_shape=(32, 32))
+            self.assertEqual(vect.shape, (5000,))
+            both = ~np.isnan(native) & ~np.isnan(vect)
+            self.assertTrue(np.count_nonzero(both) > 1000)
+            self.assertTrue(np.allclose(native[both], vect[both]))
+            outside = (ix < 0) | (ix > grd.nx - 1) | (iy < 0) | (iy > grd.ny - 1)
+            self.assertTrue(np.all(np.isnan(vect[outside])))
+
+            data = grd.np(dtype=np.float64)
+            nearest = gxgrdu.sample_points([grd, self.mag], xy, method=gxgrdu.SAMPLE_NEAREST)
+            self.assertEqual(nearest.shape, (5000, 2))
+            self.assertTrue(np.array_equal(nearest[:, 0], nearest[:, 1], equal_nan=True))
+            i = np.flatnonzero(~outside)[0]
+            self.assertEqual(nearest[i, 0], data[int(round(iy[i])), int(round(ix[i]))])
+
+            self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.sample_points, [grd, self.g1f], xy)
+
+    def test_minimum_curvature(self):
+        self.start()
+
+        rng = np.random.RandomState(3)
+        x = rng.uniform(0., 1000., 2000)
+        y = rng.uniform(0., 800., 2000)
+
+        def surface(_x, _y):
+            return np.sin(_x / 150.) * np.cos(_y / 200.) * 100. + 0.05 * _x
+
+        v = surface(x, y)
+        v[:5] = np.nan
+        with gxgrdu.minimum_curvature((x, y, v), cs=5., area=(0., 0., 1000., 800.), bkd=100.,
+                                      unit_of_measure='nT') as grd:
+            self.assertEqual((grd.nx, grd.ny), (201, 161))
+            self.assertEqual((grd.x0, grd.y0, grd.dx, grd.dy), (0., 0., 5., 5.))
+            self.assertEqual(grd.unit_of_measure, 'nT')
+            data = grd.np(dtype=np.float64)
+            self.assertEqual(np.count_nonzero(np.isnan(data)), 0)
+            gy, gx = np.mgrid[0: grd.ny, 0: grd.nx] * 5.
+            error = np.abs(data - surface(gx, gy))[10: -10, 10: -10]
+            self.assertLess(error.mean(), 1.)
+
+        # data honoured at the nodes, and blanked beyond bkd
+        xyv = np.array([(10., 10., 1.), (30., 10., 5.), (10., 30., 3.), (30., 30., 4.), (80., 80., 2.)])
+        with gxgrdu.minimum_curvature(xyv, cs=1., bkd=15., ti=0.25) as grd:
+            self.assertEqual((grd.nx, grd.ny), (71, 71))
+            data = grd.np(dtype=np.float64)
+            for xx, yy, vv in xyv:
+                self.assertAlmostEqual(data[int(yy - 10.), int(xx - 10.)], vv, 5)
+            self.assertTrue(np.isnan(data[45, 45]))
+            self.assertFalse(np.isnan(data[10, 10]))
+
+        self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.minimum_curvature, xyv, icgr=3)
+        self.assertRaises(gxgrdu.GridUtilityException, gxgrdu.minimum_curvature, [(1., 2., np.nan)])
+
+    def test_convert_grids(self):
+        self.start()
+
+        with gxgrd.Grid.open(self.g1f) as g:
+            data = g.np(dtype=np.float64)
+
+        ers = os.path.join(self.folder, 'convert_1.ers(ERM)')
+        grd = os.path.join(self.folder, 'convert_1.grd(GRD)')
+        grd32 = os.path.join(self.folder, 'convert_2.grd(GRD)')
+        missing = os.path.join(self.folder, 'no_such_grid.grd(GRD)')
+        manifest = os.path.join(self.folder, 'convert.json')
+        jobs = [(self.g1f, ers), (self.g1f, grd, np.float64), (self.g1f, grd32, np.float32, None)]
+
+        results = gxgrdu.convert_grids(jobs, workers=1, manifest=manifest, crc=True)
+        self.assertEqual([r['status'] for r in results], [gxgrdu.CONVERT_DONE] * 3)
+        self.assertEqual(results[0]['cells'], 101 * 101)
+        for target, dtype in ((ers, None), (grd, np.float64), (grd32, np.float32)):
+            with gxgrd.Grid.open(target) as g:
+                if dtype is not None:
+                    self.assertEqual(g.dtype, dtype)
+                self.assertTrue(np.allclose(g.np(dtype=np.float64), data, equal_nan=True))
+
+        # up to date, unless a job or target changes
+        results = gxgrdu.convert_grids(jobs, workers=1, manifest=manifest, crc=True)
+        self.assertEqual([r['status'] for r in results], [gxgrdu.CONVERT_SKIPPED] * 3)
+        jobs[2] = (self.g1f, grd32, np.float64)
+        gxgrd.delete_files(grd)
+        results = gxgrdu.convert_grids(jobs + [(missing, grd)], workers=1, manifest=manifest)
+        self.assertEqual([r['status'] for r in results],
+                         [gxgrdu.CONVERT_SKIPPED, gxgrdu.CONVERT_DONE, gxgrdu.CONVERT_DONE, gxgrdu.CONVERT_FAILED])
+        self.assertTrue(results[3]['error'])
+
+        # without a manifest targets newer than the source are current
+        results = gxgrdu.convert_grids(jobs, workers=1)
+        self.assertEqual([r['status'] for r in results], [gxgrdu.CONVERT_SKIPPED] * 3)
+
+        # worker processes, a touched source with the same content is current by CRC
+        for target in (ers, grd, grd32):
+            gxgrd.delete_files(target)
+        os.remove(manifest)
+        results = gxgrdu.convert_grids(jobs + [(missing, grd)], workers=2, manifest=manifest, crc=True)
+        self.assertEqual([r['status'] for r in results], [gxgrdu.CONVERT_DONE] * 3 + [gxgrdu.CONVERT_FAILED])
+        self.assertTrue(results[3]['error'])
+        for target, dtype in ((ers, None), (grd, np.float64), (grd32, np.float64)):
+            with gxgrd.Grid.open(target) as g:
+                if dtype is not None:
+                    self.assertEqual(g.dtype, dtype)
+                self.assertTrue(np.allclose(g.np(dtype=np.float64), data, equal_nan=True))
+        st = os.stat(self.g1f)
+        os.utime(self.g1f, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        results = gxgrdu.convert_grids(jobs, workers=2, manifest=manifest, crc=True)
+        self.assertEqual([r['status'] for r in results], [gxgrdu.CONVERT_SKIPPED] * 3)
+
+        for target in (ers, grd, grd32):
+            gxgrd.delete_files(target)
+        os.remove(manifest)
+
 
 ###############################################################################################
 
@@ -743,6 +743,8 @@ def dummy_mask(npd):
     :returns:   numpy 1D array, True for any row that had a dummy in any data field
 
     .. versionadded:: 9.2
+
+    .. versionchanged:: 2022.1 vectorized
     """
 
     dummy = gx_dummy(npd.dtype)
@@ -750,7 +752,7 @@ def dummy_mask(npd):
         return npd == dummy
     if len(npd.shape) != 2:
         raise UtilityException(_t('Must be a 2D array'))
-    return np.apply_along_axis(lambda a: dummy in a, 1, npd)
+    return (npd == dummy).any(axis=1)
 
 
 def dummy_to_nan(data):